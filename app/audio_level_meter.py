@@ -0,0 +1,104 @@
+from PySide6 import QtCore, QtGui, QtWidgets
+
+# --- 音声レベルメーターの描画設定 ---
+BAR_WIDTH = 15  # 棒1本の幅
+BAR_HEIGHT = 80  # 棒の高さ
+BAR_SPACING = 3  # 棒の間隔
+BAR_RADIUS = 3  # 棒の角丸
+
+ATTACK = 0.6  # レベル上昇時の追従率（1に近いほど速い）
+RELEASE = 0.25  # レベル下降時の追従率
+PEAK_HOLD_TICKS = 15  # ピーク表示を保持するティック数（50ms × 15 = 0.75秒）
+PEAK_DECAY = 0.05  # 保持時間後、1ティックごとにピークを下げる量
+
+
+class AudioLevelMeter(QtWidgets.QWidget):
+    """音声レベルを棒グラフで描画するメーター（スタイルシートを使わず paintEvent で描画）"""
+
+    def __init__(self, num_bars, parent=None):
+        super().__init__(parent)
+        self.num_bars = num_bars
+        self.setFixedSize(num_bars * BAR_WIDTH + (num_bars - 1) * BAR_SPACING, BAR_HEIGHT)
+
+        # ブラシとペンは一度だけ作成して使い回す
+        self.background_brush = QtGui.QBrush(QtGui.QColor("#2c3e50"))
+        self.border_pen = QtGui.QPen(QtGui.QColor("#34495e"), 1)
+        self.level_brushes = {
+            "low": QtGui.QBrush(QtGui.QColor("#3498db")),  # 青
+            "mid": QtGui.QBrush(QtGui.QColor("#f39c12")),  # オレンジ
+            "high": QtGui.QBrush(QtGui.QColor("#e74c3c")),  # 赤
+        }
+
+        # 棒の矩形も事前に計算
+        self.bar_rects = [
+            QtCore.QRectF(i * (BAR_WIDTH + BAR_SPACING) + 0.5, 0.5, BAR_WIDTH - 1, BAR_HEIGHT - 1)
+            for i in range(num_bars)
+        ]
+
+        self.target_level = 0.0
+        self.level = 0.0
+        self.peak = 0.0
+        self.peak_hold = 0
+
+        # 前回描画した状態（変化がなければ再描画しない）
+        self._drawn_state = (0, -1, "low")
+
+    def set_level(self, level):
+        """目標レベルを設定（0〜1）"""
+        self.target_level = min(max(level, 0.0), 1.0)
+
+    def advance(self):
+        """1ティック分レベルを平滑化し、ピークを更新して必要なら再描画"""
+        rate = ATTACK if self.target_level > self.level else RELEASE
+        self.level += (self.target_level - self.level) * rate
+
+        if self.level >= self.peak:
+            self.peak = self.level
+            self.peak_hold = PEAK_HOLD_TICKS
+        elif self.peak_hold > 0:
+            self.peak_hold -= 1
+        else:
+            self.peak = max(self.peak - PEAK_DECAY, self.level)
+
+        self._update_if_changed()
+
+    def reset(self):
+        """レベルとピークを0に戻す（すでに0なら何もしない）"""
+        self.target_level = 0.0
+        self.level = 0.0
+        self.peak = 0.0
+        self.peak_hold = 0
+        self._update_if_changed()
+
+    def _state(self):
+        """描画に必要な状態（点灯本数, ピークの棒, 色）"""
+        lit = sum(1 for i in range(self.num_bars) if self.level > (i + 1) / self.num_bars)
+        peak_bar = int(self.peak * self.num_bars) - 1 if self.peak > 1 / self.num_bars else -1
+        if self.level > 0.7:
+            color = "high"
+        elif self.level > 0.4:
+            color = "mid"
+        else:
+            color = "low"
+        return lit, peak_bar, color
+
+    def _update_if_changed(self):
+        """表示が変わる場合だけ再描画を要求"""
+        state = self._state()
+        if state != self._drawn_state:
+            self._drawn_state = state
+            self.update()
+
+    def paintEvent(self, event):
+        lit, peak_bar, color = self._drawn_state
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setPen(self.border_pen)
+
+        level_brush = self.level_brushes[color]
+        for i, rect in enumerate(self.bar_rects):
+            if i < lit or i == peak_bar:
+                painter.setBrush(level_brush)
+            else:
+                painter.setBrush(self.background_brush)
+            painter.drawRoundedRect(rect, BAR_RADIUS, BAR_RADIUS)
@@ -0,0 +1,239 @@
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import re
+import sys
+import time
+
+from bot import MIN_RECOMMENDATIONS, ClubRecommendationTools, read_json_club_data
+from club_graph import ClubSimilarityGraph
+from club_ranker import IncrementalClubRanker
+from club_resolver import ClubLabelResolver
+
+# --- バッチ推薦用の定数設定 ---
+DEFAULT_LIMIT = 5  # 1人あたりのおすすめ数
+DEFAULT_CHUNK_SIZE = 32  # ワーカーに一度に渡すプロフィール数
+IN_FLIGHT_PER_WORKER = 2  # ワーカーあたりの処理中チャンク数（入力を全部メモリに読まない）
+OUTPUT_FIELDS = ("サークル", "ラベル1", "ラベル２", "活動日時・場所")  # 出力に含めるサークルの項目
+WEEKDAYS = "月火水木金土日"
+
+# 活動日時のテキストに現れる曜日と、「月〜金」「月曜から土曜」のような範囲（前後が漢字でないもの。「日本」「日時」「4月」などは除く）
+# 「月1回」「月に2・3度」の月、「9の付く日」「9の日」の日も曜日ではない（「奇数週の日曜」は日曜）
+WEEKDAY_PATTERN = re.compile(
+    r"(?<![一-龥々0-9０-９])(月(?![0-9０-９に一二三])|(?<![0-9０-９]の)(?<!付く)日|[火水木金土])(?![一-龥々])"
+)
+WEEKDAY_RANGE_PATTERN = re.compile(r"(?<![一-龥々0-9０-９])([月火水木金土日])\s*(?:[〜～~ー-]|から)\s*([月火水木金土日])(?![一-龥々])")
+
+
+def schedule_days(text):
+    """活動日時のテキストから活動する曜日の集合を推定（書かれていなければ空集合）"""
+    if "毎日" in text:
+        return set(WEEKDAYS)
+    days = set()
+    if "平日" in text:
+        days.update(WEEKDAYS[:5])
+    if "週末" in text or "土日" in text:
+        days.update("土日")
+    # 「毎週火・金曜日」→「 火・金 」のように、曜日の前後の語を外してから探す
+    text = re.sub(r"曜日?|毎週|週", " ", text)
+    for first, last in WEEKDAY_RANGE_PATTERN.findall(text):
+        start, end = WEEKDAYS.index(first), WEEKDAYS.index(last)
+        if start <= end:
+            days.update(WEEKDAYS[start : end + 1])
+    days.update(WEEKDAY_PATTERN.findall(text))
+    return days
+
+
+def as_list(value):
+    """プロフィールの項目をリストに（"サッカー" のような1つだけの文字列も1要素のリストに）"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+def profile_days(availability):
+    """プロフィールの空き曜日（"月水金"、["月", "水"]、"平日" など）を集合に（指定なしは None）"""
+    if not availability:
+        return None
+    if not isinstance(availability, str):
+        availability = "・".join(availability)
+    return schedule_days(availability) or None
+
+
+class BatchRecommender:
+    """会話なしで、プロフィールから検索 → 絞り込み → 類似サークルでの補完を行う（ワーカーごとに1つ）"""
+
+    def __init__(self, data_path="./data"):
+        self.club_data = read_json_club_data(data_path)
+        self.resolver = ClubLabelResolver(self.club_data)
+        self.ranker = IncrementalClubRanker(self.club_data)
+        self.club_graph = ClubSimilarityGraph.load(self.club_data, data_path)
+        self.days = {}  # 活動日時のテキスト → 曜日（同じ表記が多いのでキャッシュ）
+
+    def _days(self, club):
+        text = club.get("活動日時・場所", "")
+        days = self.days.get(text)
+        if days is None:
+            days = self.days[text] = schedule_days(text)
+        return days
+
+    def recommend(self, profile, limit=DEFAULT_LIMIT):
+        """1人分のおすすめ（会話での search_clubs_tool → filter_clubs_tool と同じ流れ）"""
+        interests = as_list(profile.get("interests"))
+        subjects = as_list(profile.get("subjects"))
+
+        # 回答の文字起こしの代わりに、興味・学問を1つずつスコアに反映
+        self.ranker.reset()
+        for answer in interests + subjects:
+            self.ranker.update(answer)
+
+        matching_clubs, _ = ClubRecommendationTools.search_clubs(
+            self.club_data,
+            {"clubs_to_search": interests + subjects},
+            resolver=self.resolver,
+            ranker=self.ranker,
+        )
+
+        # 空き曜日と活動日が重なるサークルを優先し、曜日が分からないサークルはその後に
+        available = profile_days(profile.get("availability"))
+        if available is None:
+            chosen = list(range(len(matching_clubs)))
+        else:
+            fits, unknown = [], []
+            for i, club in enumerate(matching_clubs):
+                days = self._days(club)
+                if days & available:
+                    fits.append(i)
+                elif not days:
+                    unknown.append(i)
+            chosen = fits + unknown
+        recommended = ClubRecommendationTools.filter_clubs(matching_clubs, {"clubs_to_choose": chosen[:limit]})
+
+        # 絞り込み結果が少ない場合は類似サークルで補完
+        sources = ["search"] * len(recommended)
+        if self.club_graph and len(recommended) < min(limit, MIN_RECOMMENDATIONS):
+            seeds = recommended or matching_clubs
+            backfill = self.club_graph.expand(
+                seeds, min(limit, MIN_RECOMMENDATIONS) - len(recommended), exclude=recommended
+            )
+            recommended = recommended + backfill
+            sources += ["similar"] * len(backfill)
+
+        return {
+            "id": profile.get("id"),
+            "matched": len(matching_clubs),
+            "recommendations": [
+                dict({field: club.get(field, "") for field in OUTPUT_FIELDS}, source=source)
+                for club, source in zip(recommended, sources)
+            ],
+        }
+
+
+# --- ワーカープロセス ---
+_recommender = None
+
+
+def _init_worker(data_path):
+    """ワーカーの起動時に一度だけサークルデータとインデックスを用意"""
+    global _recommender
+    _recommender = BatchRecommender(data_path)
+
+
+def _recommend_chunk(chunk, limit):
+    """(行番号, 行) のチャンクを処理し、出力レコードのリストを返す"""
+    records = []
+    for line_number, line in chunk:
+        started = time.perf_counter()
+        try:
+            profile = json.loads(line)
+            if not isinstance(profile, dict):
+                raise ValueError("a profile must be a JSON object")
+            profile.setdefault("id", line_number)
+            record = _recommender.recommend(profile, limit)
+        except Exception as e:
+            record = {"id": line_number, "error": f"{type(e).__name__}: {e}"}
+        record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        records.append(record)
+    return records
+
+
+def read_chunks(f, chunk_size):
+    """入力のJSONLを (行番号, 行) のチャンクに分けて順に返す（空行は飛ばす）"""
+    chunk = []
+    for line_number, line in enumerate(f, start=1):
+        if line.strip():
+            chunk.append((line_number, line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(chunks, out, workers, data_path, limit):
+    """チャンクを処理して入力順に書き出し、(プロフィール数, エラー数) を返す"""
+    count = errors = 0
+
+    def write(records):
+        nonlocal count, errors
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+            errors += "error" in record
+
+    if workers == 1:
+        # プロセスを使わずにそのまま実行（デバッグ・1コアでの計測用）
+        _init_worker(data_path)
+        for chunk in chunks:
+            write(_recommend_chunk(chunk, limit))
+        return count, errors
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(data_path,)
+    ) as executor:
+        # 処理中のチャンクを一定数に保ちながら、先頭から順に結果を書き出す
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_recommend_chunk, chunk, limit))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    return count, errors
+
+
+def main():
+    """学生のプロフィール（JSONL）からおすすめサークルをまとめて計算し、JSONLで書き出す"""
+    parser = argparse.ArgumentParser(description="Recommend clubs for a JSONL file of student profiles")
+    parser.add_argument("profiles", help='JSONL, one profile per line: {"id", "interests", "subjects", "availability"}')
+    parser.add_argument("-o", "--output", required=True, help="output JSONL ('-' = stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (1 = in-process)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="recommendations per profile")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="profiles per task")
+    parser.add_argument("--data-path", default="./data")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with open(args.profiles, encoding="utf-8") as f:
+        out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            count, errors = run(read_chunks(f, args.chunk_size), out, args.workers, args.data_path, args.limit)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"Recommended clubs for {count} profiles in {elapsed:.2f}s "
+        f"({count / elapsed:.1f} profiles/s, {args.workers} workers, {errors} errors)",
+        file=sys.stderr,
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,15 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import csv
+import logging
 from collections import defaultdict
 
-from utils.chataudioclient import ChatAudioClient
+from club_graph import ClubSimilarityGraph
+from club_ranker import IncrementalClubRanker
+from club_resolver import ClubLabelResolver
+from utils.chataudioclient import ChatAudioClient, parse_deadlines
+
+logger = logging.getLogger(__name__)
 
 # システム指示の定数定義
 SYSTEM_INSTRUCTION = """
@@ -29,6 +35,8 @@ SYSTEM_INSTRUCTION = """
 
         5. 生徒がOKしてくれたら、search_clubs_tool を呼び出してください。その直後に、学生のスケジュールや活動内容も考慮して、さらにのサークルを絞り込むために filter_clubs_tool をすぐに呼び出してください。サークルが見つかったら、「あなたにぴったりのサークルが見つかりました！画面に表示されたサークル情報をご確認ください。」と伝えてください。
 
+        6. 生徒がもっと他のサークルも見たいと言ったら、similar_clubs_tool を呼び出して、表示中のサークルに似たサークルを追加してください。
+
         最初は自己紹介をしてから、生徒のことを知るための1つ目の質問をしてください。
 """
 
@@ -52,10 +60,10 @@ def read_json_club_data(path):
                             grouped_data[label2].append(row)
                     return dict(grouped_data)
             except Exception as e:
-                print(f"Error reading {file_path}: {e}")
+                logger.error("Error reading %s: %s", file_path, e)
                 return {}
 
-    print("No CSV file found in data directory.")
+    logger.error("No CSV file found in data directory.")
     return {}
 
 
@@ -70,10 +78,14 @@ def clean_club_names(club_names):
             decoded = encoded.decode("utf-8")
             cleaned.append(decoded)
         except UnicodeDecodeError:
-            print(f"Skipping invalid UTF-8 club name: {name}")
+            logger.warning("Skipping invalid UTF-8 club name: %s", name)
     return cleaned
 
 
+# おすすめとして最低限表示したいサークル数（足りない場合は類似サークルで補完）
+MIN_RECOMMENDATIONS = 3
+
+
 class ClubRecommendationTools:
     """サークル推薦用のツール群"""
 
@@ -125,27 +137,73 @@ class ClubRecommendationTools:
         return filter_clubs_tool
 
     @staticmethod
-    def make_tools(available_clubs):
+    def make_similar_clubs_tool():
+        """類似サークル検索ツールの定義を作成"""
+        similar_clubs_tool = {
+            "name": "similar_clubs_tool",
+            "description": "指定したサークルに似ているサークルを探して、おすすめに追加します。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "club_names": {
+                        "type": "array",
+                        "items": {
+                            "type": "string",
+                        },
+                        "description": "似ているサークルを探したいサークルの名前。",
+                    },
+                    "count": {
+                        "type": "integer",
+                        "description": "追加するサークルの数。",
+                    },
+                },
+                "required": ["club_names"],
+            },
+        }
+
+        return similar_clubs_tool
+
+    @staticmethod
+    def make_tools(available_clubs, include_similar=False):
         """ツール一覧を作成"""
         tools = []
         tools.append(ClubRecommendationTools.make_search_clubs_tool(available_clubs))
         tools.append(ClubRecommendationTools.make_filter_clubs_tool())
+        if include_similar:
+            tools.append(ClubRecommendationTools.make_similar_clubs_tool())
         return tools
 
     @staticmethod
-    def search_clubs(club_data, tool_args):
+    def search_clubs(club_data, tool_args, resolver=None, ranker=None):
         """サークル検索を実行"""
-        print("Arguments:")
-        print(tool_args)
+        logger.debug("search_clubs args: %s", tool_args)
 
         clubs_to_search = tool_args.get("clubs_to_search", [])
         matching_clubs = []
+        searched = set()
 
         for club in clubs_to_search:
             if club in club_data:
-                matching_clubs.extend(club_data[club])
+                labels = [club]
+            elif resolver is not None:
+                # 表記ゆれ・類義語をデータ上のラベルに解決
+                labels = resolver.resolve(club)
+                if labels:
+                    logger.debug("Club %s resolved to %s.", club, labels)
             else:
-                print(f"Club {club} not found in club data.")
+                labels = []
+
+            if not labels:
+                logger.info("Club %s not found in club data.", club)
+
+            for label in labels:
+                if label not in searched:
+                    searched.add(label)
+                    matching_clubs.extend(club_data[label])
+
+        if ranker is not None:
+            # 会話中に更新済みのスコアで並べ替え、見つからなければ事前の候補を使う
+            matching_clubs = ranker.rank(matching_clubs) if matching_clubs else ranker.top_clubs()
 
         result_lines = []
         for i, club in enumerate(matching_clubs):
@@ -160,14 +218,13 @@ class ClubRecommendationTools:
             result_lines.append("-" * 40)
 
         result_str = "\n".join(result_lines).strip() + "\n"
-        print(result_str)
+        logger.debug("search_clubs result:\n%s", result_str)
         return matching_clubs, result_str
 
     @staticmethod
     def filter_clubs(founded_clubs, tool_args):
         """サークルフィルタリングを実行"""
-        print(tool_args)
-        print("Filtering clubs...")
+        logger.debug("filter_clubs args: %s", tool_args)
 
         clubs_to_choose = tool_args.get("clubs_to_choose", [])
         filtered_clubs = []
@@ -176,18 +233,61 @@ class ClubRecommendationTools:
             if 0 <= club_index < len(founded_clubs):
                 filtered_clubs.append(founded_clubs[club_index])
             else:
-                print(f"Invalid club index: {club_index}")
+                logger.info("Invalid club index: %s", club_index)
 
         return filtered_clubs
 
+    @staticmethod
+    def similar_clubs(club_graph, tool_args, exclude=()):
+        """類似サークル検索を実行（事前計算済みグラフを参照するだけ）"""
+        logger.debug("similar_clubs args: %s", tool_args)
+
+        seeds = []
+        for name in tool_args.get("club_names", []):
+            i = club_graph.index.get(name)
+            if i is None:
+                logger.info("Club %s not found in similarity graph.", name)
+            else:
+                seeds.append(club_graph.clubs[i])
+
+        count = tool_args.get("count", MIN_RECOMMENDATIONS)
+        return club_graph.expand(seeds, count, exclude=exclude)
+
 
 class ClubRecommendationBot(ChatAudioClient):
     """サークル推薦Bot"""
 
-    def __init__(self, api_key, club_data, tools=[], system_instruction=""):
-        super().__init__(api_key, tools=tools, system_instruction=system_instruction)
+    def __init__(
+        self,
+        api_key,
+        club_data,
+        tools=[],
+        system_instruction="",
+        club_graph=None,
+        audio_process=False,
+        clip_dir=None,
+        clip_threshold=0.7,
+        profile_turns=0,
+        admission_addr=None,
+        deadlines=None,
+    ):
+        super().__init__(
+            api_key,
+            tools=tools,
+            system_instruction=system_instruction,
+            audio_process=audio_process,
+            clip_dir=clip_dir,
+            clip_threshold=clip_threshold,
+            profile_turns=profile_turns,
+            admission_addr=admission_addr,
+            deadlines=deadlines,
+        )
         self.club_data = club_data
+        self.resolver = ClubLabelResolver(club_data)
+        self.club_graph = club_graph
+        self.ranker = IncrementalClubRanker(club_data)
         self.matching_clubs = None
+        self.recommended_clubs = []
         self.ui_widget = None
         
         # 質問進捗管理
@@ -196,10 +296,10 @@ class ClubRecommendationBot(ChatAudioClient):
 
     def set_ui_widget(self, ui_widget):
         """UIウィジェットを設定し、コールバックを登録"""
-        print(f"[DEBUG] Setting UI widget: {ui_widget is not None}")
+        logger.debug("Setting UI widget: %s", ui_widget is not None)
         self.ui_widget = ui_widget
         self.set_ui_callback(self.handle_ui_event)
-        print(f"[DEBUG] UI widget set successfully: {self.ui_widget is not None}")
+        logger.debug("UI widget set successfully: %s", self.ui_widget is not None)
 
     def handle_ui_event(self, event, data=None):
         """UIイベントハンドラー"""
@@ -209,6 +309,9 @@ class ClubRecommendationBot(ChatAudioClient):
         # 音声レベル更新イベントを処理
         if event == "audio_level_update" and data is not None:
             self.ui_widget.update_audio_level(data)
+        # 状態遷移イベントをUIスレッドに転送
+        elif event == "state_changed":
+            self.ui_widget.receive_chatbot_state(data)
 
     def increment_question_count(self):
         """質問回数をインクリメント"""
@@ -229,53 +332,121 @@ class ClubRecommendationBot(ChatAudioClient):
     #     # 実行状態をリセット
     #     self.running = True
 
+    def _show_recommendations(self, clubs):
+        """おすすめサークルをUIに送り、モデルへの結果文字列を作成"""
+        # UIにサークル情報を表示（Signalを使用）
+        if self.ui_widget:
+            logger.debug("About to display %d clubs on UI using Signal", len(clubs))
+            try:
+                # Signalを使ってメインスレッドで確実に実行
+                self.ui_widget.receive_club_data(clubs)
+                logger.debug("UI update via Signal sent successfully")
+            except Exception as e:
+                logger.warning("Error sending UI update via Signal: %s", e)
+        else:
+            logger.warning("UI widget is None - cannot display results")
+
+        # 結果の文字列を作成
+        result_lines = []
+        for i, club in enumerate(clubs):
+            result_lines.append(f"選択されたサークル {i + 1}: {club.get('サークル', 'N/A')}")
+
+        result_str = f"選択されたサークル数: {len(clubs)}\n" + "\n".join(result_lines)
+        logger.debug("Returning result: %s", result_str)
+        return result_str
+
+    def on_input_transcription(self, text):
+        """学生の回答の文字起こしで候補サークルのスコアを更新"""
+        logger.info("User transcript: %s", text)
+        self.ranker.update(text)
+        logger.debug("Ranker shortlist: %d clubs after %d answers", len(self.ranker.shortlist), self.ranker.num_answers)
+
+    def _reset_states(self):
+        """ステートをリセット（来場者ごとの候補スコアも含む）"""
+        super()._reset_states()
+        self.ranker.reset()
+
     def call_tool(self, tool_name, tool_args):
         """ツール実行"""
-        print(f"[DEBUG] Tool called: {tool_name}")
-        print(f"[DEBUG] Tool args: {tool_args}")
-        print(f"[DEBUG] UI widget exists: {self.ui_widget is not None}")
+        logger.info("Tool called: %s", tool_name)
+        logger.debug("Tool args: %s (UI widget exists: %s)", tool_args, self.ui_widget is not None)
 
         if tool_name == "search_clubs_tool":
-            self.matching_clubs, result_str = ClubRecommendationTools.search_clubs(self.club_data, tool_args)
-            print(f"[DEBUG] Search result: Found {len(self.matching_clubs)} clubs")
+            self.matching_clubs, result_str = ClubRecommendationTools.search_clubs(
+                self.club_data, tool_args, resolver=self.resolver, ranker=self.ranker
+            )
+            logger.info("Search result: Found %d clubs", len(self.matching_clubs))
+            self.recommended_clubs = []
+
+            # 絞り込みを待たずに検索結果をUIに表示
+            if self.ui_widget and self.matching_clubs:
+                try:
+                    self.ui_widget.receive_search_results(self.matching_clubs)
+                except Exception as e:
+                    logger.warning("Error sending search results via Signal: %s", e)
             return result_str
         elif tool_name == "filter_clubs_tool":
             if self.matching_clubs:
                 filtered_clubs = ClubRecommendationTools.filter_clubs(self.matching_clubs, tool_args)
-                print(f"[DEBUG] Filter result: {len(filtered_clubs)} clubs after filtering")
-
-                # UIにサークル情報を表示（Signalを使用）
-                if self.ui_widget:
-                    print(f"[DEBUG] About to display {len(filtered_clubs)} clubs on UI using Signal")
-                    try:
-                        # Signalを使ってメインスレッドで確実に実行
-                        self.ui_widget.receive_club_data(filtered_clubs)
-                        print("[DEBUG] UI update via Signal sent successfully")
-                    except Exception as e:
-                        print(f"[DEBUG] Error sending UI update via Signal: {e}")
-                else:
-                    print("[DEBUG] UI widget is None - cannot display results")
-
-                # 結果の文字列を作成
-                result_lines = []
-                for i, club in enumerate(filtered_clubs):
-                    result_lines.append(f"選択されたサークル {i + 1}: {club.get('サークル', 'N/A')}")
-
-                result_str = f"選択されたサークル数: {len(filtered_clubs)}\n" + "\n".join(result_lines)
-                print(f"[DEBUG] Returning result: {result_str}")
-                return result_str
+                logger.info("Filter result: %d clubs after filtering", len(filtered_clubs))
+
+                # 絞り込み結果が少ない場合は類似サークルで補完
+                if self.club_graph and len(filtered_clubs) < MIN_RECOMMENDATIONS:
+                    seeds = filtered_clubs or self.matching_clubs
+                    backfill = self.club_graph.expand(
+                        seeds, MIN_RECOMMENDATIONS - len(filtered_clubs), exclude=filtered_clubs
+                    )
+                    logger.info("Backfilled %d similar clubs", len(backfill))
+                    filtered_clubs = filtered_clubs + backfill
+
+                self.recommended_clubs = filtered_clubs
+                return self._show_recommendations(filtered_clubs)
             else:
-                print("[DEBUG] No matching clubs found")
+                logger.info("No matching clubs found")
                 return "サークルが見つかりませんでした。"
-
-        print(f"[DEBUG] Unknown tool: {tool_name}")
+        elif tool_name == "similar_clubs_tool":
+            if self.club_graph:
+                similar_clubs = ClubRecommendationTools.similar_clubs(
+                    self.club_graph, tool_args, exclude=self.recommended_clubs
+                )
+                logger.info("Similar result: %d clubs", len(similar_clubs))
+                if similar_clubs:
+                    self.recommended_clubs = self.recommended_clubs + similar_clubs
+                    return self._show_recommendations(self.recommended_clubs)
+            logger.info("No similar clubs found")
+            return "似ているサークルが見つかりませんでした。"
+
+        logger.warning("Unknown tool: %s", tool_name)
         return ""
 
     @staticmethod
-    def create_bot_instance(api_key, data_path="./data"):
-        """Botインスタンスを作成するファクトリーメソッド"""
-        club_data = read_json_club_data(data_path)
+    def create_bot_instance(api_key, data_path="./data", club_data=None):
+        """Botインスタンスを作成するファクトリーメソッド（読み込み済みの club_data も渡せる）"""
+        if club_data is None:
+            club_data = read_json_club_data(data_path)
         cleaned_club_names = clean_club_names(club_data.keys())
-        tools = ClubRecommendationTools.make_tools(cleaned_club_names)
-
-        return ClubRecommendationBot(api_key, club_data=club_data, tools=tools, system_instruction=SYSTEM_INSTRUCTION)
+        club_graph = ClubSimilarityGraph.load(club_data, data_path)
+        tools = ClubRecommendationTools.make_tools(cleaned_club_names, include_similar=club_graph is not None)
+
+        bot = ClubRecommendationBot(
+            api_key,
+            club_data=club_data,
+            tools=tools,
+            system_instruction=SYSTEM_INSTRUCTION,
+            club_graph=club_graph,
+            # AUDIO_PROCESS=1 で録音・再生を別プロセスで行う（UIの負荷で音が途切れないように）
+            audio_process=os.getenv("AUDIO_PROCESS") == "1",
+            # 応答の最初の音声が CLIP_THRESHOLD_SEC 秒以内に届かなければ、挨拶・つなぎのクリップを再生
+            # （CSV・グラフと同じく、data_path はこのファイルのディレクトリからの相対パス）
+            clip_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), data_path, "clips"),
+            clip_threshold=float(os.getenv("CLIP_THRESHOLD_SEC", "0.7")),
+            # PROFILE_TURNS=N で最初のNターンをプロファイル（実行中は python -m utils.turnprofiler profile N）
+            profile_turns=int(os.getenv("PROFILE_TURNS", "0")),
+            # ADMISSION_ADDR=host:port で、同じAPIキーを使うブース間のセッション数を調整（python -m utils.admission serve）
+            admission_addr=os.getenv("ADMISSION_ADDR") or None,
+            # TURN_DEADLINES=first_chunk=8,turn=45 のように、ターンの各段階の締め切り（秒）を変更
+            deadlines=parse_deadlines(os.getenv("TURN_DEADLINES")),
+        )
+        # ランカーの索引はここ（起動スレッド）で作る。最初の回答の update() でイベントループを止めないように
+        bot.ranker.build_index()
+        return bot
@@ -1,16 +1,35 @@
 from PySide6 import QtCore, QtWidgets, QtSvgWidgets, QtGui
-from PySide6.QtGui import QPainter, QLinearGradient, QColor, QPixmap
-from PySide6.QtCore import QPoint, Qt
+from PySide6.QtGui import QPainter, QLinearGradient, QColor
+from PySide6.QtCore import QPoint
+import logging
 import os
 import random
+import threading
+import time
+
+from audio_level_meter import AudioLevelMeter
+from club_list_view import ClubListView
+from diagnostics_overlay import DiagnosticsOverlay
+from image_cache import BackgroundImageCache, ClubSpriteCache
+
+from utils.watchdog import get_watchdog
+
+logger = logging.getLogger(__name__)
 
 # --- 音声レベル表示用の定数設定 ---
 NUM_BARS = 20         # 表示する棒グラフの数
 
+# --- 診断用の定数設定 ---
+DIAGNOSTICS_SHORTCUT = "Ctrl+Shift+D"  # 診断オーバーレイの表示切り替え（隠しショートカット）
+
 
 class ChatUI(QtWidgets.QWidget):
     # Signal for club data display
     club_data_received = QtCore.Signal(list)
+    # Signal for search results shown before filtering
+    search_results_received = QtCore.Signal(list)
+    # Signal for chatbot state transitions (emitted from the chatbot thread, handled on the UI thread)
+    chatbot_state_changed = QtCore.Signal(object)
 
     def __init__(self, chatbot):
         super().__init__()
@@ -20,14 +39,19 @@ class ChatUI(QtWidgets.QWidget):
 
         # Connect the signal to the display method
         self.club_data_received.connect(self.display_club_info_modal)
+        self.search_results_received.connect(self.display_search_results)
+
+        # サークル情報モーダル（検索結果の表示中は開いたまま絞り込み結果で更新）
+        self.club_results_final = False
+        self.club_modal = self._create_club_modal()
 
         # 音声レベル表示の初期化（チャットボットから音声レベルを受け取る）
         self.setup_audio_waveform()
 
-        # チャットボットの状態変化を監視するタイマー
-        self.status_timer = QtCore.QTimer()
-        self.status_timer.timeout.connect(self.update_status)
-        self.status_timer.start(100)  # 100ms間隔で更新
+        # チャットボットの状態変化を受け取ったときだけUIを更新
+        self.chatbot_state_changed.connect(self.update_status)
+        # 最後に反映した表示状態（変化がなければ何もしない）
+        self._applied_view = None
         
         # 質問進捗管理
         self.total_questions = 5  # 実際の質問数（挨拶は除く）
@@ -39,6 +63,9 @@ class ChatUI(QtWidgets.QWidget):
         # 前回の状態を記録（画像表示タイミング判定用）
         self.previous_status = None
 
+        # 初期状態を反映
+        self.update_status()
+
     def setup_random_images(self):
         """ランダム画像表示の初期化"""
         # 画像フォルダのパス
@@ -51,6 +78,15 @@ class ChatUI(QtWidgets.QWidget):
                 if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
                     self.available_images.append(filename)
         
+        # 縮小・回転済みの画像を起動時にバックグラウンドで用意
+        # SPRITE_CACHE_DIR を設定すると、用意した画像をディスクにも保存して次回起動時に再利用
+        self.club_sprites = ClubSpriteCache(
+            self.club_images_path, self.available_images, cache_dir=os.getenv("SPRITE_CACHE_DIR"), parent=self
+        )
+
+        # UIスレッドの停止を検出するウォッチドッグと診断オーバーレイ
+        self.setup_diagnostics()
+        
         # 表示位置の定義（右上、右下、左下）
         self.display_positions = ['top-right', 'bottom-right', 'bottom-left']
         self.used_positions = []  # 使用済み位置を記録
@@ -78,21 +114,9 @@ class ChatUI(QtWidgets.QWidget):
         if self.waveform_timer.isActive():
             self.waveform_timer.stop()
         
-        # すべてのバーをリセット
-        if hasattr(self, 'audio_bars'):
-            for bar in self.audio_bars:
-                bar.setValue(0)
-                bar.setStyleSheet("""
-                    QProgressBar {
-                        background-color: #2c3e50;
-                        border: 1px solid #34495e;
-                        border-radius: 3px;
-                    }
-                    QProgressBar::chunk {
-                        background-color: #2c3e50;
-                        border-radius: 2px;
-                    }
-                """)
+        # メーターをリセット（すでに0なら再描画しない）
+        if hasattr(self, 'audio_meter'):
+            self.audio_meter.reset()
         self.audio_level = 0.0
 
     def show_random_club_image(self):
@@ -115,27 +139,22 @@ class ChatUI(QtWidgets.QWidget):
         
         # ランダムに画像を選択
         random_image = random.choice(available_images)
+
+        # 縮小・回転済みの画像をキャッシュから取得（ランダムな角度）
+        # 読み込めなかった画像では位置を使わない（displayed_image_widgets と used_positions の対応を保つ）
+        sprite = self.club_sprites.get(random_image)
+        if sprite is None:
+            return
+        rotation_angle, rotated_pixmap = sprite
         self.used_images.append(random_image)
-        image_path = os.path.join(self.club_images_path, random_image)
         
         # 未使用の位置からランダムに選択
         available_positions = [pos for pos in self.display_positions if pos not in self.used_positions]
         position = random.choice(available_positions)
         self.used_positions.append(position)
-        
+
         # 画像ウィジェットを作成
         image_widget = QtWidgets.QLabel(self)
-        pixmap = QtGui.QPixmap(image_path)
-        
-        # 画像サイズを調整（180x180ピクセル）
-        scaled_pixmap = pixmap.scaled(180, 180, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
-        
-        # ランダムな角度で回転（-30度から30度）
-        rotation_angle = random.uniform(-15, 15)
-        transform = QtGui.QTransform()
-        transform.rotate(rotation_angle)
-        rotated_pixmap = scaled_pixmap.transformed(transform, QtCore.Qt.SmoothTransformation)
-        
         image_widget.setPixmap(rotated_pixmap)
         # 回転後のサイズに合わせて調整
         image_widget.setFixedSize(rotated_pixmap.size())
@@ -155,7 +174,7 @@ class ChatUI(QtWidgets.QWidget):
         # 表示中のウィジェットリストに追加
         self.displayed_image_widgets.append(image_widget)
         
-        print(f"[DEBUG] Displayed club image: {random_image} at position: {position} with rotation: {rotation_angle:.1f}°")
+        logger.debug("Displayed club image: %s at position: %s with rotation: %.1f°", random_image, position, rotation_angle)
 
     def position_image_widget(self, widget, position):
         """画像ウィジェットを指定位置に配置"""
@@ -182,7 +201,7 @@ class ChatUI(QtWidgets.QWidget):
         self.displayed_image_widgets.clear()
         self.used_positions.clear()
         self.used_images.clear()  # 使用済み画像もクリア
-        print("[DEBUG] Cleared all club images")
+        logger.debug("Cleared all club images")
 
     def update_audio_level(self, level):
         """チャットボットから音声レベルを受け取る"""
@@ -193,45 +212,10 @@ class ChatUI(QtWidgets.QWidget):
         pass
 
     def update_audio_bars(self):
-        """音声レベルバーを更新する関数"""
-        if hasattr(self, 'audio_bars'):
-            # 各バーの高さを音声レベルに応じて設定
-            for i, bar in enumerate(self.audio_bars):
-                # 各バーが異なるしきい値で反応するように設定
-                threshold = (i + 1) / NUM_BARS
-                if self.audio_level > threshold:
-                    # 音声レベルが高いほど緑色に、低いほど青色に
-                    if self.audio_level > 0.7:
-                        color = "#e74c3c"  # 赤
-                    elif self.audio_level > 0.4:
-                        color = "#f39c12"  # オレンジ
-                    else:
-                        color = "#3498db"  # 青
-                    bar.setStyleSheet(f"""
-                        QProgressBar {{
-                            background-color: #2c3e50;
-                            border: 1px solid #34495e;
-                            border-radius: 3px;
-                        }}
-                        QProgressBar::chunk {{
-                            background-color: {color};
-                            border-radius: 2px;
-                        }}
-                    """)
-                    bar.setValue(100)
-                else:
-                    bar.setStyleSheet("""
-                        QProgressBar {
-                            background-color: #2c3e50;
-                            border: 1px solid #34495e;
-                            border-radius: 3px;
-                        }
-                        QProgressBar::chunk {
-                            background-color: #2c3e50;
-                            border-radius: 2px;
-                        }
-                    """)
-                    bar.setValue(0)
+        """音声レベルメーターを1ティック進める"""
+        if hasattr(self, 'audio_meter'):
+            self.audio_meter.set_level(self.audio_level)
+            self.audio_meter.advance()
 
     def update_waveform(self):
         """波形プロットを更新する関数（互換性のため残す）"""
@@ -326,37 +310,9 @@ class ChatUI(QtWidgets.QWidget):
         audio_title.setStyleSheet("font-size: 16px; color: #cccccc; margin-bottom: 10px; background-color: transparent;")
         audio_layout.addWidget(audio_title)
         
-        # 音声レベルバーのコンテナ
-        bars_container = QtWidgets.QWidget()
-        bars_layout = QtWidgets.QHBoxLayout(bars_container)
-        bars_layout.setSpacing(3)
-        bars_layout.setContentsMargins(0, 0, 0, 0)
-        
-        # 複数の縦棒グラフを作成
-        self.audio_bars = []
-        for i in range(NUM_BARS):
-            bar = QtWidgets.QProgressBar()
-            bar.setOrientation(QtCore.Qt.Vertical)
-            bar.setFixedSize(15, 80)
-            bar.setMinimum(0)
-            bar.setMaximum(100)
-            bar.setValue(0)
-            bar.setTextVisible(False)
-            bar.setStyleSheet("""
-                QProgressBar {
-                    background-color: #2c3e50;
-                    border: 1px solid #34495e;
-                    border-radius: 3px;
-                }
-                QProgressBar::chunk {
-                    background-color: #2c3e50;
-                    border-radius: 2px;
-                }
-            """)
-            self.audio_bars.append(bar)
-            bars_layout.addWidget(bar)
-        
-        audio_layout.addWidget(bars_container)
+        # 音声レベルメーター（複数の縦棒をまとめて描画）
+        self.audio_meter = AudioLevelMeter(NUM_BARS)
+        audio_layout.addWidget(self.audio_meter, alignment=QtCore.Qt.AlignCenter)
         self.layout.addWidget(audio_container)
 
 
@@ -416,9 +372,6 @@ class ChatUI(QtWidgets.QWidget):
         # 初回状態かどうかを示すフラグ
         self.is_first_interaction = True
         
-        # 録音停止直後の処理待ち状態フラグ
-        self.is_processing_after_recording = False
-        
         # マイクアイコンを読み込み
         self.setup_mic_icon()
         
@@ -426,24 +379,24 @@ class ChatUI(QtWidgets.QWidget):
         self.setup_background_image()
 
     def setup_background_image(self):
-        """背景画像を読み込み"""
+        """背景画像を読み込み（デコードはバックグラウンドで、ウィンドウサイズに縮小して行う）"""
         background_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "picture", "background3.png")
         if os.path.exists(background_path):
-            self.background = QPixmap(background_path)
+            self.background = BackgroundImageCache(background_path, self)
+            self.background.ready.connect(self.update)
         else:
-            # 画像が見つからない場合は空のPixmapを設定
-            self.background = QPixmap()
-            print(f"背景画像が見つかりません: {background_path}")
+            # 画像が見つからない場合はグラデーションを描画
+            self.background = None
+            logger.warning("背景画像が見つかりません: %s", background_path)
 
     def paintEvent(self, event):
         """背景画像またはグラデーションを描画"""
+        start = time.perf_counter()
         painter = QPainter(self)
         
-        if not self.background.isNull():
-            # 背景画像がある場合は画像を描画
-            # ウィンドウサイズに合わせて拡大縮小
-            scaled = self.background.scaled(self.size(), Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-            painter.drawPixmap(0, 0, scaled)
+        if self.background is not None and self.background.draw(painter, self.rect()):
+            # 縮小済みの背景画像をそのまま描画
+            pass
         else:
             # 背景画像がない場合はグラデーションを描画
             gradient = QLinearGradient(QPoint(0, 0), QPoint(0, self.height()))
@@ -451,6 +404,34 @@ class ChatUI(QtWidgets.QWidget):
             gradient.setColorAt(1, QColor("#3e0000"))   # 下部の色
             painter.fillRect(self.rect(), gradient)
 
+        painter.end()
+        self.watchdog.histogram("paint").record((time.perf_counter() - start) * 1000)
+
+    def setup_diagnostics(self):
+        """Qtイベントループの遅延計測と、診断オーバーレイの準備"""
+        self.watchdog = get_watchdog()
+        interval = self.watchdog.watch("qt", threading.get_ident())
+
+        # タイマーが予定よりどれだけ遅れて呼ばれたかを記録（間隔はウォッチドッグが決める：普段は低頻度）
+        self._ui_probe_expected = time.perf_counter() + interval
+        self.ui_probe_timer = QtCore.QTimer(self)
+        self.ui_probe_timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.ui_probe_timer.timeout.connect(self._on_ui_probe)
+        self.ui_probe_timer.start(round(interval * 1000))
+
+        self.diagnostics_overlay = DiagnosticsOverlay(self.watchdog, self)
+        self.diagnostics_overlay.move(10, 10)
+        shortcut = QtGui.QShortcut(QtGui.QKeySequence(DIAGNOSTICS_SHORTCUT), self)
+        shortcut.activated.connect(self.diagnostics_overlay.toggle)
+
+    def _on_ui_probe(self):
+        now = time.perf_counter()
+        interval = self.watchdog.beat("qt", max(0.0, now - self._ui_probe_expected) * 1000)
+        self._ui_probe_expected = now + interval
+        interval_ms = round(interval * 1000)
+        if self.ui_probe_timer.interval() != interval_ms:
+            self.ui_probe_timer.setInterval(interval_ms)
+
     def setup_mic_icon(self):
         """マイクアイコンとサウンドアイコンを読み込み"""
         # マイクアイコンを読み込み
@@ -485,8 +466,24 @@ class ChatUI(QtWidgets.QWidget):
             self.button.setText(text)
 
     def update_status(self):
-        """チャットボットの状態に応じてUIを更新"""
-        if self.clubs_displayed:
+        """チャットボットの状態に応じてUIを更新（表示状態が変わったときだけ反映）"""
+        view = self._get_current_view()
+        if view == self._applied_view:
+            return
+        self._applied_view = view
+        status, _, wait = view
+
+        if status == "loading":
+            # 起動直後、チャットボットの準備ができるまで
+            self.status_icon.setText("[準備中]")
+            self.status_icon.setStyleSheet("font-size: 20px; font-weight: bold; color: #9b59b6; padding: 10px; background-color: transparent;")
+            self.status_text.setText("ワセクラを準備しています...")
+            self.status_text.setStyleSheet("font-size: 20px; color: #9b59b6; padding: 10px; background-color: transparent;")
+            self.button.setEnabled(False)  # 準備中はボタン無効
+            self._set_button_content(text="...")
+            self._set_button_instruction_text("準備ができるまで少しお待ちください")
+            self._update_button_disabled_style()
+        elif status == "completed":
             # サークル情報が表示されている時は終了ボタンとして表示
             self.status_icon.setText("[完了]")
             self.status_icon.setStyleSheet("font-size: 20px; font-weight: bold; color: #27ae60; padding: 10px; background-color: transparent;")
@@ -496,7 +493,21 @@ class ChatUI(QtWidgets.QWidget):
             self._set_button_content(text="リセット")
             self._set_button_instruction_text("アプリを終了するにはボタンをクリックしてください")
             self._update_exit_button_style()
-        elif self.chatbot.is_recording:
+        elif status == "queued":
+            # 混雑時：空きが出るまでボタン無効、目安の待ち時間を表示
+            self.status_icon.setText("[混雑中]")
+            self.status_icon.setStyleSheet("font-size: 20px; font-weight: bold; color: #e67e22; padding: 10px; background-color: transparent;")
+            if wait:
+                self.status_text.setText(f"ただいま混雑中です（あと約{wait}秒）")
+            else:
+                self.status_text.setText("ただいま混雑中です")
+            self.status_text.setStyleSheet("font-size: 20px; color: #e67e22; padding: 10px; background-color: transparent;")
+            self.button.setEnabled(False)  # 空き待ちの間はボタン無効
+            self._set_button_content(text="...")
+            self._set_button_instruction_text("順番が来るまで少しお待ちください")
+            self._update_button_disabled_style()
+            self.stop_audio_stream()
+        elif status == "recording":
             self.status_icon.setText("[録音中]")
             self.status_icon.setStyleSheet("font-size: 20px; font-weight: bold; color: #e74c3c; padding: 10px; background-color: transparent;")
             self.status_text.setText("録音中... 話してください")
@@ -507,7 +518,7 @@ class ChatUI(QtWidgets.QWidget):
             self._update_recording_button_style()
             # 録音中は音声レベル表示を開始
             self.start_audio_stream()
-        elif hasattr(self.chatbot, "is_speaking") and self.chatbot.is_speaking:
+        elif status == "speaking":
             self.status_icon.setText("[ワセクラ発話中]")
             self.status_icon.setStyleSheet("font-size: 20px; font-weight: bold; color: #27ae60; padding: 10px; background-color: transparent;")
             self.status_text.setText("ワセクラが話しています...")
@@ -518,21 +529,8 @@ class ChatUI(QtWidgets.QWidget):
             self._update_button_disabled_style()
             # 発話中は音声レベル表示を停止
             self.stop_audio_stream()
-        elif hasattr(self.chatbot, "is_processing") and self.chatbot.is_processing:
-            self.status_icon.setText("[処理中]")
-            self.status_icon.setStyleSheet("font-size: 20px; font-weight: bold; color: #9b59b6; padding: 10px; background-color: transparent;")
-            self.status_text.setText("ワセクラが考え中...")
-            self.status_text.setStyleSheet("font-size: 20px; color: #9b59b6; padding: 10px; background-color: transparent;")
-            self.button.setEnabled(False)  # 処理中はボタン無効
-            self._set_button_content(text="...")
-            self._set_button_instruction_text("ワセクラが処理中です... しばらくお待ちください")
-            self._update_button_disabled_style()
-            # 処理中は音声レベル表示を停止
-            self.stop_audio_stream()
-            # 実際の処理状態になったら録音停止後フラグをリセット
-            self.is_processing_after_recording = False
-        elif self.is_processing_after_recording:
-            # 録音停止直後の処理待ち状態
+        elif status == "processing":
+            # 録音停止直後から応答が始まるまで
             self.status_icon.setText("[処理中]")
             self.status_icon.setStyleSheet("font-size: 20px; font-weight: bold; color: #9b59b6; padding: 10px; background-color: transparent;")
             self.status_text.setText("ワセクラが考え中...")
@@ -543,7 +541,7 @@ class ChatUI(QtWidgets.QWidget):
             self._update_button_disabled_style()
             # 処理中は音声レベル表示を停止
             self.stop_audio_stream()
-        elif self.chatbot.is_listening and not self.chatbot.is_recording:
+        elif status == "listening":
             self.status_icon.setText("[待機]")
             self.status_icon.setStyleSheet("font-size: 20px; font-weight: bold; color: #f39c12; padding: 10px; background-color: transparent;")
             self.status_text.setText("音声待機中...")
@@ -582,22 +580,33 @@ class ChatUI(QtWidgets.QWidget):
         
         self.previous_status = current_status
 
-    def _get_current_status(self):
-        """現在の状態を文字列で返す"""
-        if self.clubs_displayed:
-            return "completed"
+    def _get_current_view(self):
+        """表示状態（状態名, 初回かどうか, 混雑時の待ち時間）を返す"""
+        if self.chatbot is None:
+            status = "loading"
+        elif self.clubs_displayed:
+            status = "completed"
+        elif getattr(self.chatbot, "is_queued", False):
+            # 他のブースが使用中で、セッションの空き待ち（待ち時間が変わるたびに表示を更新）
+            return "queued", self.is_first_interaction, self.chatbot.expected_wait
         elif self.chatbot.is_recording:
-            return "recording"
-        elif hasattr(self.chatbot, "is_speaking") and self.chatbot.is_speaking:
-            return "speaking"
-        elif hasattr(self.chatbot, "is_processing") and self.chatbot.is_processing:
-            return "processing"
-        elif self.is_processing_after_recording:
-            return "processing"
-        elif self.chatbot.is_listening and not self.chatbot.is_recording:
-            return "waiting"
+            status = "recording"
+        elif self.chatbot.is_speaking:
+            status = "speaking"
+        elif self.chatbot.is_processing:
+            status = "processing"
+        elif self.chatbot.is_listening:
+            status = "listening"
         else:
+            status = "idle"
+        return status, self.is_first_interaction, None
+
+    def _get_current_status(self):
+        """現在の状態を文字列で返す"""
+        status, _, _ = self._get_current_view()
+        if status in ("listening", "idle"):
             return "waiting"
+        return status
 
     def _update_button_disabled_style(self):
         """ボタンが無効な時のスタイルを設定"""
@@ -628,9 +637,10 @@ class ChatUI(QtWidgets.QWidget):
         self.chatbot.reset_question_count()
         self.clear_club_images()
         self.clubs_displayed=False
-        self.chatbot.running=False
+        self.club_list_view.clear()
+        self.chatbot.reset()  # 録音・受信・再生をまとめてキャンセルし、新しいセッションを開始
         self.is_first_interaction=True
-        self.is_processing_after_recording = False
+        self.update_status()
 
     def handle_button_click(self):
         """ボタンクリックを処理（録音開始/停止 or アプリ終了）"""
@@ -653,22 +663,11 @@ class ChatUI(QtWidgets.QWidget):
             if self.is_first_interaction:
                 self.is_first_interaction = False
             
-            # 録音開始時に即座にボタンと説明文を同時に変更（ラグを防ぐため）
-            self._set_button_content(text="STOP")
-            self._update_recording_button_style()
-            self._set_button_instruction_text("録音を停止するにはボタンをクリックしてください")
-            
+            # 録音開始（状態遷移がこのスレッドで通知され、即座にボタンと説明文が変わる）
             self.chatbot.start_recording()
         else:
-            # 録音停止時も即座にボタンと説明文を変更
-            self._set_button_content(text="...")
-            self._update_button_disabled_style()
-            self._set_button_instruction_text("ワセクラが処理中です... しばらくお待ちください")
-            
-            # 録音停止（update_statusメソッドが自動的に適切な状態に更新）
+            # 録音停止（処理中の表示に即座に切り替わる）
             self.chatbot.stop_recording()
-            # 録音停止直後は処理待ち状態として表示
-            self.is_processing_after_recording = True
 
     def _update_recording_button_style(self):
         """録音中のボタンスタイルを設定"""
@@ -736,19 +735,13 @@ class ChatUI(QtWidgets.QWidget):
             }
         """)
 
-    def display_club_info_modal(self, clubs):
-        """サークル情報を表示"""
-        print(f"[UI DEBUG] display_club_info called with {len(clubs)} clubs")
-        print(f"[UI DEBUG] Club info container exists: {hasattr(self, 'club_info_container')}")
-        print(f"[UI DEBUG] Club content layout exists: {hasattr(self, 'club_content_layout')}")
-
-
-        """サークル情報をモーダルで表示"""
+    def _create_club_modal(self):
+        """サークル情報モーダルを作成（一度だけ作成し、来場者をまたいで使い回す）"""
         modal = QtWidgets.QDialog(self)
         modal.setWindowTitle("おすすめのサークル")
         modal.setModal(True)
         modal.resize(1500, 1000)  # モーダルのサイズを設定
-        
+
         # モーダルのダークテーマ設定
         modal.setStyleSheet("""
             QDialog {
@@ -769,104 +762,22 @@ class ChatUI(QtWidgets.QWidget):
         self.club_info_title.setStyleSheet(
             "font-family: 'Yu Gothic UI', 'Meiryo', 'Hiragino Sans', 'Arial', sans-serif; font-size: 28px; font-weight: bold; color: #ffffff; margin: 10px; padding: 10px; background-color: transparent;"
         )
-        
-        modal_layout.addWidget(self.club_info_title)
-
-        # スクロール可能なサークル情報エリアを追加
-        scroll_area = QtWidgets.QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setStyleSheet("""
-            QScrollArea {
-                background-color: #1a1a1a;
-                border-radius: 10px;
-                min-height: 600px;
-                max-height: 800px;
-                border: 1px solid #333333;
-            }
-        """)
 
-        self.content_widget = QtWidgets.QWidget()
-        self.club_content_layout = QtWidgets.QVBoxLayout(self.content_widget)
-
-        # サークル情報を表示
-
-        # 既存の内容をクリア
-        for i in reversed(range(self.club_content_layout.count())):
-            child = self.club_content_layout.itemAt(i).widget()
-            if child:
-                child.setParent(None)
+        modal_layout.addWidget(self.club_info_title)
 
+        # 見つからなかった場合のメッセージ
+        self.no_clubs_label = QtWidgets.QLabel(
+            "申し訳ございませんが、条件に合うサークルが見つかりませんでした。", alignment=QtCore.Qt.AlignCenter
+        )
+        self.no_clubs_label.setStyleSheet("font-size: 18px; color: #e74c3c; padding: 20px; background-color: transparent;")
+        self.no_clubs_label.hide()
+        modal_layout.addWidget(self.no_clubs_label)
 
-        if not clubs:
-            # サークルが見つからない場合
-            no_clubs_label = QtWidgets.QLabel(
-                "申し訳ございませんが、条件に合うサークルが見つかりませんでした。", alignment=QtCore.Qt.AlignCenter
-            )
-            no_clubs_label.setStyleSheet("font-size: 18px; color: #e74c3c; padding: 20px; background-color: transparent;")
-            self.club_content_layout.addWidget(no_clubs_label)
-            print("[UI DEBUG] No clubs message added")
-        else:
-            # 各サークルの情報を表示
-            for i, club in enumerate(clubs):
-                print(f"[UI DEBUG] Adding club {i}: {club.get('サークル', 'N/A')}")
-                club_frame = QtWidgets.QFrame()
-                club_frame.setStyleSheet("""
-                    QFrame {
-                        background-color: #2a2a2a;
-                        border: 1px solid #444444;
-                        border-radius: 8px;
-                        margin: 5px;
-                        padding: 10px;
-                    }
-                    QFrame:hover {
-                        border-color: #3498db;
-                        box-shadow: 0 2px 5px rgba(52, 152, 219, 0.3);
-                    }
-                """)
-
-                club_layout = QtWidgets.QVBoxLayout(club_frame)
-
-                # サークル名
-                club_name = QtWidgets.QLabel(f"📍 {club.get('サークル', 'N/A')}")
-                club_name.setStyleSheet("font-size: 20px; font-weight: bold; color: #ffffff; margin-bottom: 5px; background-color: transparent;")
-                club_layout.addWidget(club_name)
-
-                # 活動内容
-                activity_content = club.get("活動内容", "N/A")
-                if activity_content != "N/A":
-                    activity_label = QtWidgets.QLabel(f"🎯 活動内容: {activity_content}")
-                    activity_label.setStyleSheet("font-size: 16px; color: #cccccc; margin: 3px 0; padding-left: 10px; background-color: transparent;")
-                    activity_label.setWordWrap(True)
-                    club_layout.addWidget(activity_label)
-
-                # 活動日時・場所
-                schedule = club.get("活動日時・場所", "N/A")
-                if schedule != "N/A":
-                    schedule_label = QtWidgets.QLabel(f"🕒 活動日時・場所: {schedule}")
-                    schedule_label.setStyleSheet("font-size: 16px; color: #cccccc; margin: 3px 0; padding-left: 10px; background-color: transparent;")
-                    schedule_label.setWordWrap(True)
-                    club_layout.addWidget(schedule_label)
-
-                # ラベル情報
-                label1 = club.get("ラベル1", "N/A")
-                label2 = club.get("ラベル２", "N/A")
-                if label1 != "N/A" or label2 != "N/A":
-                    labels_text = f"🏷️ カテゴリ: {label2}" + (f" / {label1}" if label1 != "N/A" else "")
-                    labels_label = QtWidgets.QLabel(labels_text)
-                    labels_label.setStyleSheet(
-                        "font-size: 15px; color: #aaaaaa; margin: 5px 0; padding-left: 10px; font-style: italic; background-color: transparent;"
-                    )
-                    club_layout.addWidget(labels_label)
-
-                self.club_content_layout.addWidget(club_frame)
-
-                print(f"[UI DEBUG] Club {i} added to layout")
-
-
-
-        self.club_content_layout.addStretch()
-        scroll_area.setWidget(self.content_widget)
-        modal_layout.addWidget(scroll_area)
+        # サークル一覧（表示範囲のカードだけを描画するビュー）
+        self.club_list_view = ClubListView()
+        self.club_list_view.setMinimumHeight(600)
+        self.club_list_view.setMaximumHeight(800)
+        modal_layout.addWidget(self.club_list_view)
 
         # 閉じるボタン
         close_button = QtWidgets.QPushButton("閉じる")
@@ -874,23 +785,46 @@ class ChatUI(QtWidgets.QWidget):
         close_button.clicked.connect(modal.close)
         modal_layout.addWidget(close_button, alignment=QtCore.Qt.AlignCenter)
 
-        # モーダルを表示
-        modal.exec()
+        modal.finished.connect(self._on_club_modal_closed)
+        return modal
 
+    def _set_club_list(self, clubs, highlight=False):
+        """モーダルの一覧を clubs に合わせて差分更新"""
+        self.no_clubs_label.setVisible(not clubs)
+        self.club_list_view.setVisible(bool(clubs))
+        self.club_list_view.set_clubs(clubs, highlight=highlight)
 
-        # サークル情報コンテナを表示
-        print(f"[UI DEBUG] Container visibility before show: {self.content_widget.isVisible()}")
-        print(f"[UI DEBUG] Container visibility after show: {self.content_widget.isVisible()}")
-        print("[UI DEBUG] Club info container shown")
+    def display_search_results(self, clubs):
+        """検索結果を即座に候補として表示（絞り込み結果が届いたらその場で更新）"""
+        logger.debug("display_search_results called with %d clubs", len(clubs))
+        if not clubs:
+            return
 
-        # サークル情報が表示されていることを示すフラグを設定
-        self.clubs_displayed = True
-        print("[UI DEBUG] clubs_displayed flag set to True")
+        self.club_results_final = False
+        self.club_info_title.setText("サークルを探しています...")
+        self._set_club_list(clubs)
+        self.club_modal.show()
 
-        # 強制的にウィジェットを更新
-        self.content_widget.update()
-        self.update()
-        print("[UI DEBUG] UI update forced")
+    def display_club_info_modal(self, clubs):
+        """サークル情報をモーダルで表示（候補表示中ならその場で絞り込み）"""
+        logger.debug("display_club_info called with %d clubs", len(clubs))
+
+        self.club_results_final = True
+        self.club_info_title.setText("あなたにおすすめのサークル")
+        self._set_club_list(clubs, highlight=True)
+
+        # モーダルを表示（ブロックしないので、発話中でも結果が見える）
+        self.club_modal.show()
+        self.club_modal.raise_()
+
+    def _on_club_modal_closed(self):
+        """モーダルが閉じられたときの処理"""
+        if self.club_results_final:
+            # サークル情報が表示されていることを示すフラグを設定
+            self.clubs_displayed = True
+            logger.debug("clubs_displayed flag set to True")
+        self.club_results_final = False
+        self.update_status()
 
     def test_display(self):
         """テスト用：サークル情報表示のテスト"""
@@ -903,18 +837,36 @@ class ChatUI(QtWidgets.QWidget):
                 "ラベル２": "テストラベル2",
             }
         ]
-        print("Testing display with test clubs")
+        logger.info("Testing display with test clubs")
         self.display_club_info_modal(test_clubs)
 
 
+    def receive_search_results(self, clubs):
+        """外部から検索結果（絞り込み前）を受信し、Signalを発行"""
+        logger.debug("receive_search_results called with %d clubs", len(clubs))
+        self.search_results_received.emit(clubs)
+
+    def set_chatbot(self, chatbot):
+        """チャットボットを接続（起動時、UIを先に表示してから呼ばれる）"""
+        self.chatbot = chatbot
+        self.update_status()
+
+    def receive_chatbot_state(self, state):
+        """チャットボットから状態遷移を受信し、Signalを発行（どのスレッドからでも呼べる）"""
+        self.chatbot_state_changed.emit(state)
+
     def receive_club_data(self, clubs):
         """外部からサークルデータを受信し、Signalを発行"""
-        print(f"[UI DEBUG] receive_club_data called with {len(clubs)} clubs")
+        logger.debug("receive_club_data called with %d clubs", len(clubs))
         self.club_data_received.emit(clubs)
 
     def resizeEvent(self, event):
-        """ウィンドウサイズ変更時に画像位置を調整"""
+        """ウィンドウサイズ変更時に画像位置と背景を調整"""
         super().resizeEvent(event)
+
+        # 新しいサイズの背景を用意（キャッシュはこのときだけ作り直す）
+        if self.background is not None:
+            self.background.request(self.size())
         
         # 表示中の画像の位置を再調整
         for i, widget in enumerate(self.displayed_image_widgets):
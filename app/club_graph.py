@@ -0,0 +1,240 @@
+import hashlib
+import logging
+import os
+import sys
+
+import numpy as np
+
+from club_resolver import normalize_label
+
+logger = logging.getLogger(__name__)
+
+# --- 類似度グラフ用の定数設定 ---
+GRAPH_FILENAME = "club_neighbors.npz"  # data ディレクトリに保存するファイル名
+NUM_NEIGHBORS = 10  # 各サークルについて保存する近傍数
+NGRAM_SIZE = 2  # 活動内容の文字n-gramのサイズ
+MAX_DOC_FREQ = 0.3  # これより多くのサークルに現れるn-gramは無視（ストップワード扱い）
+LABEL1_WEIGHT = 0.1  # ラベル1が一致した場合の加点
+LABEL2_WEIGHT = 0.3  # ラベル２が一致した場合の加点
+FINGERPRINT_FIELDS = ("サークル", "活動内容", "ラベル1", "ラベル２")  # グラフの計算に使うフィールド
+
+
+def graph_clubs(club_data):
+    """グラフのノードとなるサークル（名前のあるもの）を一覧化"""
+    clubs = []
+    for group in club_data.values():
+        for club in group:
+            if club.get("サークル", ""):
+                clubs.append(club)
+    return clubs
+
+
+def clubs_fingerprint(clubs):
+    """サークル一覧のフィンガープリント（グラフの鮮度確認用）"""
+    digest = hashlib.sha1()
+    for club in clubs:
+        for field in FINGERPRINT_FIELDS:
+            digest.update(club.get(field, "").encode("utf-8"))
+            digest.update(b"\x1f")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def text_ngram_counts(text, vocab, grow=True):
+    """正規化したテキストの文字n-gram出現回数（n-gram番号 → 回数）"""
+    text = normalize_label(text)
+    counts = {}
+    for i in range(len(text) - NGRAM_SIZE + 1):
+        gram = text[i : i + NGRAM_SIZE]
+        gram_id = vocab.setdefault(gram, len(vocab)) if grow else vocab.get(gram)
+        if gram_id is not None:
+            counts[gram_id] = counts.get(gram_id, 0) + 1
+    return counts
+
+
+def description_matrix(clubs, fields=("活動内容",)):
+    """指定フィールドの文字n-gram TF-IDF を CSR 形式で作成
+
+    (indptr, indices, data, vocab, idf) を返す。各行はL2正規化済み。
+    """
+    vocab = {}
+    rows = []
+    for club in clubs:
+        text = " ".join(club.get(field, "") for field in fields)
+        rows.append(text_ngram_counts(text, vocab))
+
+    num_clubs = len(clubs)
+    doc_freq = np.zeros(len(vocab), dtype=np.int64)
+    for counts in rows:
+        doc_freq[list(counts.keys())] += 1
+    idf = np.log((1 + num_clubs) / (1 + doc_freq)) + 1.0
+    idf[doc_freq > MAX_DOC_FREQ * num_clubs] = 0.0
+
+    indptr = np.zeros(num_clubs + 1, dtype=np.int64)
+    indices = []
+    data = []
+    for i, counts in enumerate(rows):
+        ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float32, count=len(counts)) * idf[ids]
+        keep = weights > 0
+        ids, weights = ids[keep], weights[keep]
+        norm = np.linalg.norm(weights)
+        if norm > 0:
+            weights /= norm
+        indices.append(ids)
+        data.append(weights.astype(np.float32))
+        indptr[i + 1] = indptr[i] + len(ids)
+
+    indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+    data = np.concatenate(data) if data else np.zeros(0, dtype=np.float32)
+    return indptr, indices, data, vocab, idf
+
+
+def transpose_csr(indptr, indices, data, num_cols):
+    """CSR 行列を転置（n-gram → サークルのポスティングリスト）"""
+    row_ids = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    order = np.argsort(indices, kind="stable")
+    t_indptr = np.zeros(num_cols + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=num_cols), out=t_indptr[1:])
+    return t_indptr, row_ids[order], data[order]
+
+
+def label_groups(clubs, key):
+    """ラベルごとのサークル番号リストとサークルごとのラベル番号"""
+    groups = {}
+    club_groups = np.full(len(clubs), -1, dtype=np.int64)
+    for i, club in enumerate(clubs):
+        label = club.get(key, "")
+        if label:
+            club_groups[i] = groups.setdefault(label, len(groups))
+    members = [np.flatnonzero(club_groups == g) for g in range(len(groups))]
+    return club_groups, members
+
+
+def build_club_graph(clubs, k=NUM_NEIGHBORS):
+    """活動内容のn-gram類似度とラベル一致から各サークルのk近傍を計算"""
+    num_clubs = len(clubs)
+    k = min(k, max(num_clubs - 1, 0))
+    neighbors = np.full((num_clubs, k), -1, dtype=np.int32)
+    scores = np.zeros((num_clubs, k), dtype=np.float32)
+    if k == 0:
+        return neighbors, scores
+
+    indptr, indices, data, vocab, _ = description_matrix(clubs)
+    t_indptr, t_rows, t_data = transpose_csr(indptr, indices, data, len(vocab))
+    label1_of, label1_members = label_groups(clubs, "ラベル1")
+    label2_of, label2_members = label_groups(clubs, "ラベル２")
+
+    for i in range(num_clubs):
+        # 疎行列積 X @ X.T の i 行目をポスティングリストから計算
+        grams = indices[indptr[i] : indptr[i + 1]]
+        weights = data[indptr[i] : indptr[i + 1]]
+        starts, ends = t_indptr[grams], t_indptr[grams + 1]
+        lengths = ends - starts
+        if lengths.sum() > 0:
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            row = np.bincount(
+                t_rows[offsets], weights=t_data[offsets] * np.repeat(weights, lengths), minlength=num_clubs
+            )
+        else:
+            row = np.zeros(num_clubs)
+
+        # ラベルの一致を加点
+        if label1_of[i] >= 0:
+            row[label1_members[label1_of[i]]] += LABEL1_WEIGHT
+        if label2_of[i] >= 0:
+            row[label2_members[label2_of[i]]] += LABEL2_WEIGHT
+        row[i] = -np.inf
+
+        top = np.argpartition(-row, k - 1)[:k]
+        top = top[np.argsort(-row[top], kind="stable")]
+        neighbors[i] = top
+        scores[i] = row[top]
+
+    return neighbors, scores
+
+
+def save_club_graph(path, clubs, neighbors, scores):
+    """近傍グラフを npz 形式で保存"""
+    np.savez_compressed(
+        path,
+        names=np.array([club.get("サークル", "") for club in clubs]),
+        neighbors=neighbors,
+        scores=scores,
+        fingerprint=np.array(clubs_fingerprint(clubs)),
+    )
+
+
+class ClubSimilarityGraph:
+    """事前計算済みのサークル近傍グラフ"""
+
+    def __init__(self, clubs, neighbors, scores):
+        self.clubs = clubs
+        self.neighbors = neighbors
+        self.scores = scores
+        self.index = {club.get("サークル", ""): i for i, club in enumerate(clubs)}
+
+    @staticmethod
+    def load(club_data, data_path="./data"):
+        """data ディレクトリからグラフを読み込む（無い・古い場合は None）"""
+        dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), data_path)
+        path = os.path.join(dir_path, GRAPH_FILENAME)
+        if not os.path.exists(path):
+            logger.warning("Club similarity graph not found: %s", path)
+            return None
+
+        clubs = graph_clubs(club_data)
+        try:
+            with np.load(path) as graph:
+                if str(graph["fingerprint"]) != clubs_fingerprint(clubs):
+                    logger.warning("Club similarity graph is stale, rebuild it: %s", path)
+                    return None
+                return ClubSimilarityGraph(clubs, graph["neighbors"], graph["scores"])
+        except Exception as e:
+            logger.warning("Error reading %s: %s", path, e)
+            return None
+
+    def similar(self, club, limit=NUM_NEIGHBORS):
+        """あるサークルに似ているサークルを類似度順に返す"""
+        i = self.index.get(club.get("サークル", ""))
+        if i is None:
+            return []
+        return [self.clubs[j] for j in self.neighbors[i][:limit] if j >= 0]
+
+    def expand(self, seeds, limit, exclude=()):
+        """シードのサークル群に似たサークルを、重複なく最大 limit 件返す"""
+        seen = {club.get("サークル", "") for club in seeds}
+        seen.update(club.get("サークル", "") for club in exclude)
+        candidates = {}
+        for club in seeds:
+            i = self.index.get(club.get("サークル", ""))
+            if i is None:
+                continue
+            for j, score in zip(self.neighbors[i], self.scores[i]):
+                if j < 0:
+                    continue
+                name = self.clubs[j].get("サークル", "")
+                if name not in seen:
+                    candidates[j] = max(candidates.get(j, -np.inf), float(score))
+
+        ranked = sorted(candidates, key=lambda j: candidates[j], reverse=True)
+        return [self.clubs[j] for j in ranked[:limit]]
+
+
+def main():
+    """オフラインでサークル近傍グラフを構築して data ディレクトリに保存"""
+    from bot import read_json_club_data
+
+    data_path = sys.argv[1] if len(sys.argv) > 1 else "./data"
+    club_data = read_json_club_data(data_path)
+    clubs = graph_clubs(club_data)
+    neighbors, scores = build_club_graph(clubs)
+
+    dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), data_path)
+    path = os.path.join(dir_path, GRAPH_FILENAME)
+    save_club_graph(path, clubs, neighbors, scores)
+    print(f"Saved {len(clubs)} clubs x {neighbors.shape[1]} neighbors to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+from PySide6 import QtCore, QtGui, QtWidgets
+from PySide6.QtCore import Qt
+
+# --- サークル情報カードの描画設定 ---
+CARD_MARGIN = 5  # カード外側の余白
+CARD_PADDING = 14  # カード内側の余白
+CARD_RADIUS = 8  # カードの角丸
+TEXT_INDENT = 10  # 詳細テキストの字下げ
+LINE_SPACING = 6  # テキストブロック間の間隔
+
+CARD_BACKGROUND = QtGui.QColor("#2a2a2a")
+CARD_BORDER = QtGui.QColor("#444444")
+CARD_HIGHLIGHT_BORDER = QtGui.QColor("#3498db")
+
+# モデルの独自ロール
+ClubRole = Qt.UserRole + 1
+HighlightRole = Qt.UserRole + 2
+
+
+def _card_font(pixel_size, bold=False, italic=False):
+    """カード内テキストのフォントを作成"""
+    font = QtGui.QFont()
+    font.setPixelSize(pixel_size)
+    font.setBold(bold)
+    font.setItalic(italic)
+    return font
+
+
+def card_text_blocks(club):
+    """カードに描画するテキストブロック（テキスト, フォント, 色, 字下げ）を作成"""
+    blocks = [(f"📍 {club.get('サークル', 'N/A')}", "name", "#ffffff", 0)]
+
+    activity_content = club.get("活動内容", "N/A")
+    if activity_content != "N/A":
+        blocks.append((f"🎯 活動内容: {activity_content}", "body", "#cccccc", TEXT_INDENT))
+
+    schedule = club.get("活動日時・場所", "N/A")
+    if schedule != "N/A":
+        blocks.append((f"🕒 活動日時・場所: {schedule}", "body", "#cccccc", TEXT_INDENT))
+
+    label1 = club.get("ラベル1", "N/A")
+    label2 = club.get("ラベル２", "N/A")
+    if label1 != "N/A" or label2 != "N/A":
+        labels_text = f"🏷️ カテゴリ: {label2}" + (f" / {label1}" if label1 != "N/A" else "")
+        blocks.append((labels_text, "label", "#aaaaaa", TEXT_INDENT))
+
+    return blocks
+
+
+class ClubListModel(QtCore.QAbstractListModel):
+    """おすすめサークルのリストモデル（絞り込み時は行の削除・強調で差分更新）"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.clubs = []
+        self.highlighted = set()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.clubs)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        club = self.clubs[index.row()]
+        if role == Qt.DisplayRole:
+            return club.get("サークル", "N/A")
+        if role == ClubRole:
+            return club
+        if role == HighlightRole:
+            return club.get("サークル", "N/A") in self.highlighted
+        return None
+
+    def set_clubs(self, clubs, highlight=False):
+        """表示するサークルを更新（既存の行は残し、不要な行だけ削除）"""
+        names = [club.get("サークル", "N/A") for club in clubs]
+        keep = set(names)
+
+        # 対象外になった行を下から削除
+        for row in reversed(range(len(self.clubs))):
+            if self.clubs[row].get("サークル", "N/A") not in keep:
+                self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+                del self.clubs[row]
+                self.endRemoveRows()
+
+        # 新しい行を末尾に追加
+        existing = {club.get("サークル", "N/A") for club in self.clubs}
+        added = [club for club in clubs if club.get("サークル", "N/A") not in existing]
+        if added:
+            first = len(self.clubs)
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(added) - 1)
+            self.clubs.extend(added)
+            self.endInsertRows()
+
+        # 指定された順番に並べ替える
+        order = {name: i for i, name in enumerate(names)}
+        current = [club.get("サークル", "N/A") for club in self.clubs]
+        if current != names:
+            self.layoutAboutToBeChanged.emit()
+            old_indexes = self.persistentIndexList()
+            old_rows = [index.row() for index in old_indexes]
+            self.clubs.sort(key=lambda club: order[club.get("サークル", "N/A")])
+            new_rows = [order[current[row]] for row in old_rows]
+            self.changePersistentIndexList(old_indexes, [self.index(row) for row in new_rows])
+            self.layoutChanged.emit()
+
+        self.highlighted = set(names) if highlight else set()
+        if self.clubs:
+            self.dataChanged.emit(self.index(0), self.index(len(self.clubs) - 1), [HighlightRole])
+
+    def clear(self):
+        """すべての行を削除"""
+        self.beginResetModel()
+        self.clubs = []
+        self.highlighted = set()
+        self.endResetModel()
+
+
+class ClubCardDelegate(QtWidgets.QStyledItemDelegate):
+    """サークル情報をカードとして描画するデリゲート（テキストレイアウトはキャッシュ）"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.fonts = {
+            "name": _card_font(20, bold=True),
+            "body": _card_font(16),
+            "label": _card_font(15, italic=True),
+        }
+        # サークル名 → ([(QStaticText, フォント, 色, 字下げ)], 高さ)（現在の幅の分だけ保持）
+        self._layout_cache = {}
+        self._cache_width = None
+
+    def clear_cache(self):
+        """テキストレイアウトのキャッシュを破棄"""
+        self._layout_cache.clear()
+
+    def _layout(self, club, width):
+        """幅に合わせたテキストレイアウトを取得（キャッシュ済みならそれを返す）"""
+        if width != self._cache_width:
+            # 幅が変わったらレイアウトをやり直す
+            self._layout_cache.clear()
+            self._cache_width = width
+
+        key = club.get("サークル", "N/A")
+        cached = self._layout_cache.get(key)
+        if cached is not None:
+            return cached
+
+        text_width = max(width - 2 * (CARD_MARGIN + CARD_PADDING), 50)
+        blocks = []
+        height = 2 * (CARD_MARGIN + CARD_PADDING)
+        for text, font_key, color, indent in card_text_blocks(club):
+            static_text = QtGui.QStaticText(text)
+            static_text.setTextFormat(Qt.PlainText)
+            static_text.setTextWidth(text_width - indent)
+            static_text.prepare(QtGui.QTransform(), self.fonts[font_key])
+            blocks.append((static_text, font_key, QtGui.QColor(color), indent))
+            height += static_text.size().height() + LINE_SPACING
+        height -= LINE_SPACING
+
+        cached = (blocks, int(height))
+        self._layout_cache[key] = cached
+        return cached
+
+    @staticmethod
+    def _card_width(option):
+        """カードの幅（ビューの表示幅に合わせる）"""
+        if option.widget is not None:
+            return option.widget.viewport().width()
+        return option.rect.width()
+
+    def sizeHint(self, option, index):
+        club = index.data(ClubRole)
+        width = self._card_width(option)
+        _, height = self._layout(club, width)
+        return QtCore.QSize(width, height)
+
+    def paint(self, painter, option, index):
+        club = index.data(ClubRole)
+        blocks, _ = self._layout(club, self._card_width(option))
+        highlighted = index.data(HighlightRole)
+
+        painter.save()
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+
+        # カードの背景と枠線
+        card_rect = QtCore.QRectF(option.rect).adjusted(CARD_MARGIN, CARD_MARGIN, -CARD_MARGIN, -CARD_MARGIN)
+        hovered = option.state & QtWidgets.QStyle.State_MouseOver
+        if highlighted:
+            pen = QtGui.QPen(CARD_HIGHLIGHT_BORDER, 2)
+        else:
+            pen = QtGui.QPen(CARD_HIGHLIGHT_BORDER if hovered else CARD_BORDER, 1)
+        painter.setPen(pen)
+        painter.setBrush(CARD_BACKGROUND)
+        painter.drawRoundedRect(card_rect, CARD_RADIUS, CARD_RADIUS)
+
+        # テキスト（キャッシュ済みのQStaticTextをそのまま描画）
+        y = option.rect.top() + CARD_MARGIN + CARD_PADDING
+        x = option.rect.left() + CARD_MARGIN + CARD_PADDING
+        for static_text, font_key, color, indent in blocks:
+            painter.setFont(self.fonts[font_key])
+            painter.setPen(color)
+            painter.drawStaticText(QtCore.QPointF(x + indent, y), static_text)
+            y += static_text.size().height() + LINE_SPACING
+
+        painter.restore()
+
+
+class ClubListView(QtWidgets.QListView):
+    """表示範囲のカードだけをレイアウト・描画するサークル一覧"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.club_model = ClubListModel(self)
+        self.card_delegate = ClubCardDelegate(self)
+        self.setModel(self.club_model)
+        self.setItemDelegate(self.card_delegate)
+
+        # 行の高さはまとめて少しずつ計算（一度に全件レイアウトしない）
+        self.setLayoutMode(QtWidgets.QListView.Batched)
+        self.setBatchSize(10)
+        self.setResizeMode(QtWidgets.QListView.Adjust)
+        self.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        self.setFocusPolicy(Qt.NoFocus)
+        self.setMouseTracking(True)
+        self.setStyleSheet("""
+            QListView {
+                background-color: #1a1a1a;
+                border-radius: 10px;
+                border: 1px solid #333333;
+            }
+        """)
+
+    def set_clubs(self, clubs, highlight=False):
+        """表示するサークルを更新"""
+        self.club_model.set_clubs(clubs, highlight=highlight)
+
+    def clear(self):
+        """一覧を空にする（テキストレイアウトのキャッシュも破棄）"""
+        self.club_model.clear()
+        self.card_delegate.clear_cache()
@@ -0,0 +1,100 @@
+import numpy as np
+
+from club_graph import description_matrix, graph_clubs, label_groups, text_ngram_counts, transpose_csr
+from club_resolver import normalize_label
+
+# --- 逐次ランキング用の定数設定 ---
+RANK_FIELDS = ("サークル", "ラベル1", "ラベル２", "活動内容")  # ランキングに使うフィールド
+LABEL_BOOST = 0.5  # 回答にラベル名が含まれていた場合の加点
+SHORTLIST_SIZE = 20  # 事前に用意しておく候補数
+
+
+class IncrementalClubRanker:
+    """学生の回答（文字起こし）ごとに全サークルのスコアを更新するランカー"""
+
+    def __init__(self, club_data, shortlist_size=SHORTLIST_SIZE):
+        self.clubs = graph_clubs(club_data)
+        self.shortlist_size = shortlist_size
+        self.index = {club.get("サークル", ""): i for i, club in enumerate(self.clubs)}
+        # ポスティングリストは build_index() で作成（Botは起動スレッドで呼ぶ。未作成なら最初の update() で作成）
+        self.vocab = None
+        self.reset()
+
+    def build_index(self):
+        """n-gram → サークルのポスティングリストと、加点するラベルの表を作成（一度だけ）"""
+        if self.vocab is not None:
+            return
+        indptr, indices, data, vocab, self.idf = description_matrix(self.clubs, fields=RANK_FIELDS)
+        self.t_indptr, self.t_rows, self.t_data = transpose_csr(indptr, indices, data, len(vocab))
+
+        # 回答中に現れたら加点するラベル（正規化済み表記 → サークル番号）
+        self.label_members = {}
+        for key in ("ラベル1", "ラベル２"):
+            club_groups, members = label_groups(self.clubs, key)
+            for i, group in enumerate(club_groups):
+                if group >= 0:
+                    label = normalize_label(self.clubs[i].get(key, ""))
+                    self.label_members[label] = members[group]
+        self.vocab = vocab
+
+    def reset(self):
+        """スコアをリセット（新しい来場者ごと）"""
+        self.scores = np.zeros(len(self.clubs), dtype=np.float32)
+        self.shortlist = np.zeros(0, dtype=np.int64)
+        self.num_answers = 0
+
+    def update(self, transcript):
+        """回答の文字起こしでスコアベクトルを更新し、候補リストを作り直す"""
+        if self.vocab is None:
+            self.build_index()
+        counts = text_ngram_counts(transcript, self.vocab, grow=False)
+        if counts:
+            grams = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            weights = np.fromiter(counts.values(), dtype=np.float32, count=len(counts)) * self.idf[grams]
+            norm = np.linalg.norm(weights)
+            if norm > 0:
+                weights /= norm
+
+            # 疎ベクトル × 転置行列：該当n-gramのポスティングだけを加算
+            starts, ends = self.t_indptr[grams], self.t_indptr[grams + 1]
+            lengths = ends - starts
+            total = lengths.sum()
+            if total > 0:
+                offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+                self.scores += np.bincount(
+                    self.t_rows[offsets],
+                    weights=self.t_data[offsets] * np.repeat(weights, lengths),
+                    minlength=len(self.clubs),
+                ).astype(np.float32)
+
+        text = normalize_label(transcript)
+        for label, members in self.label_members.items():
+            if label in text:
+                self.scores[members] += LABEL_BOOST
+
+        self.num_answers += 1
+        self._update_shortlist()
+
+    def _update_shortlist(self):
+        """スコア上位のサークル番号を降順で保持"""
+        positive = np.flatnonzero(self.scores > 0)
+        if len(positive) > self.shortlist_size:
+            top = np.argpartition(-self.scores[positive], self.shortlist_size - 1)[: self.shortlist_size]
+            positive = positive[top]
+        self.shortlist = positive[np.argsort(-self.scores[positive], kind="stable")]
+
+    def top_clubs(self, limit=None):
+        """事前に用意された候補サークルをスコア順に返す"""
+        shortlist = self.shortlist if limit is None else self.shortlist[:limit]
+        return [self.clubs[i] for i in shortlist]
+
+    def rank(self, clubs):
+        """サークルのリストを現在のスコア順に並べ替える（安定ソート）"""
+        if not self.num_answers:
+            return list(clubs)
+
+        def score(club):
+            i = self.index.get(club.get("サークル", ""))
+            return -self.scores[i] if i is not None else 0.0
+
+        return sorted(clubs, key=score)
@@ -0,0 +1,156 @@
+import bisect
+import unicodedata
+from collections import defaultdict
+
+# --- ラベル解決用の定数設定 ---
+NGRAM_SIZE = 2  # 文字n-gramのサイズ
+MIN_SIMILARITY = 0.5  # 類似度フォールバックで採用する最低スコア（Dice係数）
+MIN_PREFIX_LENGTH = 2  # 前方一致で探すクエリの最短の長さ
+# 「野球サークル」「テニス部」のようにラベルの後ろに付く語（長いものから順に外す）
+SUFFIXES = tuple(sorted(("サークル", "クラブ", "同好会", "愛好会", "研究会", "部", "系"), key=len, reverse=True))
+
+
+def normalize_label(text):
+    """ラベル表記の正規化（NFKC・空白除去・小文字化・ひらがな→カタカナ）"""
+    text = unicodedata.normalize("NFKC", str(text))
+    text = "".join(text.split()).lower()
+    # ひらがなをカタカナに揃える（ぁ〜ゖ → ァ〜ヶ）
+    return "".join(chr(ord(ch) + 0x60) if "ぁ" <= ch <= "ゖ" else ch for ch in text)
+
+
+def char_ngrams(text, n=NGRAM_SIZE):
+    """境界記号付きの文字n-gram集合を作成"""
+    padded = f"^{text}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i : i + n] for i in range(len(padded) - n + 1)}
+
+
+def strip_suffix(text):
+    """「サークル」「部」などの接尾語を1つ外す（外すと空になる場合はそのまま）"""
+    for suffix in SUFFIXES:
+        if text.endswith(suffix) and len(text) > len(suffix):
+            return text[: -len(suffix)]
+    return text
+
+
+class ClubLabelResolver:
+    """ツール引数のラベルを club_data のキーへ解決するリゾルバ"""
+
+    def __init__(self, club_data, min_similarity=MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        self.labels = [label for label in club_data.keys() if label != ""]
+
+        # 正規化済みエイリアス → ラベル（club_data のキー）のリスト
+        self.aliases = self._build_alias_table(club_data)
+
+        # 前方一致・類似度で探すのはラベル２・ラベル1のみ（サークル名は完全一致だけ）
+        categories = {club.get("ラベル1", "") for label in self.labels for club in club_data[label]}
+        self.label_aliases = sorted({normalize_label(name) for name in [*self.labels, *categories] if name})
+
+        # n-gram → エイリアスの転置インデックス
+        self.alias_ngrams = {}
+        self.ngram_index = defaultdict(set)
+        for alias in self.label_aliases:
+            grams = char_ngrams(alias)
+            self.alias_ngrams[alias] = grams
+            for gram in grams:
+                self.ngram_index[gram].add(alias)
+
+        # 一度解決したクエリの結果をキャッシュ
+        self._cache = {}
+
+    def _build_alias_table(self, club_data):
+        """データからエイリアス表を作成（ラベル２・ラベル1・サークル名）"""
+        aliases = defaultdict(list)
+
+        def add(alias, label):
+            key = normalize_label(alias)
+            if key and label not in aliases[key]:
+                aliases[key].append(label)
+
+        # ラベル２そのもの
+        for label in self.labels:
+            add(label, label)
+
+        for label in self.labels:
+            for club in club_data[label]:
+                # ラベル1（上位カテゴリ）は配下のラベル２すべてに展開
+                category = club.get("ラベル1", "")
+                if category:
+                    add(category, label)
+                # サークル名はそのサークルのラベル２に解決
+                name = club.get("サークル", "")
+                if name:
+                    add(name, label)
+
+        # ラベル２と同じ表記のエイリアスは、そのラベルだけを指すようにする
+        for label in self.labels:
+            aliases[normalize_label(label)] = [label]
+
+        return dict(aliases)
+
+    def _most_similar(self, query):
+        """文字n-gramのDice係数で最も近いエイリアスを探す"""
+        grams = char_ngrams(query)
+        overlaps = defaultdict(int)
+        for gram in grams:
+            for alias in self.ngram_index.get(gram, ()):
+                overlaps[alias] += 1
+
+        best_alias, best_score = None, 0.0
+        for alias, overlap in overlaps.items():
+            score = 2.0 * overlap / (len(grams) + len(self.alias_ngrams[alias]))
+            if score > best_score:
+                best_alias, best_score = alias, score
+
+        if best_score < self.min_similarity:
+            return None
+        return best_alias
+
+    def _with_prefix(self, query):
+        """query で始まるラベル２・ラベル1のラベルをまとめる（「バスケ」→ バスケットボール、「スポーツ」→ スポーツ（球技）…）"""
+        resolved = []
+        if len(query) < MIN_PREFIX_LENGTH:
+            return resolved
+        start = bisect.bisect_left(self.label_aliases, query)
+        for alias in self.label_aliases[start:]:
+            if not alias.startswith(query):
+                break
+            for label in self.aliases[alias]:
+                if label not in resolved:
+                    resolved.append(label)
+        return resolved
+
+    def resolve(self, query):
+        """ラベルを club_data のキーのリストに解決（見つからなければ空リスト）
+
+        完全一致 → 接尾語（サークル・部など）を外して完全一致 → 前方一致 → 文字n-gramの類似度 の順に探す。
+        """
+        if query in self._cache:
+            return list(self._cache[query])
+
+        key = normalize_label(query)
+        stem = strip_suffix(key)
+        if key in self.aliases:
+            resolved = self.aliases[key]
+        elif stem in self.aliases:
+            resolved = self.aliases[stem]
+        else:
+            resolved = self._with_prefix(stem)
+            if not resolved and stem:
+                alias = self._most_similar(stem)
+                resolved = self.aliases[alias] if alias else []
+
+        self._cache[query] = resolved
+        # キャッシュや別名表のリストを呼び出し側に変更させないようコピーを返す
+        return list(resolved)
+
+    def resolve_all(self, queries):
+        """複数のラベルを重複なく解決"""
+        resolved = []
+        for query in queries:
+            for label in self.resolve(query):
+                if label not in resolved:
+                    resolved.append(label)
+        return resolved
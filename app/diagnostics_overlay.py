@@ -0,0 +1,94 @@
+import math
+
+from PySide6 import QtCore, QtGui, QtWidgets
+
+# --- 診断オーバーレイの描画設定 ---
+OVERLAY_REFRESH_MS = 250  # 表示中の更新間隔
+ROW_HEIGHT = 70  # ヒストグラム1つ分の高さ
+BAR_AREA_HEIGHT = 40  # 棒グラフ部分の高さ
+COUNTER_ROW_HEIGHT = 18  # イベント回数の行の高さ
+PADDING = 10
+
+# 表示するヒストグラム（名前, 表示名）
+HISTOGRAMS = (
+    ("asyncio", "asyncio loop lag"),
+    ("qt", "Qt event loop lag"),
+    ("paint", "ChatUI paint"),
+)
+
+
+class DiagnosticsOverlay(QtWidgets.QWidget):
+    """ウォッチドッグのヒストグラムを画面上に表示するオーバーレイ（隠しショートカットで切り替え）"""
+
+    def __init__(self, watchdog, parent=None):
+        super().__init__(parent)
+        self.watchdog = watchdog
+        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
+        self.setFixedSize(420, PADDING * 2 + ROW_HEIGHT * len(HISTOGRAMS) + COUNTER_ROW_HEIGHT)
+
+        self.font = QtGui.QFont("monospace")
+        self.font.setStyleHint(QtGui.QFont.Monospace)
+        self.font.setPixelSize(12)
+        self.background = QtGui.QColor(0, 0, 0, 225)
+        self.bar_color = QtGui.QColor("#2ecc71")
+        self.stall_color = QtGui.QColor("#e74c3c")
+
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.setInterval(OVERLAY_REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.update)
+        self.hide()
+
+    def toggle(self):
+        """表示・非表示を切り替え（非表示中は更新せず、計測も低頻度）"""
+        if self.isVisible():
+            self.refresh_timer.stop()
+            self.hide()
+        else:
+            self.raise_()
+            self.show()
+            self.refresh_timer.start()
+        # 表示中だけウォッチドッグを高頻度の計測にする
+        self.watchdog.detailed = self.isVisible()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), self.background)
+        painter.setFont(self.font)
+        threshold_ms = self.watchdog.threshold * 1000
+
+        for row, (name, label) in enumerate(HISTOGRAMS):
+            top = PADDING + row * ROW_HEIGHT
+            histogram = self.watchdog.histogram(name)
+
+            painter.setPen(QtGui.QColor("#ffffff"))
+            painter.drawText(
+                PADDING,
+                top + 12,
+                f"{label}: p50 {histogram.percentile(50):.1f} p95 {histogram.percentile(95):.1f} "
+                f"max {histogram.max:.0f} ms  stalls {self.watchdog.stalls(name)}",
+            )
+
+            # バケットごとの件数（対数スケール）
+            counts = histogram.counts
+            peak = max(max(counts), 1)
+            bar_width = (self.width() - 2 * PADDING) / len(counts)
+            bottom = top + 18 + BAR_AREA_HEIGHT
+            log_peak = math.log(peak + 1)
+            for i, count in enumerate(counts):
+                height = BAR_AREA_HEIGHT * math.log(count + 1) / log_peak if count else 0
+                bound = histogram.bounds[i - 1] if i > 0 else 0
+                painter.fillRect(
+                    QtCore.QRectF(PADDING + i * bar_width + 1, bottom - height, bar_width - 2, height),
+                    self.stall_color if bound >= threshold_ms else self.bar_color,
+                )
+
+            # バケットの境界（ms）
+            painter.setPen(QtGui.QColor("#aaaaaa"))
+            for i, bound in enumerate(histogram.bounds):
+                painter.drawText(QtCore.QPointF(PADDING + (i + 1) * bar_width - 6, bottom + 11), str(bound))
+
+        # イベントの回数（締め切り超過など）
+        counters = sorted(self.watchdog.counts().items())
+        text = "  ".join(f"{name} {count}" for name, count in counters) if counters else "no events"
+        painter.setPen(QtGui.QColor("#ffffff"))
+        painter.drawText(PADDING, PADDING + ROW_HEIGHT * len(HISTOGRAMS) + 12, text)
@@ -0,0 +1,218 @@
+import logging
+import os
+import random
+
+from PySide6 import QtCore, QtGui
+
+logger = logging.getLogger(__name__)
+
+# --- 画像読み込み用の定数設定 ---
+RESIZE_DEBOUNCE_MS = 100  # リサイズ中の再デコードを間引く間隔
+
+
+def expanding_size(image_size, target_size):
+    """KeepAspectRatioByExpanding で target_size を覆う縮尺後のサイズ"""
+    return image_size.scaled(target_size, QtCore.Qt.KeepAspectRatioByExpanding)
+
+
+class _ImageLoadSignals(QtCore.QObject):
+    """ワーカースレッドからUIスレッドへ結果を渡すためのSignal"""
+
+    loaded = QtCore.Signal(int, QtGui.QImage)
+
+
+class _BackgroundDecodeTask(QtCore.QRunnable):
+    """QImageReader で目標サイズに縮小しながらデコードするタスク"""
+
+    def __init__(self, path, target_size, generation, signals):
+        super().__init__()
+        self.path = path
+        self.target_size = target_size
+        self.generation = generation
+        self.signals = signals
+
+    def run(self):
+        reader = QtGui.QImageReader(self.path)
+        reader.setAutoTransform(True)
+        if reader.size().isValid():
+            reader.setScaledSize(expanding_size(reader.size(), self.target_size))
+        reader.setQuality(100)
+        image = reader.read()
+        if image.isNull():
+            logger.warning("背景画像を読み込めません: %s (%s)", self.path, reader.errorString())
+        try:
+            self.signals.loaded.emit(self.generation, image)
+        except RuntimeError:
+            # 終了処理中で受け取り側がすでに削除されている
+            pass
+
+
+class BackgroundImageCache(QtCore.QObject):
+    """ウィジェットサイズに合わせて縮小済みの背景画像をキャッシュする
+
+    デコードと縮小はスレッドプールで行い、UIスレッドでは QPixmap への変換と描画だけを行う。
+    """
+
+    # 新しいサイズの背景画像が用意できた
+    ready = QtCore.Signal()
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.pixmap = QtGui.QPixmap()  # 現在のサイズ用に縮小済みの背景
+        self.target_size = QtCore.QSize()
+        self._generation = 0  # 古いサイズのデコード結果を捨てるための番号
+
+        self._signals = _ImageLoadSignals()
+        self._signals.loaded.connect(self._on_loaded)
+
+        # リサイズ中は最後のサイズだけをデコードする
+        self._resize_timer = QtCore.QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(RESIZE_DEBOUNCE_MS)
+        self._resize_timer.timeout.connect(self._start_decode)
+
+    def request(self, size, immediate=False):
+        """指定サイズの背景を要求（サイズが変わったときだけデコードする）"""
+        if size == self.target_size or size.isEmpty():
+            return
+        self.target_size = QtCore.QSize(size)
+        if immediate or self.pixmap.isNull():
+            self._start_decode()
+        else:
+            self._resize_timer.start()
+
+    def _start_decode(self):
+        self._resize_timer.stop()
+        self._generation += 1
+        task = _BackgroundDecodeTask(self.path, QtCore.QSize(self.target_size), self._generation, self._signals)
+        QtCore.QThreadPool.globalInstance().start(task)
+
+    def _on_loaded(self, generation, image):
+        """デコード結果を受け取る（UIスレッド）"""
+        if generation != self._generation or image.isNull():
+            return
+        self.pixmap = QtGui.QPixmap.fromImage(image)
+        self.ready.emit()
+
+    def draw(self, painter, rect):
+        """背景を描画（用意できていなければ False）"""
+        if self.pixmap.isNull():
+            return False
+        if self.pixmap.size() == expanding_size(self.pixmap.size(), rect.size()):
+            # キャッシュ済みのサイズと一致：そのまま転送するだけ
+            painter.drawPixmap(0, 0, self.pixmap)
+        else:
+            # 新しいサイズのデコード待ちの間は、古い画像を引き伸ばして表示
+            target = QtCore.QRect(QtCore.QPoint(0, 0), expanding_size(self.pixmap.size(), rect.size()))
+            painter.drawPixmap(target, self.pixmap)
+        return True
+
+
+# --- サークル画像スプライト用の定数設定 ---
+SPRITE_SIZE = 180  # 縮小後の最大サイズ（180x180ピクセル）
+SPRITE_ANGLES = (-15, -10, -5, 5, 10, 15)  # 事前に回転させておく角度
+
+
+def render_club_sprites(path, size=SPRITE_SIZE, angles=SPRITE_ANGLES, cache_dir=None):
+    """画像をデコード・縮小し、各角度に回転した QImage のリストを作成（どのスレッドからでも可）"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    cached_paths = []
+    if cache_dir:
+        cached_paths = [os.path.join(cache_dir, f"{name}_{size}_{angle:+d}.png") for angle in angles]
+        source_mtime = os.path.getmtime(path)
+        if all(os.path.exists(p) and os.path.getmtime(p) >= source_mtime for p in cached_paths):
+            # ディスクキャッシュが新しければ読み込むだけ
+            images = [QtGui.QImage(p) for p in cached_paths]
+            if not any(image.isNull() for image in images):
+                return images
+
+    reader = QtGui.QImageReader(path)
+    reader.setAutoTransform(True)
+    if reader.size().isValid():
+        reader.setScaledSize(reader.size().scaled(size, size, QtCore.Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        logger.warning("サークル画像を読み込めません: %s (%s)", path, reader.errorString())
+        return []
+    image = image.convertToFormat(QtGui.QImage.Format_ARGB32_Premultiplied)
+
+    images = []
+    for angle in angles:
+        transform = QtGui.QTransform()
+        transform.rotate(angle)
+        images.append(image.transformed(transform, QtCore.Qt.SmoothTransformation))
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        for cached_path, rotated in zip(cached_paths, images):
+            rotated.save(cached_path, "PNG")
+    return images
+
+
+class _SpriteSignals(QtCore.QObject):
+    """ワーカースレッドからUIスレッドへスプライトを渡すためのSignal"""
+
+    rendered = QtCore.Signal(str, list)
+
+
+class _SpriteRenderTask(QtCore.QRunnable):
+    """1枚の画像のスプライトを作成するタスク"""
+
+    def __init__(self, filename, path, cache_dir, signals):
+        super().__init__()
+        self.filename = filename
+        self.path = path
+        self.cache_dir = cache_dir
+        self.signals = signals
+
+    def run(self):
+        images = render_club_sprites(self.path, cache_dir=self.cache_dir)
+        try:
+            self.signals.rendered.emit(self.filename, images)
+        except RuntimeError:
+            # 終了処理中で受け取り側がすでに削除されている
+            pass
+
+
+class ClubSpriteCache(QtCore.QObject):
+    """縮小・回転済みのサークル画像をメモリに保持するキャッシュ
+
+    起動時にスレッドプールで全画像を用意しておき、表示時はデコードも変形もしない。
+    cache_dir を指定すると、用意した画像をPNGとして保存し次回起動時に再利用する。
+    """
+
+    def __init__(self, image_dir, filenames, cache_dir=None, parent=None):
+        super().__init__(parent)
+        self.image_dir = image_dir
+        self.cache_dir = cache_dir
+        self.sprites = {}  # ファイル名 → [(角度, QPixmap)]
+
+        self._signals = _SpriteSignals()
+        self._signals.rendered.connect(self._on_rendered)
+
+        pool = QtCore.QThreadPool.globalInstance()
+        for filename in filenames:
+            path = os.path.join(image_dir, filename)
+            pool.start(_SpriteRenderTask(filename, path, cache_dir, self._signals))
+
+    def _on_rendered(self, filename, images):
+        """ワーカーの結果を QPixmap に変換して保持（UIスレッド）"""
+        if images:
+            self.sprites[filename] = [
+                (angle, QtGui.QPixmap.fromImage(image)) for angle, image in zip(SPRITE_ANGLES, images)
+            ]
+
+    def get(self, filename):
+        """ランダムな角度のスプライトを返す（角度, QPixmap）
+
+        まだ用意できていない場合だけ、その場で作成する。
+        """
+        sprites = self.sprites.get(filename)
+        if sprites is None:
+            path = os.path.join(self.image_dir, filename)
+            self._on_rendered(filename, render_club_sprites(path, cache_dir=self.cache_dir))
+            sprites = self.sprites.get(filename)
+            if sprites is None:
+                return None
+        return random.choice(sprites)
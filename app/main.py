@@ -1,12 +1,23 @@
+import time
+
+# 起動時間計測の基準（重いモジュールのインポートより前に記録）
+STARTUP_T0 = time.perf_counter()
+
+import logging
 import os
 import sys
 
-from bot import ClubRecommendationBot
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # ローカルモジュールのインポート
 from chat_ui import ChatUI
 from dotenv import load_dotenv
-from PySide6 import QtGui, QtWidgets
+from PySide6 import QtCore, QtGui, QtWidgets
+from startup import StartupPipeline, StartupProfiler
+
+from utils.applog import setup_logging
+
+logger = logging.getLogger(__name__)
 
 
 class WaseKuraApp:
@@ -16,6 +27,9 @@ class WaseKuraApp:
         self.app = None
         self.widget = None
         self.bot = None
+        self.pipeline = None
+        self.profiler = StartupProfiler(STARTUP_T0)
+        self.profiler.mark("imports done")
 
     def setup_font(self):
         """フォント設定"""
@@ -36,13 +50,21 @@ class WaseKuraApp:
             "Sans Serif",
         ]
 
+        # 前回解決したフォントを優先して確認（候補を一つずつ試すのは初回だけ）
+        settings = QtCore.QSettings("WaseKura", "WaseKuraApp")
+        cached_font = settings.value("font_family", "")
+        if cached_font in font_candidates:
+            font_candidates.remove(cached_font)
+            font_candidates.insert(0, cached_font)
+
         for font_name in font_candidates:
             font.setFamily(font_name)
             if QtGui.QFontInfo(font).exactMatch():
-                print(f"Using font: {font_name}")
+                logger.info("Using font: %s", font_name)
+                settings.setValue("font_family", font_name)
                 break
         else:
-            print("Using default system font")
+            logger.info("Using default system font")
 
         font.setPointSize(12)
         font.setStyleHint(QtGui.QFont.StyleHint.SansSerif)
@@ -54,35 +76,55 @@ class WaseKuraApp:
         os.environ["LC_ALL"] = "ja_JP.UTF-8"
         os.environ["LANG"] = "ja_JP.UTF-8"
 
-    def create_bot(self, api_key):
-        """Botインスタンスの作成"""
-        return ClubRecommendationBot.create_bot_instance(api_key, "./data")
+    def on_bot_ready(self, bot):
+        """Botの準備ができたらUIに接続してチャットボットを開始"""
+        with self.profiler.phase("connect bot"):
+            self.bot = bot
+            self.widget.set_chatbot(self.bot)
+            self.bot.set_ui_widget(self.widget)
+
+            # バックグラウンドでチャットボットを開始
+            self.bot.run()
+
+        self.profiler.report()
+
+    def on_startup_failed(self, message):
+        """起動に失敗した場合は終了"""
+        logger.error("Error: %s", message)
+        self.app.exit(1)
 
     def run(self, api_key):
         """アプリケーションの実行"""
         # GUIアプリケーションを最初に作成
-        self.app = QtWidgets.QApplication([])
+        with self.profiler.phase("create QApplication"):
+            self.app = QtWidgets.QApplication([])
 
         # フォント設定
-        self.setup_font()
+        with self.profiler.phase("setup font"):
+            self.setup_font()
 
         # 環境変数設定
         self.setup_environment()
 
-        # Botインスタンスの作成
-        self.bot = self.create_bot(api_key)
-
-        # UIを作成して表示
-        self.widget = ChatUI(self.bot)
-        self.bot.set_ui_widget(self.widget)
-        self.widget.resize(900, 700)
-        self.widget.show()
+        # UIを先に作成して表示（Botは準備ができてから接続）
+        with self.profiler.phase("show window"):
+            self.widget = ChatUI(None)
+            self.widget.resize(900, 700)
+            self.widget.show()
 
-        # バックグラウンドでチャットボットを開始
-        self.bot.run()
+        # データ読み込み・genaiのインポート・音声デバイスの準備を並列で開始
+        self.pipeline = StartupPipeline(api_key, "./data", self.profiler)
+        self.pipeline.bot_ready.connect(self.on_bot_ready)
+        self.pipeline.failed.connect(self.on_startup_failed)
+        self.pipeline.start()
 
         # GUIアプリケーションを実行
-        sys.exit(self.app.exec())
+        exit_code = self.app.exec()
+
+        # セッションを止め、録音アーカイブの書き出しを終えてから終了
+        if self.bot is not None:
+            self.bot.close()
+        sys.exit(exit_code)
 
 
 def main():
@@ -90,10 +132,13 @@ def main():
     # 環境変数の読み込み
     load_dotenv()
 
+    # ログ設定（コンソール出力は別スレッド、直近のログはメモリに保持）
+    setup_logging()
+
     # Gemini API キーの取得
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     if not GEMINI_API_KEY:
-        print("Error: GEMINI_API_KEY not found in environment variables")
+        logger.error("Error: GEMINI_API_KEY not found in environment variables")
         sys.exit(1)
 
     # アプリケーションの実行
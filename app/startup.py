@@ -0,0 +1,154 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from PySide6 import QtCore
+
+logger = logging.getLogger(__name__)
+
+# --- 起動時間計測の設定 ---
+# 起動時間の目標（ミリ秒）。STARTUP_BUDGET_MS で上書きでき、超えた場合は警告を表示
+DEFAULT_STARTUP_BUDGET_MS = 3000
+
+# 重いモジュールのインポートは1スレッドずつ行う
+# （別スレッドが共通の依存モジュールを同時にインポートすると、初期化途中のモジュールを参照してしまうことがある）
+_IMPORT_LOCK = threading.Lock()
+
+
+class StartupProfiler:
+    """起動処理の各フェーズの所要時間を記録し、内訳を表示する"""
+
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.phases = []  # (名前, 開始, 終了, スレッド名)
+        self._lock = threading.Lock()
+
+    def record(self, name, start, end):
+        """計測済みのフェーズを追加"""
+        with self._lock:
+            self.phases.append((name, start - self.t0, end - self.t0, threading.current_thread().name))
+
+    @contextmanager
+    def phase(self, name):
+        """with ブロックの所要時間をフェーズとして記録"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def mark(self, name):
+        """起動開始からの時刻を記録（所要時間0のフェーズ）"""
+        now = time.perf_counter()
+        self.record(name, now, now)
+
+    def elapsed_ms(self):
+        """起動開始からの経過時間（ミリ秒）"""
+        return (time.perf_counter() - self.t0) * 1000
+
+    def report(self):
+        """起動時間の内訳を表示し、目標を超えていれば警告"""
+        total_ms = self.elapsed_ms()
+        budget_ms = float(os.getenv("STARTUP_BUDGET_MS", DEFAULT_STARTUP_BUDGET_MS))
+
+        lines = ["⏱️ Startup timing breakdown:", f"{'phase':<28}{'start':>10}{'end':>10}{'took':>10}  thread"]
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        for name, start, end, thread_name in phases:
+            lines.append(
+                f"{name:<28}{start * 1000:>8.1f}ms{end * 1000:>8.1f}ms{(end - start) * 1000:>8.1f}ms  {thread_name}"
+            )
+        lines.append(f"{'total':<28}{total_ms:>28.1f}ms (budget {budget_ms:.0f}ms)")
+        logger.info("\n".join(lines))
+        if total_ms > budget_ms:
+            logger.warning("⚠️ Startup exceeded the budget by %.0fms", total_ms - budget_ms)
+        return total_ms
+
+
+def _load_club_data(data_path):
+    """サークルデータを読み込む"""
+    with _IMPORT_LOCK:
+        from bot import read_json_club_data
+
+    return read_json_club_data(data_path)
+
+
+def _import_genai():
+    """google.genai を先にインポートしておく（Botの作成時はキャッシュ済みのモジュールを使う）"""
+    with _IMPORT_LOCK:
+        from google import genai  # noqa: F401
+        from google.genai import types  # noqa: F401
+
+
+def _open_audio_devices():
+    """PortAudio を初期化し、入出力デバイスがネイティブのサンプルレートで使えるかを確認"""
+    with _IMPORT_LOCK:
+        import sounddevice as sd
+        import soundfile  # noqa: F401
+
+    devices = []
+    for kind, check in (("input", sd.check_input_settings), ("output", sd.check_output_settings)):
+        device = sd.query_devices(kind=kind)
+        rate = int(device["default_samplerate"])
+        check(samplerate=rate, channels=1, dtype="int16")
+        devices.append(f"{device['name']} ({rate} Hz)")
+    return devices
+
+
+class StartupPipeline(QtCore.QObject):
+    """ウィンドウ表示後に、データ読み込み・genaiのインポート・音声デバイスの準備を並列で行う"""
+
+    # Botの準備ができた（UIスレッドで受け取る）
+    bot_ready = QtCore.Signal(object)
+    # 起動に失敗した
+    failed = QtCore.Signal(str)
+
+    def __init__(self, api_key, data_path, profiler, parent=None):
+        super().__init__(parent)
+        self.api_key = api_key
+        self.data_path = data_path
+        self.profiler = profiler
+        self.executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup")
+
+    def _timed(self, name, func, *args):
+        """処理を計測しながら実行"""
+        with self.profiler.phase(name):
+            return func(*args)
+
+    def start(self):
+        """並列タスクを開始し、Botの作成は別スレッドで待ち合わせる"""
+        data_future = self.executor.submit(self._timed, "load club data", _load_club_data, self.data_path)
+        genai_future = self.executor.submit(self._timed, "import google.genai", _import_genai)
+        audio_future = self.executor.submit(self._timed, "open audio devices", _open_audio_devices)
+
+        def create_bot():
+            try:
+                from bot import ClubRecommendationBot
+
+                club_data = data_future.result()
+                genai_future.result()
+                bot = self._timed(
+                    "create bot",
+                    ClubRecommendationBot.create_bot_instance,
+                    self.api_key,
+                    self.data_path,
+                    club_data,
+                )
+            except Exception as e:
+                self.failed.emit(f"Failed to create bot: {e}")
+                return
+
+            try:
+                input_name, output_name = audio_future.result()
+                logger.info("🎧 Audio devices: in=%s, out=%s", input_name, output_name)
+            except Exception as e:
+                # デバイスが見つからなくても起動は続ける（録音時に改めてエラーになる）
+                logger.warning("⚠️ Audio device check failed: %s", e)
+
+            self.bot_ready.emit(bot)
+
+        threading.Thread(target=create_bot, name="startup-bot", daemon=True).start()
+        self.executor.shutdown(wait=False)
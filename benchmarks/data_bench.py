@@ -0,0 +1,165 @@
+"""
+Microbenchmarks of the club data layer on synthetic datasets of 1x, 10x, 100x and 1000x the current size.
+
+    python -m benchmarks.data_bench                       # compare with benchmarks/baselines/data.json
+    python -m benchmarks.data_bench --scales 1,10,100 --save-baseline
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import multiprocessing
+import os
+import random
+import sys
+import tracemalloc
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(APP_DIR))
+
+from benchmarks import results as bench  # noqa: E402
+
+SUITE = "data"
+DEFAULT_SCALES = (1, 10, 100, 1000)
+DATA_DIR = os.path.join(bench.RESULTS_DIR, "data")
+CSV_NAME = "サークルデータ.csv"
+SEARCH_LABELS = 3  # labels per search_clubs call
+FILTER_INDICES = [0, 2, 4, 6, 8]
+RANKER_ANSWER = "テニスと写真に興味があります"
+
+
+def source_csv():
+    data_dir = os.path.join(APP_DIR, "data")
+    for filename in sorted(os.listdir(data_dir)):
+        if filename.endswith(".csv"):
+            return os.path.join(data_dir, filename)
+    raise FileNotFoundError(f"No CSV file in {data_dir}")
+
+
+def generate_dataset(scale, distinct_labels=False):
+    """Write (or reuse) the CSV of the given scale and return its directory"""
+    suffix = "-distinct" if distinct_labels else ""
+    out_dir = os.path.abspath(os.path.join(DATA_DIR, f"x{scale}{suffix}"))
+    path = os.path.join(out_dir, CSV_NAME)
+    source = source_csv()
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+        return out_dir
+
+    with open(source, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(path + ".part", "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for university in range(scale):
+            for row in rows:
+                if university:
+                    row = dict(row)
+                    row["サークル"] = f"{row['サークル']}（U{university}）"
+                    if distinct_labels and row.get("ラベル２"):
+                        row["ラベル２"] = f"{row['ラベル２']}（U{university}）"
+                writer.writerow(row)
+    os.replace(path + ".part", path)
+    return out_dir
+
+
+def peak_mb(fn):
+    """Peak of the Python allocations made by fn() in MB"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_scale(scale, data_dir):
+    """Benchmark one scale (runs in its own process)"""
+    import logging
+
+    logging.disable(logging.INFO)  # search_clubs logs unknown clubs at INFO
+
+    from bot import ClubRecommendationTools, clean_club_names, read_json_club_data
+    from club_ranker import IncrementalClubRanker
+    from club_resolver import ClubLabelResolver
+
+    small = scale <= 10
+    repeat = {"min_repeat": 5 if small else 1, "max_repeat": 200 if small else 3}
+    results = {}
+
+    def record(name, samples, **extra):
+        results[f"x{scale}/{name}"] = bench.summarize(samples, **extra)
+
+    club_data = read_json_club_data(data_dir)
+    record(
+        "read_json_club_data",
+        bench.measure(lambda: read_json_club_data(data_dir), **repeat),
+        peak_mb=peak_mb(lambda: read_json_club_data(data_dir)),
+        clubs=sum(len(clubs) for clubs in club_data.values()),
+        labels=len(club_data),
+    )
+
+    record("clean_club_names", bench.measure(lambda: clean_club_names(club_data.keys())))
+    cleaned = clean_club_names(club_data.keys())
+    record("make_tools", bench.measure(lambda: ClubRecommendationTools.make_tools(cleaned, include_similar=True)))
+
+    record(
+        "ClubLabelResolver",
+        bench.measure(lambda: ClubLabelResolver(club_data), **repeat),
+        peak_mb=peak_mb(lambda: ClubLabelResolver(club_data)),
+    )
+    resolver = ClubLabelResolver(club_data)
+    # The bot builds the ranker index on the startup thread, before the first turn
+    record(
+        "IncrementalClubRanker",
+        bench.measure(lambda: IncrementalClubRanker(club_data).build_index(), **repeat),
+        peak_mb=peak_mb(lambda: IncrementalClubRanker(club_data).build_index()),
+    )
+    ranker = IncrementalClubRanker(club_data)
+    ranker.update(RANKER_ANSWER)
+
+    # The same labels at every scale (the ones of the first university), plus one spelled differently
+    labels = random.Random(0).sample(sorted(label for label in club_data if "（U" not in label), SEARCH_LABELS)
+    exact_args = {"clubs_to_search": labels}
+    fuzzy_args = {"clubs_to_search": labels[:-1] + [f" {labels[-1]} "]}
+    record("search_clubs", bench.measure(lambda: ClubRecommendationTools.search_clubs(club_data, exact_args)))
+    record(
+        "search_clubs+resolver+ranker",
+        bench.measure(
+            lambda: ClubRecommendationTools.search_clubs(club_data, fuzzy_args, resolver=resolver, ranker=ranker)
+        ),
+    )
+    matching, _ = ClubRecommendationTools.search_clubs(club_data, exact_args)
+    filter_args = {"clubs_to_choose": FILTER_INDICES}
+    record("filter_clubs", bench.measure(lambda: ClubRecommendationTools.filter_clubs(matching, filter_args)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the club data layer on scaled synthetic datasets")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="comma separated multiples")
+    parser.add_argument("--distinct-labels", action="store_true", help="give every synthetic university its own labels")
+    bench.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    suite = SUITE + ("-distinct" if args.distinct_labels else "")
+    results = {}
+    for scale in (int(s) for s in args.scales.split(",")):
+        print(f"⏱️ x{scale}...", flush=True)
+        data_dir = generate_dataset(scale, args.distinct_labels)
+        with concurrent.futures.ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            try:
+                results.update(pool.submit(run_scale, scale, data_dir).result())
+            except (concurrent.futures.process.BrokenProcessPool, MemoryError) as e:
+                # 1000x may not fit into memory: record it and go on
+                results[f"x{scale}"] = {"error": f"{type(e).__name__}: {e}"}
+    print()
+    return bench.report(suite, results, args.save_baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Shared helpers of the benchmark suites: timing, summaries and comparison with benchmarks/baselines/<suite>.json.
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+RESULTS_DIR = os.path.join("tmp", "benchmarks")
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+DEFAULT_TOLERANCE = 0.25  # a median this much slower than the baseline is a regression
+DEFAULT_FLOOR_MS = 0.05  # ...unless the difference is below this (timer noise)
+
+
+def measure(fn, min_repeat=5, max_repeat=200, budget=1.0):
+    """Call fn repeatedly (at least min_repeat times, until budget seconds or max_repeat) and return the times in ms"""
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_repeat:
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+        if len(samples) >= min_repeat and time.perf_counter() - started > budget:
+            break
+    return samples
+
+
+def summarize(samples, **extra):
+    """Latency distribution of samples in ms"""
+    ordered = sorted(samples)
+    summary = {
+        "n": len(ordered),
+        "median_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "min_ms": ordered[0],
+        "max_ms": ordered[-1],
+    }
+    summary.update(extra)
+    return summary
+
+
+def metadata():
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.node(),
+    }
+
+
+def save_results(suite, results, save_baseline=False):
+    """Write the results (and the baseline if requested); returns the results path"""
+    document = {"suite": suite, "meta": metadata(), "results": results}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{suite}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    paths = [path]
+    if save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        paths.append(baseline_path(suite))
+    for p in paths:
+        with open(p, "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def baseline_path(suite):
+    return os.path.join(BASELINE_DIR, f"{suite}.json")
+
+
+def load_baseline(suite):
+    path = baseline_path(suite)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def _group(name):
+    """Part of the name a whole case or scale shares ("x100/search_clubs" -> "x100")"""
+    return name.split("/", 1)[0]
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, floor_ms=DEFAULT_FLOOR_MS):
+    """Regressions of results against baseline as (name, metric, baseline, current) tuples
+
+    Besides slowdowns, an operation of the baseline that now fails ("error") or is missing ("missing")
+    is a regression, as long as its case or scale was run at all (--scales 1 doesn't fail on x10).
+    """
+    regressions = []
+    ran = {_group(name) for name in results}
+    for name, before in baseline.items():
+        group = _group(name)
+        if group not in ran or "error" in before:
+            continue
+        current = results.get(name, results.get(group))
+        if current is None:
+            regressions.append((name, "missing", None, None))
+        elif "error" in current:
+            regressions.append((name, "error", None, current["error"]))
+
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None or "median_ms" not in current or "median_ms" not in before:
+            continue
+        if current["median_ms"] > before["median_ms"] * (1 + tolerance) + floor_ms:
+            regressions.append((name, "median_ms", before["median_ms"], current["median_ms"]))
+        if "peak_mb" not in current or "peak_mb" not in before:
+            continue
+        if current["peak_mb"] > before["peak_mb"] * (1 + tolerance) + 1:
+            regressions.append((name, "peak_mb", before["peak_mb"], current["peak_mb"]))
+    return regressions
+
+
+def print_table(results):
+    print(f"{'operation':<40}{'n':>6}{'median':>14}{'p95':>14}{'max':>14}{'peak MB':>10}")
+    for name, s in results.items():
+        if "error" in s:
+            print(f"{name:<40}  {s['error']}")
+            continue
+        peak = f"{s['peak_mb']:.1f}" if "peak_mb" in s else ""
+        print(
+            f"{name:<40}{s['n']:>6}{s['median_ms']:>12.3f}ms{s['p95_ms']:>12.3f}ms{s['max_ms']:>12.3f}ms{peak:>10}"
+        )
+
+
+def report(suite, results, save_baseline=False, tolerance=DEFAULT_TOLERANCE):
+    """Print and save the results, compare them with the baseline and return the exit code"""
+    print_table(results)
+    baseline = None if save_baseline else load_baseline(suite)
+    path = save_results(suite, results, save_baseline)
+    print(f"\n💾 Results written to {path}")
+    if save_baseline:
+        print(f"💾 Baseline saved to {baseline_path(suite)}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {baseline_path(suite)} (save one with --save-baseline)")
+        return 0
+
+    regressions = compare(results, baseline, tolerance)
+    for name, metric, before, after in regressions:
+        if metric == "missing":
+            print(f"❌ {name}: in the baseline but not measured")
+        elif metric == "error":
+            print(f"❌ {name}: {after}")
+        else:
+            print(f"❌ {name} {metric}: {before:.3f} -> {after:.3f} (+{(after / before - 1) * 100:.0f}%)")
+    if regressions:
+        return 1
+    print(f"✅ No regressions against the baseline (tolerance {tolerance:.0%})")
+    return 0
+
+
+def add_arguments(parser):
+    """Options shared by the suites"""
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown (0.25 = 25%%)")
@@ -0,0 +1,357 @@
+"""
+Soak test: simulated visitor sessions through the real ClubRecommendationBot and ChatUI, with a fake
+Live session and audio devices. Exits with status 1 if memory, objects, descriptors or threads keep growing.
+
+    python -m benchmarks.soak --sessions 2000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import gc
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+import types
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(APP_DIR))
+
+import numpy as np  # noqa: E402
+from PySide6 import QtCore, QtWidgets  # noqa: E402
+
+from benchmarks import results as bench  # noqa: E402
+
+TURNS = 6  # greeting + 5 questions; the tools are called on the last turn
+CHUNKS_PER_TURN = 5  # response audio chunks per turn
+CHUNK_BYTES = 4800  # 0.1 s at 24 kHz
+RECORD_SECONDS = 0.03  # how long the simulated visitor "speaks"
+DRIVER_INTERVAL_MS = 2
+WARMUP = 0.2  # share of the samples ignored at the start (caches filling up)
+
+# metric: (absolute allowance, relative allowance) for the growth from the first to the last third
+GROWTH_ALLOWANCE = {
+    "rss_mb": (20.0, 0.10),
+    "qobjects": (50, 0.05),
+    "widgets": (20, 0.05),
+    "py_objects": (5000, 0.05),
+    "fds": (5, 0.0),
+    "threads": (3, 0.0),
+}
+
+
+# --- stand-ins for the Live API ---
+
+
+class FakeSession:
+    """Scripted Live API session: audio answers, and the search/filter tool calls on the last turn"""
+
+    def __init__(self, labels, rng):
+        self.labels = labels
+        self.rng = rng
+        self.turn = 0
+
+    async def send_realtime_input(self, **kwargs):
+        pass
+
+    async def send_tool_response(self, **kwargs):
+        pass
+
+    async def receive(self):
+        self.turn += 1
+        yield _response(transcription=f"回答 {self.turn}: {self.rng.choice(self.labels)}が好きです")
+        if self.turn == TURNS:
+            search = {"clubs_to_search": self.rng.sample(self.labels, 3)}
+            yield _response(tool_call=_tool_call("search_clubs_tool", search))
+            yield _response(tool_call=_tool_call("filter_clubs_tool", {"clubs_to_choose": [0, 1, 2]}))
+        for _ in range(CHUNKS_PER_TURN):
+            await asyncio.sleep(0)
+            yield _response(data=bytes(CHUNK_BYTES))
+
+
+def _response(data=None, transcription=None, tool_call=None):
+    if tool_call is not None:
+        return types.SimpleNamespace(server_content=None, data=None, tool_call=tool_call)
+    server_content = types.SimpleNamespace(
+        input_transcription=types.SimpleNamespace(text=transcription) if transcription else None
+    )
+    return types.SimpleNamespace(server_content=server_content, data=data, tool_call=None)
+
+
+def _tool_call(name, args):
+    call = types.SimpleNamespace(id=f"{name}-{time.perf_counter_ns()}", name=name, args=args)
+    return types.SimpleNamespace(function_calls=[call])
+
+
+class FakeLiveClient:
+    """Stands in for genai.Client: client.aio.live.connect() opens a FakeSession"""
+
+    def __init__(self, labels, seed=0):
+        self.rng = random.Random(seed)
+        self.labels = labels
+        self.connects = 0
+        self.aio = types.SimpleNamespace(live=types.SimpleNamespace(connect=self.connect))
+
+    @contextlib.asynccontextmanager
+    async def connect(self, model, config):
+        self.connects += 1
+        yield FakeSession(self.labels, self.rng)
+
+
+# --- stand-ins for the audio devices ---
+
+
+class FakeInputStream:
+    """Silent microphone"""
+
+    def __init__(self, channels):
+        self.channels = channels
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def read(self, frames):
+        return np.zeros((frames, self.channels), dtype=np.int16), False
+
+
+class FakeOutputStream:
+    """Speaker that accepts everything at once"""
+
+    write_available = 1 << 20
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def write(self, data):
+        pass
+
+    def abort(self):
+        pass
+
+
+# --- resource sampling ---
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        # ru_maxrss is the peak (KB on Linux, bytes on macOS); still shows unbounded growth
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def open_fds():
+    for path in ("/proc/self/fd", "/dev/fd"):
+        with contextlib.suppress(OSError):
+            return len(os.listdir(path))
+    return -1
+
+
+def native_threads():
+    with contextlib.suppress(OSError):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    return threading.active_count()
+
+
+def sample(app, sessions, started):
+    gc.collect()
+    qobjects = sum(len(w.findChildren(QtCore.QObject)) + 1 for w in app.topLevelWidgets())
+    return {
+        "sessions": sessions,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        "rss_mb": round(rss_mb(), 2),
+        "qobjects": qobjects,
+        "widgets": len(app.allWidgets()),
+        "py_objects": len(gc.get_objects()),
+        "fds": open_fds(),
+        "threads": native_threads(),
+    }
+
+
+def analyze(samples):
+    """Growth of each metric from the first to the last third (after the warm-up)"""
+    steady = samples[int(len(samples) * WARMUP) :]
+    if len(steady) < 3:
+        return {}
+    third = len(steady) // 3
+    report = {}
+    for metric, (absolute, relative) in GROWTH_ALLOWANCE.items():
+        first = statistics.median(s[metric] for s in steady[:third])
+        last = statistics.median(s[metric] for s in steady[-third:])
+        allowance = max(absolute, relative * first)
+        slope = np.polyfit([s["sessions"] for s in steady], [s[metric] for s in steady], 1)[0] * 1000
+        report[metric] = {
+            "first": first,
+            "last": last,
+            "growth": last - first,
+            "allowance": allowance,
+            "per_1000_sessions": round(float(slope), 3),
+            "leak": bool(last - first > allowance and slope > 0),
+        }
+    return report
+
+
+# --- the visitor ---
+
+
+class VisitorDriver(QtCore.QObject):
+    """Plays visitors on the UI thread by clicking the button, like a person at the booth"""
+
+    finished = QtCore.Signal()
+
+    def __init__(self, app, widget, bot, sessions, sample_every):
+        super().__init__()
+        self.app = app
+        self.widget = widget
+        self.bot = bot
+        self.sessions = sessions
+        self.sample_every = sample_every
+        self.completed = 0
+        self.samples = []
+        self.started = time.perf_counter()
+        self._recording_since = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(DRIVER_INTERVAL_MS)
+        self._timer.timeout.connect(self._step)
+
+    def start(self):
+        self.samples.append(sample(self.app, 0, self.started))
+        self._timer.start()
+
+    def _step(self):
+        widget, bot = self.widget, self.bot
+        if widget.club_modal.isVisible():
+            # Read the recommendations once the answer has been played, then close the modal
+            if widget.club_results_final and bot.is_listening:
+                widget.club_modal.close()
+        elif widget.clubs_displayed:
+            # Reset button: the next visitor
+            widget.button.click()
+            self.completed += 1
+            if self.completed % self.sample_every == 0:
+                self._sample()
+            if self.completed >= self.sessions:
+                self._timer.stop()
+                self.finished.emit()
+        elif bot.is_recording:
+            if time.perf_counter() - self._recording_since >= RECORD_SECONDS:
+                widget.button.click()
+        elif bot.is_listening and widget.button.isEnabled():
+            self._recording_since = time.perf_counter()
+            widget.button.click()
+
+    def _sample(self):
+        s = sample(self.app, self.completed, self.started)
+        self.samples.append(s)
+        print(
+            f"{s['sessions']:>6} sessions {s['elapsed_s']:>8.1f}s  rss {s['rss_mb']:>7.1f} MB  "
+            f"qobjects {s['qobjects']:>5}  widgets {s['widgets']:>4}  py {s['py_objects']:>7}  "
+            f"fds {s['fds']:>3}  threads {s['threads']:>3}",
+            flush=True,
+        )
+
+
+def create_bot(archive_dir):
+    from bot import ClubRecommendationBot
+
+    from utils.audioarchive import AudioArchive
+
+    bot = ClubRecommendationBot.create_bot_instance("soak")
+    labels = [label for label in bot.club_data if label]
+    bot.client = FakeLiveClient(labels)
+    bot.use_audio_process = False
+    bot.input_device_rate = bot.sample_rate
+    bot.output_device_rate = bot.output_sample_rate
+    bot._open_input_stream = lambda: FakeInputStream(bot.channels)
+    bot._open_output_stream = FakeOutputStream
+    bot.clip_threshold = 3600  # the scripted answers are immediate
+    if bot.archive is not None:
+        bot.archive.close()
+        bot.archive = AudioArchive(archive_dir, max_bytes=50 * 1024 * 1024) if archive_dir else None
+    return bot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak test of the bot and the UI with simulated visitors")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--sample-every", type=int, default=25, help="sessions between samples")
+    parser.add_argument(
+        "--archive-dir",
+        default=os.path.join(bench.RESULTS_DIR, "soak-archive"),
+        help="audio archive of the simulated sessions ('' disables it)",
+    )
+    args = parser.parse_args(argv)
+
+    import logging
+
+    logging.basicConfig(level=logging.ERROR)
+
+    from chat_ui import ChatUI
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    widget = ChatUI(None)
+    widget.resize(900, 700)
+    widget.show()
+
+    bot = create_bot(args.archive_dir)
+    widget.set_chatbot(bot)
+    bot.set_ui_widget(widget)
+    bot.run()
+
+    driver = VisitorDriver(app, widget, bot, args.sessions, args.sample_every)
+    driver.finished.connect(app.quit)
+    driver.start()
+    app.exec()
+
+    stop = bot.stop()
+    if stop is not None:
+        stop.result(5)
+    if bot.archive is not None:
+        bot.archive.close()
+
+    report = analyze(driver.samples)
+    os.makedirs(bench.RESULTS_DIR, exist_ok=True)
+    prefix = os.path.join(bench.RESULTS_DIR, f"soak-{time.strftime('%Y%m%d-%H%M%S')}")
+    with open(prefix + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(driver.samples[0]))
+        writer.writeheader()
+        writer.writerows(driver.samples)
+    with open(prefix + ".json", "w", encoding="utf-8") as f:
+        summary = {"meta": bench.metadata(), "sessions": driver.completed, "connects": bot.client.connects}
+        json.dump({**summary, "metrics": report}, f, indent=2)
+
+    print(f"\n{'metric':<12}{'first':>12}{'last':>12}{'growth':>12}{'allowed':>12}{'/1000 sessions':>16}")
+    for metric, r in report.items():
+        flag = "❌ growing" if r["leak"] else "✅"
+        print(
+            f"{metric:<12}{r['first']:>12.1f}{r['last']:>12.1f}{r['growth']:>12.1f}{r['allowance']:>12.1f}"
+            f"{r['per_1000_sessions']:>16.2f}  {flag}"
+        )
+    if not report:
+        print("Too few samples to judge growth (run more sessions or lower --sample-every)")
+    print(f"\n💾 Samples written to {prefix}.csv")
+    return 1 if any(r["leak"] for r in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
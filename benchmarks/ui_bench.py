@@ -0,0 +1,203 @@
+"""
+Latency benchmark of ChatUI, run offscreen with a fake chatbot; each operation is timed until the UI thread is free again.
+
+    python -m benchmarks.ui_bench                   # compare with benchmarks/baselines/ui.json
+    python -m benchmarks.ui_bench --save-baseline
+"""
+
+import argparse
+import enum
+import itertools
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(APP_DIR))
+
+from PySide6 import QtCore, QtWidgets  # noqa: E402
+
+from benchmarks import results as bench  # noqa: E402
+
+SUITE = "ui"
+WINDOW_SIZES = ((640, 480), (900, 700), (1280, 800), (1920, 1080))
+CLUB_COUNTS = (1, 10, 50, 200)
+# The states of one visitor turn, in the order the chatbot goes through them
+TURN_STATES = ("listening", "recording", "processing", "speaking", "idle")
+
+
+class FakeState(enum.Enum):
+    IDLE = "idle"
+    LISTENING = "listening"
+    RECORDING = "recording"
+    PROCESSING = "processing"
+    SPEAKING = "speaking"
+
+
+class FakeChatbot:
+    """The part of ClubRecommendationBot that ChatUI uses, without audio or the Live API"""
+
+    def __init__(self):
+        self.state = FakeState.IDLE
+        self.current_question_count = 0
+
+    @property
+    def is_recording(self):
+        return self.state == FakeState.RECORDING
+
+    @property
+    def is_listening(self):
+        return self.state in (FakeState.LISTENING, FakeState.RECORDING)
+
+    @property
+    def is_processing(self):
+        return self.state == FakeState.PROCESSING
+
+    @property
+    def is_speaking(self):
+        return self.state == FakeState.SPEAKING
+
+    def start_recording(self):
+        self.state = FakeState.RECORDING
+
+    def stop_recording(self):
+        self.state = FakeState.PROCESSING
+
+    def reset_question_count(self):
+        self.current_question_count = 0
+
+    def reset(self):
+        self.state = FakeState.IDLE
+
+
+def settle(app):
+    """Run what the operation queued: events, deferred deletes and the resulting paints"""
+    app.processEvents()
+    QtCore.QCoreApplication.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+    app.processEvents()
+
+
+def wait_for_workers(app):
+    """Let the thread pool finish decoding the background and the sprites"""
+    QtCore.QThreadPool.globalInstance().waitForDone()
+    settle(app)
+
+
+def load_clubs():
+    from bot import read_json_club_data
+
+    clubs = [club for group in read_json_club_data("./data").values() for club in group]
+    random.Random(0).shuffle(clubs)
+    return clubs
+
+
+def run(args):
+    import logging
+
+    logging.disable(logging.WARNING)  # the stall watchdog would report the waits of the harness itself
+
+    from chat_ui import ChatUI
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    chatbot = FakeChatbot()
+    widget = ChatUI(chatbot)
+    widget.resize(900, 700)
+    widget.show()
+    wait_for_workers(app)
+    repeat = {"min_repeat": args.min_repeat, "budget": args.budget}
+    results = {}
+
+    def record(name, samples):
+        results[name] = bench.summarize(samples)
+
+    # --- update_status: one visitor turn, transition by transition ---
+    for before, after in zip(TURN_STATES, TURN_STATES[1:] + TURN_STATES[:1]):
+        samples = []
+        for _ in range(args.min_repeat * 10):
+            chatbot.state = FakeState(before)
+            widget.update_status()
+            settle(app)
+            chatbot.state = FakeState(after)
+            t = time.perf_counter()
+            widget.update_status()
+            settle(app)
+            samples.append((time.perf_counter() - t) * 1000)
+        record(f"update_status/{before}->{after}", samples)
+
+    # --- audio level meter ticks while recording ---
+    chatbot.state = FakeState.RECORDING
+    widget.update_status()
+    levels = random.Random(0)
+
+    def tick():
+        widget.update_audio_level(levels.random())
+        widget.update_audio_bars()
+        settle(app)
+
+    record("update_audio_bars", bench.measure(tick, **repeat))
+    chatbot.state = FakeState.IDLE
+    widget.update_status()
+
+    # --- full repaints at several window sizes ---
+    for width, height in WINDOW_SIZES:
+        widget.resize(width, height)
+        settle(app)
+        # Let the debounced background decode for the new size finish first
+        time.sleep(0.3)
+        wait_for_workers(app)
+
+        def repaint():
+            widget.repaint()
+            settle(app)
+
+        record(f"repaint/{width}x{height}", bench.measure(repaint, **repeat))
+    widget.resize(900, 700)
+    settle(app)
+
+    # --- floating club images (cleared after each one, untimed) ---
+    def show_image():
+        t = time.perf_counter()
+        widget.show_random_club_image()
+        settle(app)
+        elapsed = (time.perf_counter() - t) * 1000
+        widget.clear_club_images()
+        settle(app)
+        return elapsed
+
+    record("show_random_club_image", [show_image() for _ in range(args.min_repeat * 10)])
+
+    # --- recommendation modal, alternating between two different sets so every call changes the list ---
+    clubs = load_clubs()
+    for count in CLUB_COUNTS:
+        sets = itertools.cycle((clubs[:count], clubs[count : count * 2]))
+
+        def show_modal():
+            widget.display_club_info_modal(next(sets))
+            settle(app)
+
+        record(f"display_club_info_modal/{count}", bench.measure(show_modal, **repeat))
+        widget.club_modal.hide()
+        widget.club_list_view.clear()
+        settle(app)
+
+    widget.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ChatUI offscreen with a fake chatbot")
+    parser.add_argument("--min-repeat", type=int, default=20, help="minimum samples per operation")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per operation")
+    bench.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    return bench.report(SUITE, results, args.save_baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -48,7 +48,7 @@ class TerminalAudioChatBot(ChatAudioClient):
                 # 'q' キーで終了
                 elif key.char == "q":
                     print("Exiting...")
-                    self.running = False
+                    self.stop()
                     return False  # Stop listener
             except AttributeError:
                 # Ignore special keys like shift, ctrl, etc.
@@ -60,6 +60,10 @@ class TerminalAudioChatBot(ChatAudioClient):
         with keyboard.Listener(on_press=on_press) as listener:
             listener.join()
 
+        # Wait for the session to end and the archive to be written
+        # セッションの終了と録音アーカイブの書き出しを待ちます
+        self.close()
+
 
 if __name__ == "__main__":
     load_dotenv()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# app/ のモジュールはアプリと同じく `from bot import ...` で読み込む
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "app"), ROOT]
@@ -0,0 +1,39 @@
+import pytest
+
+from batch_recommend import BatchRecommender, schedule_days
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("毎週火・金曜日", "火金"),
+        ("月〜金", "月火水木金"),
+        ("毎週月曜から土曜", "月火水木金土"),
+        ("月曜日～水曜日", "月火水"),
+        ("平日 18:00〜", "月火水木金"),
+        ("4月から金曜日に活動", "金"),
+        ("日時は未定", ""),
+        ("月1回/日曜日", "日"),
+        ("月に2・3度", ""),
+        ("不定期/月１?2回", ""),
+        ("月に一回", ""),
+        ("毎月9の付く日", ""),
+        ("毎月9の日", ""),
+        ("月曜 18:00〜", "月"),
+        ("月曜、奇数週の日曜", "月日"),
+    ],
+)
+def test_schedule_days(text, expected):
+    assert schedule_days(text) == set(expected)
+
+
+@pytest.fixture(scope="module")
+def recommender():
+    return BatchRecommender()
+
+
+def test_single_string_interest_is_one_interest(recommender):
+    as_string = recommender.recommend({"id": 1, "interests": "サッカー"})
+    as_list = recommender.recommend({"id": 1, "interests": ["サッカー"]})
+    assert as_string["matched"] > 0
+    assert as_string == as_list
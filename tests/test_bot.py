@@ -0,0 +1,13 @@
+import os
+
+import bot as bot_module
+from bot import ClubRecommendationBot
+
+APP_DIR = os.path.dirname(os.path.abspath(bot_module.__file__))
+
+
+def test_clip_dir_is_resolved_like_the_club_data(tmp_path, monkeypatch):
+    # Launched from outside app/, the clips are still looked up next to the CSV
+    monkeypatch.chdir(tmp_path)
+    bot = ClubRecommendationBot.create_bot_instance("test")
+    assert os.path.normpath(bot.clips.clip_dir) == os.path.join(APP_DIR, "data", "clips")
@@ -0,0 +1,327 @@
+import asyncio
+import contextlib
+import threading
+import time
+import types
+
+import numpy as np
+import pytest
+
+from utils.chataudioclient import RESET_LATENCY_BUDGET_MS, ChatAudioClient, ClientState
+
+INPUT_RATE = 16000
+OUTPUT_RATE = 24000
+RESPONSE_CHUNK = bytes(4800)  # 0.1 s of 24 kHz int16
+
+
+class FakeInputStream:
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed.set()
+
+    def read(self, frames):
+        time.sleep(frames / INPUT_RATE)
+        return np.zeros((frames, 1), dtype=np.int16), False
+
+
+class QuietTailInputStream(FakeInputStream):
+    """A loud start followed by a quiet tail (a soft sentence ending below the VAD threshold)"""
+
+    def __init__(self, loud_seconds=0.3):
+        super().__init__()
+        self.loud = int(loud_seconds * INPUT_RATE)
+        self.position = 0
+
+    def read(self, frames):
+        time.sleep(frames / INPUT_RATE)
+        index = self.position + np.arange(frames)
+        self.position += frames
+        samples = np.where(index < self.loud, 8000, 100).astype(np.int16)
+        return samples.reshape(-1, 1), False
+
+
+class FakeOutputStream:
+    """Plays back in real time: write_available frees up as time passes"""
+
+    def __init__(self, capacity=9600):
+        self.capacity = capacity
+        self.queued = 0
+        self.last = time.perf_counter()
+        self.aborted = threading.Event()
+        self.closed = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed.set()
+
+    @property
+    def write_available(self):
+        now = time.perf_counter()
+        self.queued = max(0, self.queued - int((now - self.last) * OUTPUT_RATE))
+        self.last = now
+        return self.capacity - self.queued
+
+    def write(self, data):
+        self.queued += len(data) // 2
+
+    def abort(self):
+        self.aborted.set()
+
+
+class FakeSession:
+    """Answers every turn with an endless stream of audio chunks"""
+
+    def __init__(self):
+        self.receiving = threading.Event()
+        self.closed = threading.Event()
+
+    async def send_realtime_input(self, **kwargs):
+        pass
+
+    async def send_tool_response(self, **kwargs):
+        pass
+
+    async def receive(self):
+        self.receiving.set()
+        while True:
+            await asyncio.sleep(0.01)
+            yield types.SimpleNamespace(
+                server_content=types.SimpleNamespace(input_transcription=None),
+                data=RESPONSE_CHUNK,
+                tool_call=None,
+                session_resumption_update=None,
+            )
+
+
+class SilentSession(FakeSession):
+    """Never answers; optionally sends a session resumption handle first"""
+
+    def __init__(self, handle=None):
+        super().__init__()
+        self.handle = handle
+
+    async def receive(self):
+        self.receiving.set()
+        if self.handle is not None:
+            yield types.SimpleNamespace(
+                server_content=None,
+                data=None,
+                tool_call=None,
+                session_resumption_update=types.SimpleNamespace(resumable=True, new_handle=self.handle),
+            )
+        await asyncio.Event().wait()
+        yield None
+
+
+class RecordingArchive:
+    """Keeps the assistant audio of every turn in memory"""
+
+    def __init__(self):
+        self.sessions = 0
+        self.user_turns = []
+        self.user = []
+        self.assistant = []
+        self.assistant_turns = set()
+
+    def new_session(self):
+        self.sessions += 1
+
+    def add_user_audio(self, turn, pcm, rate):
+        self.user_turns.append(turn)
+        self.user.append(np.array(pcm))
+
+    def add_assistant_audio(self, turn, chunk, rate):
+        self.assistant.append(np.asarray(chunk).tobytes())
+        self.assistant_turns.add(turn)
+
+    def end_turn(self, turn):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeClient(ChatAudioClient):
+    def __init__(self, sessions=(), input_stream=FakeInputStream, **kwargs):
+        super().__init__(api_key="test", archive_dir=None, control_socket=None, **kwargs)
+        self.input_device_rate = INPUT_RATE
+        self.output_device_rate = OUTPUT_RATE
+        self.input_stream = input_stream
+        self.scripted_sessions = list(sessions)  # sessions of the first connections, then FakeSession
+        self.configs = []
+        self.sessions = []
+        self.input_streams = []
+        self.output_streams = []
+        self.client = types.SimpleNamespace(aio=types.SimpleNamespace(live=types.SimpleNamespace(connect=self._connect)))
+
+    @contextlib.asynccontextmanager
+    async def _connect(self, model, config):
+        self.configs.append(config)
+        session = self.scripted_sessions.pop(0) if self.scripted_sessions else FakeSession()
+        self.sessions.append(session)
+        try:
+            yield session
+        finally:
+            session.closed.set()
+
+    def _open_input_stream(self):
+        self.input_streams.append(self.input_stream())
+        return self.input_streams[-1]
+
+    def _open_output_stream(self):
+        self.output_streams.append(FakeOutputStream())
+        return self.output_streams[-1]
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.005)
+
+
+def capture_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "capture"]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeClient()
+    thread = threading.Thread(target=client.loop, daemon=True)
+    thread.start()
+    wait_for(lambda: client.state == ClientState.LISTENING)
+    yield client
+    client.stop().result(timeout=2)
+    thread.join(timeout=2)
+    assert not thread.is_alive()
+
+
+def speak(client):
+    """Record a short utterance and wait for the response to start"""
+    client.start_recording()
+    time.sleep(0.1)
+    client.stop_recording()
+    wait_for(lambda: client.state == ClientState.SPEAKING)
+
+
+def reset_and_check(client):
+    """Reset within the budget; capture, receive and playback of the old session are all torn down"""
+    session, output = client.sessions[-1], client.output_streams[-1]
+    captures = capture_threads()
+    started = time.perf_counter()
+    latency_ms = client.reset().result(timeout=2)
+    assert latency_ms <= RESET_LATENCY_BUDGET_MS
+    assert session.closed.is_set()
+    assert output.closed.is_set()
+    budget = RESET_LATENCY_BUDGET_MS / 1000 - (time.perf_counter() - started)
+    for thread in captures:
+        thread.join(timeout=max(0.0, budget))
+        assert not thread.is_alive()
+    wait_for(lambda: len(client.sessions) == 2 and client.state == ClientState.LISTENING)
+    return output
+
+
+def test_reset_while_listening(client):
+    reset_and_check(client)
+
+
+def test_reset_while_recording(client):
+    client.start_recording()
+    wait_for(lambda: client.input_streams)
+    stream = client.input_streams[-1]
+    reset_and_check(client)
+    assert stream.closed.is_set()
+
+
+def test_reset_while_speaking(client):
+    speak(client)
+    session = client.sessions[-1]
+    assert session.receiving.is_set()
+    output = reset_and_check(client)
+    # Audio still queued for the device is dropped, not played out
+    assert output.aborted.is_set()
+
+
+def test_response_before_clip_threshold_is_not_mixed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeClient(clip_threshold=1.0)
+    client.clips.clips = {"filler_wait": np.full(OUTPUT_RATE, 1000, dtype=np.int16)}
+    client.archive = RecordingArchive()
+    thread = threading.Thread(target=client.loop, daemon=True)
+    thread.start()
+    try:
+        wait_for(lambda: client.state == ClientState.LISTENING)
+        speak(client)
+        wait_for(lambda: len(client.archive.assistant) >= 5)
+    finally:
+        client.stop().result(timeout=2)
+        thread.join(timeout=2)
+    assert all(chunk == RESPONSE_CHUNK for chunk in client.archive.assistant)
+
+
+@pytest.mark.parametrize("handle", [None, "handle-1"])
+def test_turn_that_misses_a_deadline_is_retried_in_the_same_conversation(tmp_path, monkeypatch, handle):
+    monkeypatch.chdir(tmp_path)
+    client = FakeClient(sessions=[SilentSession(handle)], deadlines={"first_chunk": 0.3})
+    client.archive = RecordingArchive()
+    visitors = []
+    reset_states = client._reset_states
+    monkeypatch.setattr(client, "_reset_states", lambda: (visitors.append(client.turn), reset_states()))
+    thread = threading.Thread(target=client.loop, daemon=True)
+    thread.start()
+    try:
+        wait_for(lambda: client.state == ClientState.LISTENING)
+        speak(client)
+        wait_for(lambda: client.archive.assistant_turns)
+    finally:
+        client.stop().result(timeout=2)
+        thread.join(timeout=2)
+
+    assert len(client.sessions) == 2
+    if handle is None:
+        # No handle yet: a fresh session, but still the same visitor, turn and archive session
+        assert "handle" not in client.configs[1]["session_resumption"]
+    else:
+        assert client.configs[1]["session_resumption"] == {"handle": handle}
+    assert client.turn == 1
+    assert client.archive.sessions == 1
+    assert client.archive.user_turns == [1]
+    assert client.archive.assistant_turns == {1}
+    # Only the visitor reset of the first connection and the one on stop()
+    assert len(visitors) == 2
+
+
+@pytest.mark.parametrize("trim", [False, True])
+def test_quiet_tail_is_sent_unless_trimming_is_enabled(tmp_path, monkeypatch, trim):
+    monkeypatch.chdir(tmp_path)
+    client = FakeClient(input_stream=QuietTailInputStream, trim_trailing_silence=trim)
+    client.archive = RecordingArchive()
+    thread = threading.Thread(target=client.loop, daemon=True)
+    thread.start()
+    try:
+        wait_for(lambda: client.state == ClientState.LISTENING)
+        client.start_recording()
+        time.sleep(1.2)
+        client.stop_recording()
+        wait_for(lambda: client.archive.user)
+    finally:
+        client.stop().result(timeout=2)
+        thread.join(timeout=2)
+
+    (sent,) = client.archive.user
+    quiet_tail = len(sent) - np.flatnonzero(np.abs(sent) > 1000)[-1] - 1
+    if trim:
+        # Cut after the VAD hangover (0.3 s) plus at most one block
+        assert quiet_tail < 0.4 * INPUT_RATE
+    else:
+        assert len(sent) == client.recording.length
+        assert quiet_tail > 0.6 * INPUT_RATE
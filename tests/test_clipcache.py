@@ -0,0 +1,30 @@
+import numpy as np
+
+from utils.clipcache import ClipCrossfader
+
+RATE = 24000
+
+
+def make_crossfader():
+    return ClipCrossfader(np.full(RATE, 1000, dtype=np.int16), RATE)
+
+
+def test_live_stream_before_the_clip_starts_is_unchanged():
+    crossfader = make_crossfader()
+    live = np.full(2400, -500, dtype=np.int16).tobytes()
+    assert not crossfader.started
+    assert crossfader.mix(live) == live
+    assert crossfader.position == 0
+
+
+def test_live_stream_fades_in_over_the_playing_clip():
+    crossfader = make_crossfader()
+    crossfader.next_chunk()
+    assert crossfader.started
+    live = np.zeros(crossfader.fade + 100, dtype=np.int16)
+    mixed = np.frombuffer(crossfader.mix(live.tobytes()), dtype=np.int16)
+    # The clip's tail fades out under the live stream, which is untouched after the fade
+    assert mixed[0] == 1000
+    assert np.all(np.diff(mixed[: crossfader.fade]) <= 0)
+    assert np.all(mixed[crossfader.fade :] == 0)
+    assert crossfader.mix(live.tobytes()) == live.tobytes()
@@ -0,0 +1,23 @@
+import copy
+
+import pytest
+
+from bot import read_json_club_data
+from club_graph import ClubSimilarityGraph, clubs_fingerprint, graph_clubs
+
+
+@pytest.fixture(scope="module")
+def club_data():
+    return read_json_club_data("./data")
+
+
+def test_shipped_graph_is_fresh(club_data):
+    assert ClubSimilarityGraph.load(club_data) is not None
+
+
+@pytest.mark.parametrize("field", ["サークル", "活動内容", "ラベル1", "ラベル２"])
+def test_fingerprint_covers_the_fields_the_graph_uses(club_data, field):
+    clubs = graph_clubs(club_data)
+    edited = copy.deepcopy(clubs)
+    edited[0][field] = edited[0].get(field, "") + "（変更）"
+    assert clubs_fingerprint(edited) != clubs_fingerprint(clubs)
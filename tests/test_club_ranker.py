@@ -0,0 +1,13 @@
+from bot import ClubRecommendationBot
+
+
+def test_bot_builds_the_ranker_index_before_the_first_turn(tmp_path, monkeypatch):
+    # The first answer is ranked on the event loop, so the index must already exist
+    monkeypatch.chdir(tmp_path)
+    bot = ClubRecommendationBot.create_bot_instance("test")
+    ranker = bot.ranker
+    assert ranker.vocab is not None
+    vocab = ranker.vocab
+    ranker.update("テニスと写真に興味があります")
+    assert ranker.vocab is vocab
+    assert len(ranker.shortlist) > 0
@@ -0,0 +1,51 @@
+import pytest
+
+from bot import read_json_club_data
+from club_resolver import ClubLabelResolver
+
+SPORTS_CATEGORIES = ("スポーツ（球技）", "スポーツ（球技以外）")
+
+
+@pytest.fixture(scope="module")
+def club_data():
+    return read_json_club_data("./data")
+
+
+@pytest.fixture(scope="module")
+def resolver(club_data):
+    return ClubLabelResolver(club_data)
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("野球", ["野球"]),
+        ("ﾃﾆｽ", ["テニス"]),
+        ("野球サークル", ["野球"]),
+        ("テニス部", ["テニス"]),
+        ("ダンスクラブ", ["ダンス"]),
+        ("バスケ", ["バスケットボール"]),
+    ],
+)
+def test_resolves_near_misses(resolver, query, expected):
+    assert resolver.resolve(query) == expected
+
+
+def test_category_prefix_expands_to_its_labels(resolver, club_data):
+    sports = {label for label, clubs in club_data.items() if clubs[0].get("ラベル1") in SPORTS_CATEGORIES}
+    assert sports
+    assert set(resolver.resolve("スポーツ")) == sports
+    assert set(resolver.resolve("スポーツ系")) == sports
+
+
+def test_club_names_are_not_matched_fuzzily(resolver):
+    assert resolver.resolve("abc") == []
+
+
+def test_result_can_be_modified_by_the_caller(resolver):
+    labels = resolver.resolve("スポーツ")
+    expected = list(labels)
+    labels.clear()
+    assert resolver.resolve("スポーツ") == expected
+    resolver.resolve("テニス部").append("野球")
+    assert resolver.resolve("テニス") == ["テニス"]
@@ -0,0 +1,311 @@
+"""
+Admission control for booths that share one API key: a coordinator hands out Live session slots
+(max sessions, max starts per minute, cooldown after a rate-limit error) in first-come first-served order.
+
+    python -m utils.admission serve --max-sessions 3 --max-starts-per-minute 10   # booths use ADMISSION_ADDR=<host>:<port>
+"""
+
+import asyncio
+import collections
+import contextlib
+import json
+import logging
+import math
+import os
+import socket
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_SESSIONS = 3  # concurrent Live sessions allowed for the key
+DEFAULT_SESSION_SECONDS = 180.0  # initial estimate of how long a visitor keeps a session
+THROTTLE_COOLDOWN = 5.0  # seconds without new sessions after a rate-limit error (doubles up to the max)
+MAX_THROTTLE_COOLDOWN = 120.0
+THROTTLE_CALM_PERIOD = 60.0  # a rate-limit error this long after the last cooldown starts again from THROTTLE_COOLDOWN
+TICK_INTERVAL = 1.0  # how often windows are re-checked and waiting booths updated
+CONNECT_TIMEOUT = 2.0  # seconds a booth waits for the coordinator before going on without it
+
+
+def parse_addr(addr):
+    """'host:port' or 'host' -> (host, port)"""
+    host, _, port = addr.rpartition(":") if ":" in addr else (addr, "", "")
+    return host or "127.0.0.1", int(port) if port else DEFAULT_PORT
+
+
+async def _send(writer, message):
+    writer.write((json.dumps(message) + "\n").encode("utf-8"))
+    await writer.drain()
+
+
+class _Waiter:
+    def __init__(self, booth, writer):
+        self.booth = booth
+        self.writer = writer
+        self.granted = asyncio.Event()
+        self.last_sent = None  # (position, wait) last sent to the booth
+
+
+class AdmissionCoordinator:
+    """Fair queue in front of a concurrency cap and a start-rate cap"""
+
+    def __init__(
+        self,
+        max_sessions=DEFAULT_MAX_SESSIONS,
+        max_starts_per_minute=None,
+        session_seconds=DEFAULT_SESSION_SECONDS,
+    ):
+        self.max_sessions = max_sessions
+        self.max_starts_per_minute = max_starts_per_minute
+        self.session_seconds = session_seconds  # moving average of finished sessions
+        self.active = {}  # waiter -> granted at (monotonic)
+        self.queue = collections.deque()
+        self.starts = collections.deque()  # grant times within the last minute
+        self.cooldown_until = 0.0
+        self.cooldown = 0.0
+        self.stats = collections.Counter()
+
+    # --- scheduling ---
+
+    def _can_start(self, now):
+        if len(self.active) >= self.max_sessions or now < self.cooldown_until:
+            return False
+        while self.starts and now - self.starts[0] >= 60:
+            self.starts.popleft()
+        return self.max_starts_per_minute is None or len(self.starts) < self.max_starts_per_minute
+
+    def _pump(self):
+        now = time.monotonic()
+        while self.queue and self._can_start(now):
+            waiter = self.queue.popleft()
+            self.active[waiter] = now
+            self.starts.append(now)
+            self.stats["granted"] += 1
+            waiter.granted.set()
+
+    def expected_wait(self, position, now=None):
+        """Seconds until the booth at the given queue position (0 = next) gets a slot"""
+        now = time.monotonic() if now is None else now
+        # When the active sessions are expected to end, then slots turn over every session_seconds
+        remaining = sorted(max(0.0, self.session_seconds - (now - t)) for t in self.active.values())
+        free = self.max_sessions - len(remaining)
+        if position < free:
+            wait = 0.0
+        else:
+            slot = position - free
+            rounds, index = divmod(slot, max(1, len(remaining)))
+            wait = (remaining[index] if remaining else 0.0) + rounds * self.session_seconds
+        wait = max(wait, self.cooldown_until - now)
+        if self.max_starts_per_minute:
+            # Start rate: the (position+1)-th start has to wait for older starts to leave the window
+            over = len(self.starts) + position + 1 - self.max_starts_per_minute
+            if over > 0:
+                starts = list(self.starts)
+                rounds, index = divmod(over - 1, self.max_starts_per_minute)
+                oldest = starts[index] if index < len(starts) else now
+                wait = max(wait, oldest + 60 * (rounds + 1) - now)
+        return wait
+
+    def _release(self, waiter):
+        granted_at = self.active.pop(waiter, None)
+        if granted_at is not None:
+            duration = time.monotonic() - granted_at
+            self.session_seconds += (duration - self.session_seconds) * 0.2
+        with contextlib.suppress(ValueError):
+            self.queue.remove(waiter)
+        self._pump()
+
+    def _throttled(self):
+        self.stats["throttled"] += 1
+        now = time.monotonic()
+        if now > self.cooldown_until + THROTTLE_CALM_PERIOD:
+            self.cooldown = 0.0  # the last rate-limit error is long past, start over
+        self.cooldown = min(MAX_THROTTLE_COOLDOWN, self.cooldown * 2 if self.cooldown else THROTTLE_COOLDOWN)
+        self.cooldown_until = now + self.cooldown
+        logger.warning("⚠️ Rate limit reported; no new sessions for %.0fs", self.cooldown)
+
+    def status(self):
+        now = time.monotonic()
+        return {
+            "active": len(self.active),
+            "queued": len(self.queue),
+            "max_sessions": self.max_sessions,
+            "starts_last_minute": sum(1 for t in self.starts if now - t < 60),
+            "max_starts_per_minute": self.max_starts_per_minute,
+            "cooldown_s": round(max(0.0, self.cooldown_until - now), 1),
+            "session_seconds": round(self.session_seconds, 1),
+            "next_wait_s": round(self.expected_wait(len(self.queue), now), 1),
+            **self.stats,
+        }
+
+    # --- protocol ---
+
+    async def _update_waiters(self):
+        now = time.monotonic()
+        for position, waiter in enumerate(list(self.queue)):
+            message = (position, math.ceil(self.expected_wait(position, now)))
+            if message != waiter.last_sent:
+                waiter.last_sent = message
+                with contextlib.suppress(ConnectionError):
+                    await _send(waiter.writer, {"op": "queued", "position": message[0], "wait": message[1]})
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(TICK_INTERVAL)
+            self._pump()
+            if self.queue:
+                await self._update_waiters()
+
+    async def _handle(self, reader, writer):
+        waiter = None
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                op = request.get("op")
+                if op == "status":
+                    await _send(writer, {"op": "status", **self.status()})
+                elif op == "acquire" and waiter is None:
+                    waiter = _Waiter(request.get("booth", "?"), writer)
+                    self.stats["requests"] += 1
+                    self.queue.append(waiter)
+                    self._pump()
+                    if not waiter.granted.is_set():
+                        await self._update_waiters()
+                        # Read nothing else until the slot is granted (the booth only waits)
+                        granted = asyncio.create_task(waiter.granted.wait())
+                        closed = asyncio.create_task(reader.read(1))
+                        await asyncio.wait({granted, closed}, return_when=asyncio.FIRST_COMPLETED)
+                        closed.cancel()
+                        with contextlib.suppress(asyncio.CancelledError):
+                            await closed
+                        if not granted.done():
+                            granted.cancel()
+                            break  # the booth went away while waiting
+                    await _send(writer, {"op": "granted"})
+                    logger.info("🎟️ Slot granted to %s (%d active)", waiter.booth, len(self.active))
+                elif op == "throttled":
+                    self._throttled()
+                elif op == "release":
+                    break
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.debug("Admission connection closed: %s", e)
+        finally:
+            if waiter is not None:
+                self._release(waiter)
+                await self._update_waiters()
+            writer.close()
+
+    async def serve(self, host="0.0.0.0", port=DEFAULT_PORT):
+        server = await asyncio.start_server(self._handle, host, port)
+        logger.info(
+            "🎟️ Admission coordinator on %s:%d (max %d sessions, %s starts/min)",
+            host,
+            port,
+            self.max_sessions,
+            self.max_starts_per_minute or "unlimited",
+        )
+        tick = asyncio.create_task(self._tick())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            tick.cancel()
+
+
+class AdmissionClient:
+    """A booth's side: wait for a slot before connecting and report rate-limit errors"""
+
+    def __init__(self, addr, booth=None):
+        self.host, self.port = parse_addr(addr)
+        self.booth = booth or f"{socket.gethostname()}:{os.getpid()}"
+
+    @contextlib.asynccontextmanager
+    async def slot(self, on_wait=None):
+        """Hold a session slot for the duration of the block
+
+        on_wait(position, seconds) is called while queued. Yields a callable that reports a
+        rate-limit error to the coordinator. If the coordinator is unreachable, the block runs anyway.
+        """
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), timeout=CONNECT_TIMEOUT
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.warning("⚠️ Admission coordinator %s:%d unreachable (%s); connecting without it", self.host, self.port, e)
+            yield _no_report
+            return
+
+        try:
+            await _send(writer, {"op": "acquire", "booth": self.booth})
+            while True:
+                line = await reader.readline()
+                if not line:
+                    # Coordinator went away while we were queued
+                    logger.warning("⚠️ Admission coordinator closed the connection; connecting without it")
+                    break
+                message = json.loads(line)
+                if message.get("op") == "granted":
+                    break
+                if message.get("op") == "queued" and on_wait is not None:
+                    on_wait(message["position"], message["wait"])
+
+            async def report_throttled():
+                with contextlib.suppress(ConnectionError):
+                    await _send(writer, {"op": "throttled"})
+
+            yield report_throttled
+        finally:
+            # Closing the connection releases the slot
+            writer.close()
+
+
+async def _no_report():
+    pass
+
+
+async def query_status(addr):
+    host, port = parse_addr(addr)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        await _send(writer, {"op": "status"})
+        return json.loads(await reader.readline())
+    finally:
+        writer.close()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Admission coordinator for booths sharing one API key")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the coordinator")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS)
+    serve.add_argument("--max-starts-per-minute", type=int, default=None)
+    serve.add_argument("--session-seconds", type=float, default=DEFAULT_SESSION_SECONDS, help="initial estimate")
+    status = commands.add_parser("status", help="show the coordinator's state")
+    status.add_argument("addr", nargs="?", default=os.getenv("ADMISSION_ADDR", f"127.0.0.1:{DEFAULT_PORT}"))
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+        coordinator = AdmissionCoordinator(args.max_sessions, args.max_starts_per_minute, args.session_seconds)
+        with contextlib.suppress(KeyboardInterrupt):
+            asyncio.run(coordinator.serve(args.host, args.port))
+        return 0
+
+    try:
+        status = asyncio.run(query_status(args.addr))
+    except OSError as e:
+        print(f"❌ Could not reach {args.addr}: {e}", file=sys.stderr)
+        return 1
+    status.pop("op", None)
+    for key, value in status.items():
+        print(f"{key:<24}{value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
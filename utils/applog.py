@@ -0,0 +1,126 @@
+"""
+Logging for the app: a console handler that never blocks the caller and an in-memory flight recorder,
+dumped to tmp/logs on a crash or SIGUSR1. Levels are set with LOG_LEVEL and FLIGHT_LOG_LEVEL.
+"""
+
+import atexit
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+LOG_FORMAT = "%(asctime)s.%(msecs)03d %(levelname).1s %(threadName)s %(name)s: %(message)s"
+DATE_FORMAT = "%H:%M:%S"
+DEFAULT_FLIGHT_RECORDS = 5000
+DEFAULT_DUMP_DIR = os.path.join("tmp", "logs")
+
+_flight_recorder = None
+_listener = None
+
+
+class FlightRecorder(logging.Handler):
+    """Keeps the last `capacity` records in memory (formatting is deferred until a dump)"""
+
+    def __init__(self, capacity=DEFAULT_FLIGHT_RECORDS, level=logging.NOTSET):
+        super().__init__(level)
+        self.records = collections.deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+
+    def emit(self, record):
+        # deque.append is atomic; no lock and no I/O on the logging thread
+        self.records.append(record)
+
+    def dump(self, path):
+        records = list(self.records)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                try:
+                    f.write(self.format(record) + "\n")
+                except Exception as e:
+                    f.write(f"<unformattable record {record.name}:{record.lineno}: {e}>\n")
+        return path
+
+
+def _level(name, default):
+    value = os.getenv(name, default).upper()
+    level = logging.getLevelName(value)
+    return level if isinstance(level, int) else logging.getLevelName(default)
+
+
+def dump_flight_recorder(reason="manual", dump_dir=DEFAULT_DUMP_DIR):
+    """Write the recent records to <dump_dir>/flight-<time>-<reason>.log and return the path"""
+    if _flight_recorder is None:
+        return None
+    path = os.path.join(dump_dir, f"flight-{time.strftime('%Y%m%d-%H%M%S')}-{reason}.log")
+    return _flight_recorder.dump(path)
+
+
+def _install_crash_hooks(dump_dir):
+    previous_excepthook = sys.excepthook
+    previous_thread_excepthook = threading.excepthook
+
+    def excepthook(exc_type, exc, tb):
+        logging.getLogger("crash").critical("Uncaught exception", exc_info=(exc_type, exc, tb))
+        path = dump_flight_recorder("crash", dump_dir)
+        print(f"💥 Flight recorder written to {path}", file=sys.stderr)
+        if previous_excepthook is not sys.__excepthook__:
+            # the default hook would only print the traceback a second time
+            previous_excepthook(exc_type, exc, tb)
+
+    def thread_excepthook(args):
+        logging.getLogger("crash").critical(
+            "Uncaught exception in thread %s",
+            args.thread.name if args.thread else "?",
+            exc_info=(args.exc_type, args.exc_value, args.exc_traceback),
+        )
+        path = dump_flight_recorder("crash", dump_dir)
+        print(f"💥 Flight recorder written to {path}", file=sys.stderr)
+        if previous_thread_excepthook is not threading.__excepthook__:
+            previous_thread_excepthook(args)
+
+    sys.excepthook = excepthook
+    threading.excepthook = thread_excepthook
+
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        # kill -USR1 <pid> で直近のログを書き出す
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump_flight_recorder("signal", dump_dir))
+
+
+def setup_logging(flight_records=DEFAULT_FLIGHT_RECORDS, dump_dir=DEFAULT_DUMP_DIR):
+    """Configure the root logger once (call as early as possible in main)"""
+    global _flight_recorder, _listener
+    if _listener is not None:
+        return _flight_recorder
+
+    console_level = _level("LOG_LEVEL", "INFO")
+    flight_level = _level("FLIGHT_LOG_LEVEL", "INFO")
+
+    console = logging.StreamHandler()
+    console.setLevel(console_level)
+    console.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, console, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # flush what is still queued
+
+    _flight_recorder = FlightRecorder(flight_records, flight_level)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setLevel(console_level)  # don't prepare records only the flight recorder wants
+    root.addHandler(queue_handler)
+    root.addHandler(_flight_recorder)
+    # Records below both levels are rejected by isEnabledFor() before anything is formatted
+    root.setLevel(min(console_level, flight_level))
+
+    _install_crash_hooks(dump_dir)
+    return _flight_recorder
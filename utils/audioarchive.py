@@ -0,0 +1,140 @@
+"""
+Session audio archive written on a background thread.
+Each turn is saved as <root>/<session>/turn_NNN_{user,assistant}.flac; callers never wait for the disk.
+"""
+
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024  # total size of the archive before old sessions are deleted
+DEFAULT_QUEUE_SIZE = 512  # items (one utterance or one response chunk each)
+
+
+def _dir_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+
+class AudioArchive:
+    """Writes session audio as FLAC on a background thread"""
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES, queue_size=DEFAULT_QUEUE_SIZE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.dropped = 0  # items dropped because the queue was full
+        self.session_dir = None
+        self._session_count = 0
+        self._session_sizes = None  # session dir -> bytes (writer thread only)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._worker, name="audio-archive", daemon=True)
+        self._thread.start()
+
+    # --- called from the audio paths (never block) ---
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def new_session(self):
+        """Start a new session directory (created when its first file is written)"""
+        self._session_count += 1
+        self.session_dir = os.path.join(self.root, f"{time.strftime('%Y%m%d-%H%M%S')}-{self._session_count}")
+        if self.dropped:
+            logger.warning("⚠️ Audio archive dropped %d items (disk too slow)", self.dropped)
+            self.dropped = 0
+        self._put(("end_session", None, None, None))
+
+    def add_user_audio(self, turn, pcm, rate):
+        """Save one whole user utterance (int16 array)"""
+        self._put(("write", self._path(turn, "user"), rate, pcm))
+        self._put(("close", self._path(turn, "user"), None, None))
+
+    def add_assistant_audio(self, turn, chunk, rate):
+        """Append a chunk of the streamed response (int16 PCM bytes)"""
+        self._put(("write", self._path(turn, "assistant"), rate, chunk))
+
+    def end_turn(self, turn):
+        """Close the files of the turn"""
+        self._put(("close", self._path(turn, "assistant"), None, None))
+
+    def close(self, timeout=5.0):
+        """Flush the queue and stop the writer"""
+        self._queue.put(("stop", None, None, None))
+        self._thread.join(timeout)
+
+    def _path(self, turn, role):
+        return os.path.join(self.session_dir, f"turn_{turn:03d}_{role}.flac")
+
+    # --- writer thread ---
+
+    def _worker(self):
+        import soundfile as sf
+
+        open_files = {}  # path -> SoundFile
+
+        def close_file(path):
+            f = open_files.pop(path, None)
+            if f is not None:
+                f.close()
+                self._file_closed(path)
+
+        while True:
+            action, path, rate, data = self._queue.get()
+            try:
+                if action == "write":
+                    f = open_files.get(path)
+                    if f is None:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        f = sf.SoundFile(path, "w", samplerate=rate, channels=1, subtype="PCM_16", format="FLAC")
+                        open_files[path] = f
+                    f.write(np.frombuffer(data, dtype=np.int16) if isinstance(data, (bytes, bytearray)) else data)
+                elif action == "close":
+                    close_file(path)
+                elif action in ("end_session", "stop"):
+                    for open_path in list(open_files):
+                        close_file(open_path)
+                    if action == "stop":
+                        return
+            except Exception as e:
+                # アーカイブの失敗で会話を止めない
+                logger.warning("⚠️ Audio archive error (%s %s): %s", action, path, e)
+
+    def _file_closed(self, path):
+        """Account for a finished file and delete the oldest sessions while over max_bytes"""
+        if self._session_sizes is None:
+            # First file: measure what earlier runs left in the archive
+            self._session_sizes = {}
+            for name in os.listdir(self.root):
+                session = os.path.join(self.root, name)
+                if os.path.isdir(session):
+                    self._session_sizes[session] = _dir_size(session)
+        else:
+            session = os.path.dirname(path)
+            self._session_sizes[session] = self._session_sizes.get(session, 0) + os.path.getsize(path)
+
+        total = sum(self._session_sizes.values())
+        current = os.path.dirname(path)
+        # Session names start with a timestamp, so sorting by name is oldest first
+        for session in sorted(self._session_sizes):
+            if total <= self.max_bytes:
+                break
+            if session == current:
+                continue
+            shutil.rmtree(session, ignore_errors=True)
+            total -= self._session_sizes.pop(session)
@@ -0,0 +1,297 @@
+"""
+Composable audio pipeline stages for mono int16 streams, built once and reset per utterance:
+
+    source -> ResampleStage -> VoiceActivityGate -> LevelMeter -> Tap -> UtteranceSink
+
+Frames are passed by reference and only UtteranceSink copies the audio. Benchmark every stage with
+`python -m utils.audiopipeline`.
+"""
+
+import math
+import time
+
+import numpy as np
+
+from utils.resampler import PolyphaseResampler
+
+DEFAULT_BLOCKSIZE = 1024  # frames read from the device at a time
+DEFAULT_UTTERANCE_SECONDS = 30.0  # initial capacity of an UtteranceSink (grows by doubling)
+VAD_THRESHOLD = 0.01  # RMS (full scale = 1) above which a frame counts as voice
+VAD_HANGOVER_SECONDS = 0.3  # frames kept after the voice drops below the threshold
+
+
+class Frame:
+    """A block of mono int16 samples at a given rate
+
+    samples is a view into a buffer owned by the producer and is only valid until the producer's next frame;
+    a stage that keeps audio has to copy it. The RMS is computed on first use and shared by all stages.
+    """
+
+    __slots__ = ("samples", "rate", "voiced", "_rms", "_scratch")
+
+    def __init__(self, rate, samples=None):
+        self.rate = rate
+        self._scratch = None
+        self.set(np.zeros(0, dtype=np.int16) if samples is None else samples)
+
+    def set(self, samples):
+        """Point the frame at the next block (the producer reuses one Frame)"""
+        self.samples = samples
+        self.voiced = None
+        self._rms = None
+        return self
+
+    @property
+    def rms(self):
+        """Root mean square of the samples, full scale = 1"""
+        if self._rms is None:
+            n = len(self.samples)
+            if n == 0:
+                self._rms = 0.0
+            else:
+                if self._scratch is None or len(self._scratch) < n:
+                    self._scratch = np.empty(n, dtype=np.float32)
+                x = np.multiply(self.samples, np.float32(1 / 32768), out=self._scratch[:n])
+                self._rms = math.sqrt(float(np.dot(x, x)) / n)
+        return self._rms
+
+
+# --- sources ---
+
+
+class StreamSource:
+    """Reads blocks from an input stream (sounddevice or AudioProcess); channel 0 is passed on as a view"""
+
+    def __init__(self, stream, rate, blocksize=DEFAULT_BLOCKSIZE):
+        self.stream = stream
+        self.blocksize = blocksize
+        self.frame = Frame(rate)
+
+    def read(self):
+        data, _ = self.stream.read(self.blocksize)
+        return self.frame.set(data[:, 0] if data.ndim == 2 else data)
+
+
+class ArraySource:
+    """Frames that are consecutive views of one array (a recording, or a test signal for benchmarks)"""
+
+    def __init__(self, samples, rate, blocksize=DEFAULT_BLOCKSIZE):
+        self.samples = np.asarray(samples, dtype=np.int16).reshape(-1)
+        self.blocksize = blocksize
+        self.frame = Frame(rate)
+
+    def __iter__(self):
+        for start in range(0, len(self.samples), self.blocksize):
+            yield self.frame.set(self.samples[start : start + self.blocksize])
+
+
+# --- stages ---
+
+
+class Stage:
+    """A pipeline stage: process() returns the frame for the next stage, or None to drop it"""
+
+    def process(self, frame):
+        return frame
+
+    def flush(self):
+        """Frame still held at the end of the stream (or None)"""
+        return None
+
+    def reset(self):
+        """Start of a new stream"""
+
+
+class VoiceActivityGate(Stage):
+    """Energy-based voice activity detection with a hangover
+
+    Marks frame.voiced; with drop=True, frames outside voice (plus the hangover) are not passed on.
+    """
+
+    def __init__(self, rate, threshold=VAD_THRESHOLD, hangover_seconds=VAD_HANGOVER_SECONDS, drop=True):
+        self.threshold = threshold
+        self.hangover = hangover_seconds * rate
+        self.drop = drop
+        self.reset()
+
+    def reset(self):
+        self._quiet = math.inf  # samples since the last voiced frame
+
+    def process(self, frame):
+        if frame.rms >= self.threshold:
+            self._quiet = 0
+        else:
+            self._quiet += len(frame.samples)
+        frame.voiced = self._quiet <= self.hangover
+        if self.drop and not frame.voiced:
+            return None
+        return frame
+
+
+class ResampleStage(Stage):
+    """Converts the rate into a preallocated output buffer (frames at the target rate already pass through)"""
+
+    def __init__(self, in_rate, out_rate, blocksize=DEFAULT_BLOCKSIZE):
+        self.resampler = PolyphaseResampler(in_rate, out_rate, max_block=blocksize)
+        self.buffer = np.empty(self.resampler.output_length(blocksize) + 1, dtype=np.int16)
+        self.frame = Frame(out_rate)
+
+    def reset(self):
+        self.resampler.reset()
+
+    def process(self, frame):
+        if self.resampler.passthrough:
+            return frame
+        samples = frame.samples
+        if self.resampler.output_length(len(samples)) > len(self.buffer):
+            # A block longer than configured: grow once and keep the larger buffer
+            self.buffer = np.empty(self.resampler.output_length(len(samples)), dtype=np.int16)
+        count = self.resampler.process_into(samples, self.buffer)
+        return self.frame.set(self.buffer[:count])
+
+    def flush(self):
+        if self.resampler.passthrough:
+            return None
+        tail = self.resampler.flush()
+        return self.frame.set(tail) if len(tail) else None
+
+
+class LevelMeter(Stage):
+    """Reports a 0-1 level of every frame (RMS scaled by gain) to a callback, e.g. the UI's level bars"""
+
+    def __init__(self, callback, gain=10.0):
+        self.callback = callback
+        self.gain = gain
+        self.level = 0.0
+
+    def reset(self):
+        self.level = 0.0
+
+    def process(self, frame):
+        if len(frame.samples):
+            self.level = min(frame.rms * self.gain, 1.0)
+            self.callback(self.level)
+        return frame
+
+
+class Tap(Stage):
+    """Hands every frame to a callback and passes it on unchanged (the callback must copy what it keeps)"""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def process(self, frame):
+        self.callback(frame)
+        return frame
+
+
+class UtteranceSink(Stage):
+    """Collects the frames of one utterance into a growing preallocated buffer (the one copy of the capture)"""
+
+    def __init__(self, rate, seconds=DEFAULT_UTTERANCE_SECONDS):
+        self.rate = rate
+        self.buffer = np.empty(int(rate * seconds), dtype=np.int16)
+        self.reset()
+
+    def reset(self):
+        self.length = 0
+        self.voiced_length = 0  # end of the last frame a VoiceActivityGate marked as voiced
+
+    @property
+    def samples(self):
+        """The recorded samples (a view, valid until the next reset)"""
+        return self.buffer[: self.length]
+
+    @property
+    def voiced_samples(self):
+        """The samples without the silence after the last voiced frame (all of them if none was voiced)"""
+        return self.buffer[: self.voiced_length or self.length]
+
+    def process(self, frame):
+        n = len(frame.samples)
+        if self.length + n > len(self.buffer):
+            grown = np.empty(max(self.length + n, 2 * len(self.buffer)), dtype=np.int16)
+            grown[: self.length] = self.buffer[: self.length]
+            self.buffer = grown
+        self.buffer[self.length : self.length + n] = frame.samples
+        self.length += n
+        if frame.voiced:
+            self.voiced_length = self.length
+        return frame
+
+
+class AudioPipeline:
+    """A chain of stages, built once; push() runs one frame through all of them"""
+
+    def __init__(self, *stages):
+        self.stages = stages
+
+    def push(self, frame, start=0):
+        """Run a frame through the stages from start on; returns the last stage's frame (None if dropped)"""
+        for stage in self.stages[start:]:
+            frame = stage.process(frame)
+            if frame is None:
+                return None
+        return frame
+
+    def flush(self):
+        """End of the stream: push what each stage still holds through the stages after it"""
+        for i, stage in enumerate(self.stages):
+            tail = stage.flush()
+            if tail is not None:
+                self.push(tail, i + 1)
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+
+# --- benchmark ---
+
+
+def benchmark_stage(make_stage, signal, rate, blocksize=DEFAULT_BLOCKSIZE):
+    """Seconds per second of audio, and peak bytes allocated per frame, of one stage fed like a live stream"""
+    import tracemalloc
+
+    stage = make_stage()
+    source = ArraySource(signal, rate, blocksize)
+
+    start = time.perf_counter()
+    for frame in source:
+        stage.process(frame)
+    elapsed = time.perf_counter() - start
+
+    # Second pass over the first frames as a new stream, after the lazily allocated buffers exist
+    stage.reset()
+    source.samples = source.samples[: blocksize * 50]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for frame in source:
+        stage.process(frame)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return elapsed / (len(signal) / rate), peak // 50
+
+
+def main():
+    device_rate, rate, seconds = 48000, 16000, 20.0
+    rng = np.random.default_rng(0)
+    # Alternating speech-like noise and silence, so the VAD switches
+    signal = (rng.standard_normal(int(device_rate * seconds)) * 3000).astype(np.int16)
+    signal.reshape(-1, device_rate)[1::2] //= 100
+    at_16k = signal[::3].copy()
+    stages = [
+        ("VoiceActivityGate", lambda: VoiceActivityGate(device_rate), signal, device_rate),
+        (f"ResampleStage {device_rate}->{rate}", lambda: ResampleStage(device_rate, rate), signal, device_rate),
+        ("LevelMeter", lambda: LevelMeter(lambda level: None), at_16k, rate),
+        ("Tap", lambda: Tap(lambda frame: None), at_16k, rate),
+        ("UtteranceSink", lambda: UtteranceSink(rate, seconds), at_16k, rate),
+    ]
+    print(f"{'stage':<32}{'x realtime':>12}{'bytes/frame':>12}")
+    for name, make_stage, samples, samples_rate in stages:
+        cost, peak = benchmark_stage(make_stage, samples, samples_rate)
+        print(f"{name:<32}{1 / cost:>11.0f}x{peak:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Audio capture and playback in a separate process.
+PortAudio runs in its own process so Qt work cannot delay the audio callbacks;
+PCM goes through shared-memory ring buffers and control messages over a pipe.
+"""
+
+import atexit
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Ring buffer sizes (int16 mono)
+CAPTURE_RING_SECONDS = 4.0
+PLAYBACK_RING_SECONDS = 0.4  # keep it short so a flush drops little audio and latency stays low
+
+CONTROL_TIMEOUT = 5.0  # seconds to wait for the audio process to answer a command
+READ_POLL_INTERVAL = 0.005  # seconds between checks while waiting for captured audio
+
+
+class SharedRingBuffer:
+    """Single-producer / single-consumer byte ring buffer in shared memory
+
+    The header holds monotonically increasing counters (bytes written, bytes read, discard mark).
+    Only the producer advances the write counter and the discard mark, and only the consumer
+    advances the read counter, so no lock is needed across processes.
+    """
+
+    HEADER_SIZE = 64
+
+    def __init__(self, capacity, name=None):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.HEADER_SIZE + capacity)
+        else:
+            # Attach to the segment created by the other process (it stays the owner and unlinks it)
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.capacity = capacity
+        self._counters = np.ndarray((3,), dtype=np.uint64, buffer=self.shm.buf[:24])
+        self._data = np.ndarray((self.capacity,), dtype=np.uint8, buffer=self.shm.buf[self.HEADER_SIZE:])
+
+    @property
+    def readable(self):
+        """Bytes that can be read now"""
+        return int(self._counters[0] - self._counters[1])
+
+    @property
+    def writable(self):
+        """Bytes that can be written now"""
+        return self.capacity - self.readable
+
+    def write(self, data):
+        """Write as much of data as fits (producer side); returns the number of bytes written"""
+        src = np.frombuffer(data, dtype=np.uint8)
+        n = min(len(src), self.writable)
+        if n == 0:
+            return 0
+        start = int(self._counters[0] % self.capacity)
+        first = min(n, self.capacity - start)
+        self._data[start : start + first] = src[:first]
+        self._data[: n - first] = src[first:n]
+        self._counters[0] += n  # publish after the data is in place
+        return n
+
+    def read(self, max_bytes):
+        """Read up to max_bytes (consumer side)"""
+        if self._counters[2] > self._counters[1]:
+            # The producer asked to drop everything written before the mark
+            self._counters[1] = self._counters[2]
+        n = min(max_bytes, self.readable)
+        if n == 0:
+            return b""
+        start = int(self._counters[1] % self.capacity)
+        first = min(n, self.capacity - start)
+        data = self._data[start : start + first].tobytes() + self._data[: n - first].tobytes()
+        self._counters[1] += n
+        return data
+
+    def discard(self):
+        """Drop everything that has been written so far (consumer side)"""
+        self._counters[1] = self._counters[0]
+
+    def request_discard(self):
+        """Ask the consumer to drop everything written so far (producer side, applied on the next read)"""
+        self._counters[2] = self._counters[0]
+
+    def close(self):
+        # Release the numpy views before closing the mapping
+        self._counters = None
+        self._data = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _audio_process_main(conn, capture_ring, playback_ring, input_rate, output_rate, blocksize):
+    """Entry point of the audio process: owns the PortAudio streams and answers control messages"""
+    import sounddevice as sd
+
+    capture = SharedRingBuffer(*capture_ring)
+    playback = SharedRingBuffer(*playback_ring)
+    stats = {"overflows": 0, "underruns": 0}
+
+    def output_callback(outdata, frames, time_info, status):
+        data = playback.read(len(outdata))
+        outdata[: len(data)] = data
+        if len(data) < len(outdata):
+            outdata[len(data) :] = bytes(len(outdata) - len(data))
+            if data:
+                stats["underruns"] += 1
+
+    def input_callback(indata, frames, time_info, status):
+        if capture.write(indata) < len(indata):
+            stats["overflows"] += 1
+
+    output_stream = sd.RawOutputStream(
+        samplerate=output_rate, blocksize=blocksize, channels=1, dtype="int16", callback=output_callback
+    )
+    output_stream.start()
+    input_stream = None
+
+    try:
+        while True:
+            command = conn.recv()
+            try:
+                if command == "start_capture":
+                    if input_stream is None:
+                        input_stream = sd.RawInputStream(
+                            samplerate=input_rate, channels=1, dtype="int16", callback=input_callback
+                        )
+                        input_stream.start()
+                elif command == "stop_capture":
+                    if input_stream is not None:
+                        input_stream.stop()
+                        input_stream.close()
+                        input_stream = None
+                elif command == "stats":
+                    conn.send(("ok", dict(stats)))
+                    continue
+                elif command == "close":
+                    conn.send(("ok", None))
+                    break
+                conn.send(("ok", None))
+            except Exception as e:
+                conn.send(("error", str(e)))
+    finally:
+        if input_stream is not None:
+            input_stream.close()
+        output_stream.abort()
+        output_stream.close()
+        capture.close()
+        playback.close()
+
+
+class _ProcessInputStream:
+    """Stand-in for sd.InputStream that reads from the capture ring"""
+
+    def __init__(self, audio):
+        self.audio = audio
+
+    def __enter__(self):
+        self.audio.capture.discard()
+        self.audio.request("start_capture")
+        return self
+
+    def __exit__(self, *exc):
+        self.audio.request("stop_capture")
+
+    def read(self, frames):
+        """Block until frames are available; returns (int16 array of shape (frames, 1), overflowed)"""
+        n = frames * 2
+        while self.audio.capture.readable < n:
+            if not self.audio.is_alive():
+                raise RuntimeError("Audio process is not running")
+            time.sleep(READ_POLL_INTERVAL)
+        data = self.audio.capture.read(n)
+        return np.frombuffer(data, dtype=np.int16).reshape(-1, 1), False
+
+
+class _ProcessOutputStream:
+    """Stand-in for sd.RawOutputStream that writes to the playback ring"""
+
+    def __init__(self, audio):
+        self.audio = audio
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    @property
+    def write_available(self):
+        """Frames that can be written without waiting"""
+        return self.audio.playback.writable // 2
+
+    def write(self, data):
+        self.audio.playback.write(data)
+
+    def abort(self):
+        """Drop the audio that is waiting to be played (no round trip to the audio process)"""
+        self.audio.playback.request_discard()
+
+
+class AudioProcess:
+    """Runs PortAudio capture and playback in a child process
+
+    input_stream() and output_stream() return objects with the parts of the sounddevice stream API
+    that ChatAudioClient uses, so the client code is the same in both modes.
+    """
+
+    def __init__(self, input_rate=16000, output_rate=24000, blocksize=4800):
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.capture = SharedRingBuffer(int(CAPTURE_RING_SECONDS * input_rate) * 2)
+        self.playback = SharedRingBuffer(int(PLAYBACK_RING_SECONDS * output_rate) * 2)
+
+        # spawn: don't fork a process that already runs Qt and asyncio threads
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._lock = threading.Lock()  # the pipe is shared by the capture thread and the event loop
+        self.process = context.Process(
+            target=_audio_process_main,
+            args=(
+                child_conn,
+                (self.capture.capacity, self.capture.name),
+                (self.playback.capacity, self.playback.name),
+                input_rate,
+                output_rate,
+                blocksize,
+            ),
+            name="audio",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self._closed = False
+        atexit.register(self.close)  # the client thread is a daemon and may not get to close()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def request(self, command):
+        """Send a control command and wait for the answer"""
+        with self._lock:
+            self._conn.send(command)
+            if not self._conn.poll(CONTROL_TIMEOUT):
+                raise RuntimeError(f"Audio process did not answer '{command}'")
+            status, value = self._conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"Audio process failed on '{command}': {value}")
+        return value
+
+    def input_stream(self):
+        return _ProcessInputStream(self)
+
+    def output_stream(self):
+        return _ProcessOutputStream(self)
+
+    def stats(self):
+        """Overflow/underrun counters of the audio process"""
+        return self.request("stats")
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self.process.is_alive():
+            try:
+                self.request("close")
+            except (RuntimeError, OSError):
+                pass
+            self.process.join(timeout=CONTROL_TIMEOUT)
+            if self.process.is_alive():
+                self.process.terminate()
+        self._conn.close()
+        for ring in (self.capture, self.playback):
+            ring.close()
+            ring.unlink()
@@ -1,20 +1,123 @@
 import asyncio
+import contextlib
+import enum
+import logging
 import os
 import threading
 import time
-import wave
 
 import numpy as np
-import sounddevice as sd
-import soundfile as sf
-from google import genai
-from google.genai import types
+
+from utils.admission import AdmissionClient
+from utils.audioarchive import AudioArchive
+from utils.audiopipeline import (
+    AudioPipeline,
+    Frame,
+    LevelMeter,
+    ResampleStage,
+    StreamSource,
+    Tap,
+    UtteranceSink,
+    VoiceActivityGate,
+)
+from utils.clipcache import AudioClipCache, ClipCrossfader
+from utils.turnprofiler import DEFAULT_OUT_DIR as DEFAULT_PROFILE_DIR
+from utils.turnprofiler import DEFAULT_SOCKET as DEFAULT_CONTROL_SOCKET
+from utils.turnprofiler import TurnProfiler
+from utils.watchdog import get_watchdog
+
+logger = logging.getLogger(__name__)
+
+# sounddevice, soundfile and google.genai are imported where they are first used.
+# They are slow to import, and the app warms them up in parallel while the window is already shown.
+
+# Frames read from the input device at a time
+CAPTURE_BLOCKSIZE = 1024
+
+# A reset should tear down capture, receive and playback within this time (warned about when exceeded)
+RESET_LATENCY_BUDGET_MS = 200
+
+# After a session fails (connect refused, rate limit, dropped connection), retry after this many seconds,
+# doubling on each consecutive failure up to the maximum
+SESSION_RETRY_DELAY = 1.0
+MAX_SESSION_RETRY_DELAY = 30.0
+# A session that ran at least this long counts as healthy and resets the retry delay
+HEALTHY_SESSION_SECONDS = 30.0
+
+# Deadlines (seconds) of the stages of a turn. A turn that misses one is retried once on a new session
+# with the same recording; if that also misses, the visitor is asked again.
+DEFAULT_DEADLINES = {
+    "upload": 5.0,  # sending activity_start, the recording and activity_end
+    "first_chunk": 10.0,  # from activity_end until the first response (audio or tool call)
+    "tool": 15.0,  # from a tool call until the next response (running the tool included)
+    "turn": 60.0,  # from activity_end until turn_complete
+}
+
+
+class ClientState(enum.Enum):
+    """States of the chat client, published to the UI on every transition"""
+
+    IDLE = "idle"  # connecting or between sessions
+    QUEUED = "queued"  # waiting for a session slot from the admission coordinator
+    LISTENING = "listening"  # waiting for the user to start recording
+    RECORDING = "recording"  # capturing the user's voice
+    PROCESSING = "processing"  # waiting for the model's response
+    SPEAKING = "speaking"  # playing the model's response
+
+
+def _any_error(error, predicate):
+    """Whether the error, or any error inside an ExceptionGroup (the session's TaskGroup), matches"""
+    if isinstance(error, BaseExceptionGroup):
+        return any(_any_error(e, predicate) for e in error.exceptions)
+    return predicate(error)
+
+
+def _is_rate_limit(error):
+    """Whether a session error is a quota / rate-limit rejection"""
+    if getattr(error, "code", None) == 429:
+        return True
+    text = str(error).lower()
+    return any(marker in text for marker in ("resource_exhausted", "429", "quota", "rate limit"))
+
+
+def parse_deadlines(text):
+    """'first_chunk=8,turn=45' -> DEFAULT_DEADLINES with those stages overridden"""
+    deadlines = dict(DEFAULT_DEADLINES)
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        stage, _, seconds = item.partition("=")
+        if stage.strip() not in deadlines:
+            raise ValueError(f"Unknown deadline stage '{stage.strip()}' (expected one of {', '.join(deadlines)})")
+        deadlines[stage.strip()] = float(seconds)
+    return deadlines
+
+
+class TurnDeadlineExceeded(Exception):
+    """A stage of a turn took longer than its deadline (the session is abandoned)"""
+
+    def __init__(self, stage, seconds):
+        super().__init__(f"{stage} deadline of {seconds:g}s exceeded")
+        self.stage = stage
 
 
 class ChatAudioClient:
     def __init__(
-        self, api_key, tools=[], system_instruction="You are a helpful assistant and answer in a friendly tone."
+        self,
+        api_key,
+        tools=[],
+        system_instruction="You are a helpful assistant and answer in a friendly tone.",
+        audio_process=False,
+        archive_dir=os.path.join("tmp", "archive"),
+        clip_dir=None,
+        clip_threshold=0.7,
+        profile_turns=0,
+        profile_dir=DEFAULT_PROFILE_DIR,
+        control_socket=DEFAULT_CONTROL_SOCKET,
+        admission_addr=None,
+        deadlines=None,
+        trim_trailing_silence=False,
     ):
+        from google import genai
+
         self.client = genai.Client(api_key=api_key)
         self.model = "gemini-live-2.5-flash-preview"
         self.tools = [{"function_declarations": tools}]
@@ -25,17 +128,22 @@ class ChatAudioClient:
             "realtime_input_config": {"automatic_activity_detection": {"disabled": True}},
             "tools": self.tools,
             "speech_config": {"language_code": "ja-JP"},
+            # Transcribe the user's audio so subclasses can work on the text while the model responds
+            "input_audio_transcription": {},
+            # Resumption handles let a retried turn continue the conversation on a new connection
+            "session_resumption": {},
         }
 
-        self.running = True
-
-        self.audio_buffer = []
-        self.is_recording = False
-        self.is_listening = False
-        self.is_processing = False
-        self.is_speaking = False
+        self.state = ClientState.IDLE
+        self._state_lock = threading.Lock()
         self.record_event = threading.Event()
 
+        # Session control (the asyncio loop runs in its own thread, see run())
+        self._event_loop = None
+        self._session_task = None
+        self._thread = None
+        self._stopping = False
+
         # UI callback
         self.ui_callback = None
         
@@ -46,8 +154,53 @@ class ChatAudioClient:
         self.sample_rate = 16000
         self.channels = 1
         self.dtype = "int16"  # Native format for Gemini input (16-bit PCM)
+        self.output_sample_rate = 24000  # Gemini always outputs 24kHz
+        self.output_block_seconds = 0.2  # playback block length
+        # Devices are opened at their native rate (None = the device's default) and resampled here
+        self.input_device_rate = None
+        self.output_device_rate = None
         os.makedirs("tmp", exist_ok=True)
 
+        # Both directions of every turn are archived as FLAC on a background thread (None disables it)
+        self.archive = AudioArchive(archive_dir) if archive_dir else None
+        self.turn = 0  # turn number within the current session
+
+        # Audio pipelines (see utils.audiopipeline), built once and reset per utterance or session.
+        # Capture and playback are built when the device rates are known (_build_pipelines()).
+        self.recording = UtteranceSink(self.sample_rate)
+        self.capture_pipeline = None
+        self.playback_pipeline = None
+        self._playback_frame = Frame(self.output_sample_rate)
+        self._playback_buffer = bytearray()  # device-rate PCM waiting to be written
+        self.response_pipeline = self.build_response_pipeline()
+        self._response_frame = Frame(self.output_sample_rate)
+        # Cut the utterance after the last frame the VAD marked as voiced (off: the whole recording is sent)
+        self.trim_trailing_silence = trim_trailing_silence
+
+        # Local greeting/filler clips, played when the first response byte is later than clip_threshold seconds
+        self.clips = AudioClipCache(clip_dir, rate=self.output_sample_rate)
+        self.clip_threshold = clip_threshold
+
+        # cProfile/tracemalloc of the next N turns, armed here or at runtime through the control socket (None disables the socket)
+        self.profiler = TurnProfiler(profile_dir)
+        self.profiler.arm(profile_turns)
+        self.control_socket = control_socket
+
+        # Session slots shared with the other booths on the same API key ("host:port", None = connect directly)
+        self.admission = AdmissionClient(admission_addr) if admission_addr else None
+        self.expected_wait = None  # seconds until a slot is expected while QUEUED
+
+        # Per-stage deadlines of a turn, and the turn to retry on the next session after a miss
+        self.deadlines = {**DEFAULT_DEADLINES, **(deadlines or {})}
+        self._resumption_handle = None  # latest handle of the current session
+        self._continuing = False  # the next session continues the current conversation (after a missed deadline)
+        self._resume = None  # handle the next session continues from (after a missed deadline)
+        self._retry = None  # recording of a turn that missed a deadline, sent again on the next session
+
+        # Optionally run capture and playback in a separate process (started in run())
+        self.use_audio_process = audio_process
+        self.audio_process = None
+
     def set_ui_callback(self, callback):
         """UIコールバック関数を設定"""
         self.ui_callback = callback
@@ -57,75 +210,211 @@ class ChatAudioClient:
         if self.ui_callback:
             self.ui_callback(event, data)
 
+    def _set_state(self, state, expected=None):
+        """状態を遷移させ、変化があれば "state_changed" イベントを通知
+
+        expected を指定した場合は、現在の状態がそのいずれかのときだけ遷移する。
+        """
+        with self._state_lock:
+            if expected is not None and self.state not in expected:
+                return False
+            if self.state == state:
+                return False
+            self.state = state
+        self.notify_ui("state_changed", state)
+        return True
+
+    @property
+    def is_queued(self):
+        return self.state == ClientState.QUEUED
+
+    @property
+    def is_recording(self):
+        return self.state == ClientState.RECORDING
+
+    @property
+    def is_listening(self):
+        return self.state in (ClientState.LISTENING, ClientState.RECORDING)
+
+    @property
+    def is_processing(self):
+        return self.state == ClientState.PROCESSING
+
+    @property
+    def is_speaking(self):
+        return self.state == ClientState.SPEAKING
+
     def start_recording(self):
-        if not self.is_recording and self.is_listening:
+        if self._set_state(ClientState.RECORDING, expected=(ClientState.LISTENING,)):
             self.record_event.set()
-            self.is_recording = True
-            self.notify_ui("recording_started")
-            print("🔴 Recording started.")
+            logger.info("🔴 Recording started.")
 
     def stop_recording(self):
-        if self.is_recording:
+        if self._set_state(ClientState.PROCESSING, expected=(ClientState.RECORDING,)):
             self.record_event.clear()
-            self.is_recording = False
-            self.notify_ui("recording_stopped")
-            print("⏹️ Recording stopped.")
+            logger.info("⏹️ Recording stopped.")
 
-    def listen_to_user(self):
-        self.record_event.clear()
-        print("👂 Waiting to record...")
-        self.is_listening = True
-        self.notify_ui("listening_started")
-        while not self.record_event.wait(timeout=0.1):
-            if not self.running:
-                return
-        self.audio_buffer.clear()
-
-        with sd.InputStream(samplerate=self.sample_rate, channels=self.channels, dtype=self.dtype) as stream:
-            while self.record_event.is_set():
-                data, _ = stream.read(1024)
-                self.audio_buffer.append(data)
-                
-                # Calculate audio level for UI visualization
-                if len(data) > 0:
-                    # Convert int16 to float for RMS calculation
-                    float_data = data.astype(np.float32) / 32768.0
-                    rms = np.sqrt(np.mean(float_data ** 2))
-                    self.audio_level = min(rms * 10, 1.0)  # 0-1の範囲に正規化
-                    self.notify_ui("audio_level_update", self.audio_level)
-                
+    def reset(self):
+        """Cancel the current session and start a new one (safe to call from any thread)
+
+        Returns a concurrent.futures.Future that resolves to the reset latency in ms
+        once capture, receive and playback have been torn down, or None if the client isn't running.
+        """
+        return self._cancel_session(stopping=False)
+
+    def stop(self):
+        """Cancel the current session and end the client loop (safe to call from any thread)"""
+        return self._cancel_session(stopping=True)
+
+    def close(self, timeout=5.0):
+        """Stop the client and wait until the loop has released the audio devices and closed the archive
+
+        Call this before the process exits: the loop runs on a daemon thread that would otherwise be killed.
+        """
+        self.stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        elif self.archive is not None:
+            self.archive.close()
+
+    def _cancel_session(self, stopping):
+        loop = self._event_loop
+        if loop is None or loop.is_closed():
+            return None
+        requested_at = time.perf_counter()
+
+        async def cancel():
+            self._stopping = self._stopping or stopping
+            task = self._session_task
+            if task is None or task.done():
+                return 0.0
+            task.cancel()
+            # Wait for the TaskGroup to unwind (the caller's task may be cancelled, the session's can't be awaited twice)
+            await asyncio.wait([task])
+            latency_ms = (time.perf_counter() - requested_at) * 1000
+            if latency_ms > RESET_LATENCY_BUDGET_MS:
+                logger.warning("⚠️ Reset took %.0fms (budget %dms)", latency_ms, RESET_LATENCY_BUDGET_MS)
+            else:
+                logger.info("🔁 Session reset in %.0fms", latency_ms)
+            return latency_ms
+
+        return asyncio.run_coroutine_threadsafe(cancel(), loop)
+
+    def listen_to_user(self, cancel_event=None):
+        """Wait for start_recording(), then capture until stop_recording()
+
+        Runs in a worker thread. Returns None when cancel_event is set before recording finishes.
+        """
+        cancel_event = cancel_event or threading.Event()
+        if cancel_event.is_set():
+            return None
+        logger.debug("👂 Waiting to record...")
+        self._set_state(ClientState.LISTENING)
+        while not self.record_event.wait(timeout=0.05):
+            if cancel_event.is_set():
+                return None
+        recording = self.recording
+        pipeline = self.capture_pipeline
+        pipeline.reset()
+
+        with self._open_input_stream() as stream:
+            source = StreamSource(stream, self.input_device_rate, CAPTURE_BLOCKSIZE)
+            while self.record_event.is_set() and not cancel_event.is_set():
+                pipeline.push(source.read())
                 time.sleep(0.01)
 
-        print(f"🎙️ Captured {len(self.audio_buffer)} chunks.")
-        audio = np.concatenate(self.audio_buffer, axis=0)
-        self.is_listening = False
+        if cancel_event.is_set():
+            self.audio_level = 0.0
+            return None
+
+        pipeline.flush()
+        samples = recording.voiced_samples if self.trim_trailing_silence else recording.samples
+        logger.debug(
+            "🎙️ Captured %.1fs (%.1fs sent).", recording.length / self.sample_rate, len(samples) / self.sample_rate
+        )
         self.audio_level = 0.0  # Reset audio level when recording stops
-        self.notify_ui("listening_finished")
-        # Save a copy for debugging
-        wav_path = "tmp/user.wav"
-        with wave.open(wav_path, "wb") as wf:
-            wf.setnchannels(self.channels)
-            wf.setsampwidth(2)  # 16-bit PCM = 2 bytes
-            wf.setframerate(self.sample_rate)
-            wf.writeframes(audio.tobytes())
-        print(f"💾 Saved to {wav_path}")
-
-        # Return raw bytes directly
-        return audio.tobytes()
+        self.turn += 1
+        pcm_bytes = samples.tobytes()
+        # Archive the utterance (a read-only view of the bytes, written in the background)
+        if self.archive is not None:
+            self.archive.add_user_audio(self.turn, np.frombuffer(pcm_bytes, dtype=np.int16), self.sample_rate)
+        return pcm_bytes
+
+    # --- audio pipelines: override these to add stages (e.g. a Tap) ---
+
+    def build_capture_pipeline(self, recording):
+        """Stages from the input device to the recording of an utterance"""
+        return AudioPipeline(
+            # Convert from the device rate to the 16 kHz the Live API expects
+            ResampleStage(self.input_device_rate, self.sample_rate, CAPTURE_BLOCKSIZE),
+            # Mark voiced frames; recording is button-driven, so nothing is dropped (see trim_trailing_silence)
+            VoiceActivityGate(self.sample_rate, drop=False),
+            # Audio level for UI visualization (0-1)
+            LevelMeter(self._on_audio_level),
+            recording,
+        )
+
+    def build_playback_pipeline(self):
+        """Stages from the 24 kHz response (and clip) audio to the playback buffer"""
+        return AudioPipeline(
+            ResampleStage(self.output_sample_rate, self.output_device_rate, self._output_blocksize()),
+            Tap(self._buffer_playback),
+        )
+
+    def build_response_pipeline(self):
+        """Stages the live response audio goes through as it arrives (before the clip crossfade and playback)"""
+        return AudioPipeline(Tap(self._archive_response))
+
+    def _build_pipelines(self):
+        if self.capture_pipeline is None:
+            self.capture_pipeline = self.build_capture_pipeline(self.recording)
+            self.playback_pipeline = self.build_playback_pipeline()
+
+    def _on_audio_level(self, level):
+        self.audio_level = level
+        self.notify_ui("audio_level_update", level)
+
+    def _buffer_playback(self, frame):
+        self._playback_buffer.extend(frame.samples)
+
+    def _archive_response(self, frame):
+        # The samples are a view of the received bytes, which are never modified, so the archive can keep them
+        if self.archive is not None:
+            self.archive.add_assistant_audio(self.turn, frame.samples, self.output_sample_rate)
 
     # override this if you have tools
     def call_tool(self, tool_name, tool_args):
         pass
 
+    # override this to use the transcript of each user turn
+    def on_input_transcription(self, text):
+        pass
+
     async def process_user_input(self, pcm_bytes, session):
-        self.is_processing = True
-        self.notify_ui("processing_started")
+        from google.genai import types
 
-        await session.send_realtime_input(activity_start=types.ActivityStart())
-        await session.send_realtime_input(audio=types.Blob(data=pcm_bytes, mime_type="audio/pcm;rate=16000"))
-        await session.send_realtime_input(activity_end=types.ActivityEnd())
+        self._set_state(ClientState.PROCESSING)
+        deadlines = self.deadlines
 
-        print("Sent user audio...")
+        try:
+            async with asyncio.timeout(deadlines["upload"]):
+                await session.send_realtime_input(activity_start=types.ActivityStart())
+                await session.send_realtime_input(audio=types.Blob(data=pcm_bytes, mime_type="audio/pcm;rate=16000"))
+                await session.send_realtime_input(activity_end=types.ActivityEnd())
+        except TimeoutError:
+            raise TurnDeadlineExceeded("upload", deadlines["upload"]) from None
+
+        logger.debug("Sent user audio...")
+
+        # Every wait for the next response is bounded by the current stage and by the whole turn
+        loop = asyncio.get_running_loop()
+        turn_deadline = loop.time() + deadlines["turn"]
+
+        def stage(name):
+            at = loop.time() + deadlines[name]
+            return (name, at) if at < turn_deadline else ("turn", turn_deadline)
+
+        current, deadline = stage("first_chunk")
 
         """output_path = "tmp/response.wav"
         wf = wave.open(output_path, "wb")
@@ -134,12 +423,38 @@ class ChatAudioClient:
         wf.setframerate(24000)  # Gemini always outputs 24kHz
         """
 
-        async for response in session.receive():
+        transcript = []
+        responses = session.receive().__aiter__()
+        while True:
+            timeout = asyncio.timeout_at(deadline)
+            try:
+                async with timeout:
+                    response = await anext(responses)
+            except StopAsyncIteration:
+                break
+            except TimeoutError:
+                if not timeout.expired():
+                    raise
+                raise TurnDeadlineExceeded(current, deadlines[current]) from None
+
+            update = getattr(response, "session_resumption_update", None)
+            if update is not None and update.resumable and update.new_handle:
+                self._resumption_handle = update.new_handle
+            if response.server_content or response.tool_call:
+                current, deadline = "turn", turn_deadline
             if response.server_content:
+                transcription = response.server_content.input_transcription
+                if transcription is not None and transcription.text:
+                    transcript.append(transcription.text)
                 if response.data is not None:
                     # wf.writeframes(response.data)
                     yield response.data
             elif response.tool_call:
+                current, deadline = stage("tool")
+                # Hand over the transcript before the tools run so they can use it
+                if transcript:
+                    self.on_input_transcription("".join(transcript))
+                    transcript.clear()
                 for fc in response.tool_call.function_calls:
                     result = self.call_tool(fc.name, fc.args)
                     function_response = types.FunctionResponse(
@@ -149,14 +464,20 @@ class ChatAudioClient:
                     )
                     await session.send_tool_response(function_responses=[function_response])
 
-        print("Written response audio...")
+        if transcript:
+            self.on_input_transcription("".join(transcript))
+
+        logger.debug("Written response audio...")
 
         # wf.close()
 
         # return output_path
 
     def play_output(self, wav_path):
-        print("🔊 Playing response...")
+        logger.debug("🔊 Playing response...")
+
+        import sounddevice as sd
+        import soundfile as sf
 
         data, samplerate = sf.read(wav_path)
 
@@ -164,33 +485,112 @@ class ChatAudioClient:
         sd.play(data, samplerate)
         sd.wait()
 
-        print("✅ Playback finished.")
+        logger.debug("✅ Playback finished.")
         
     def _reset_states(self):
         """ステートをリセット"""
-        self.running=True
-        self.is_recording = False
-        self.is_listening = False
-        self.is_processing = False
-        self.is_speaking = False
+        self.record_event.clear()
+        self._set_state(ClientState.IDLE)
 
-    async def _loop(self):
-        queue = asyncio.Queue()
-        playback_done_event = asyncio.Event()
-
-        async def playback():
-            """
-            音声チャンクをバッファリングし、一定のブロックサイズで再生する。
-            これにより、音声の途切れ（アンダーラン）を防ぎ、再生を安定させる。
-            """
-            samplerate = 24000
-            blocksize = 4800  # 4800フレーム = 24000 Hzで0.2秒
-            block_bytes = blocksize * 2  # int16は2バイト/サンプル
-            write_interval = blocksize / samplerate  # 0.2秒
-
-            buffer = bytearray()
-
-            with sd.RawOutputStream(samplerate=samplerate, blocksize=blocksize, channels=1, dtype="int16") as stream:
+    def _resolve_device_rates(self):
+        """Use the native rate of the default devices unless a rate was set explicitly"""
+        if self.input_device_rate is not None and self.output_device_rate is not None:
+            return
+
+        import sounddevice as sd
+
+        if self.input_device_rate is None:
+            self.input_device_rate = int(sd.query_devices(kind="input")["default_samplerate"])
+        if self.output_device_rate is None:
+            self.output_device_rate = int(sd.query_devices(kind="output")["default_samplerate"])
+        logger.info("🎚️ Device rates: in=%d Hz, out=%d Hz", self.input_device_rate, self.output_device_rate)
+
+    def _output_blocksize(self):
+        return int(self.output_device_rate * self.output_block_seconds)
+
+    def _open_input_stream(self):
+        """Capture stream: in the audio process if enabled, otherwise a sounddevice stream in this process"""
+        if self.audio_process is not None:
+            return self.audio_process.input_stream()
+
+        import sounddevice as sd
+
+        return sd.InputStream(samplerate=self.input_device_rate, channels=self.channels, dtype=self.dtype)
+
+    def _open_output_stream(self):
+        """Playback stream: in the audio process if enabled, otherwise a sounddevice stream in this process"""
+        if self.audio_process is not None:
+            return self.audio_process.output_stream()
+
+        import sounddevice as sd
+
+        return sd.RawOutputStream(
+            samplerate=self.output_device_rate, blocksize=self._output_blocksize(), channels=1, dtype="int16"
+        )
+
+    async def _capture(self, turn_profile=None):
+        """Run listen_to_user() in a worker thread; cancelling this stops the capture within one read
+
+        The thread is a daemon (unlike the asyncio.to_thread pool) so a capture waiting for the
+        record button never keeps the interpreter from exiting.
+        The capture thread is profiled as the "capture" stage when the turn is profiled.
+        """
+        loop = asyncio.get_running_loop()
+        result = loop.create_future()
+        cancel_event = threading.Event()
+
+        def deliver(setter, value):
+            if not result.done():
+                setter(value)
+
+        def capture():
+            try:
+                with turn_profile.profile("capture") if turn_profile else contextlib.nullcontext():
+                    pcm_bytes = self.listen_to_user(cancel_event)
+                outcome = (result.set_result, pcm_bytes)
+            except BaseException as e:
+                outcome = (result.set_exception, e)
+            try:
+                loop.call_soon_threadsafe(deliver, *outcome)
+            except RuntimeError:
+                pass  # the loop has already been closed (stop())
+
+        threading.Thread(target=capture, name="capture", daemon=True).start()
+        try:
+            return await result
+        finally:
+            cancel_event.set()
+
+    async def _playback(self, queue, playback_done_event):
+        """
+        音声チャンクをバッファリングし、一定のブロックサイズで再生する。
+        これにより、音声の途切れ（アンダーラン）を防ぎ、再生を安定させる。
+        書き込みは出力バッファに空きがあるときだけ行い、イベントループをブロックしない。
+        """
+        blocksize = self._output_blocksize()  # デバイスのレートで0.2秒分のフレーム数
+        block_bytes = blocksize * 2  # int16は2バイト/サンプル
+        write_interval = self.output_block_seconds  # 0.2秒
+        poll_interval = 0.01  # 出力バッファの空きを確認する間隔
+        # 24kHzの応答音声をデバイスのレートに変換してバッファに溜めるパイプライン
+        pipeline = self.playback_pipeline
+        pipeline.reset()
+        frame = self._playback_frame
+        buffer = self._playback_buffer
+        buffer.clear()
+
+        async def write(stream, data):
+            # 空いている分だけ書き込み、空きがなければ待つ（キャンセルはここで即座に届く）
+            view = memoryview(data)
+            while view:
+                available = stream.write_available * 2
+                if available == 0:
+                    await asyncio.sleep(poll_interval)
+                    continue
+                stream.write(view[:available])
+                view = view[available:]
+
+        with self._open_output_stream() as stream:
+            try:
                 while True:
                     try:
                         # 次のブロックを書き込むのに十分なデータがバッファに溜まるまで待つ
@@ -200,101 +600,278 @@ class ChatAudioClient:
 
                             if chunk is None:
                                 # 発話終了の合図(None)を受け取った
-                                # バッファに残っているデータを再生する
+                                # フィルタ内に残っているサンプルも含めて、バッファに残っているデータを再生する
+                                pipeline.flush()
                                 if buffer:
-                                    stream.write(buffer)
+                                    await write(stream, bytes(buffer))
                                     buffer.clear()
 
                                 playback_done_event.set()  # メインループに再生完了を通知
+                                continue  # 次の発話を待つ
 
-                                if not self.running:
-                                    return  # アプリケーション全体が終了する場合、タスクを終了
-                                else:
-                                    # アプリは続行中。次の発話を待つためにループを続ける
-                                    continue
-
-                            buffer.extend(chunk)
+                            pipeline.push(frame.set(np.frombuffer(chunk, dtype=np.int16)))
 
                     except asyncio.TimeoutError:
                         # 新しい音声チャンクが時間内に届かなかった場合（例：ネットワーク遅延）
                         # バッファにデータが残っていれば、無音でパディングして再生する
                         if buffer:
                             padding = bytes(block_bytes - len(buffer))
-                            stream.write(buffer + padding)
+                            await write(stream, bytes(buffer) + padding)
                             buffer.clear()
                         # バッファが空なら何もしない（無音を再生し続けることになる）
                         continue
 
                     # バッファから1ブロック分のデータを書き出す
-                    stream.write(buffer[:block_bytes])
+                    await write(stream, bytes(buffer[:block_bytes]))
                     # 書き出した分をバッファから削除
-                    buffer = buffer[block_bytes:]
-
-        # --- メインループ (最初のコードのロジックを維持) ---
-
+                    del buffer[:block_bytes]
+            except asyncio.CancelledError:
+                # リセット時は再生待ちの音声を捨てて即座に止める
+                stream.abort()
+                raise
+
+    async def _converse(self, session, queue, playback_done_event):
+        """録音 → 送信・受信 → 再生 を繰り返す"""
         while True:
-            print("Entering...")
-            self._reset_states()
-            async with self.client.aio.live.connect(model=self.model, config=self.config) as session:
-                playback_task = asyncio.create_task(playback())
-
-                while self.running:
-                    playback_done_event.clear()
-                    print("🟢 Chat audio client running.")
-
-                    # 各サイクル開始時に状態をリセット
-                    self.is_processing = False
-                    self.is_speaking = False
-
-                    pcm_bytes = self.listen_to_user()
-
-                    # ここで is_processing = True を設定するのが一般的
-                    # self.is_processing = True
-                    # self.notify_ui("processing_started")
-                    if self.running:
-                        response_started = False
-                        gen = self.process_user_input(pcm_bytes, session)
-                        async for chunk in gen:
-                            if not response_started:
-                                # 最初のレスポンスチャンクを受け取ったら発話開始
-                                self.is_processing = False
-                                self.is_speaking = True
-                                self.notify_ui("speaking_started")
-                                response_started = True
-                            if not self.running:
-                                print("Reset during playback...")
-                                await gen.aclose()
-                                while not queue.empty():
-                                    try:
-                                        queue.get_nowait()
-                                    except asyncio.QueueEmpty:
-                                        break
-                                await queue.put(None)
-                            else:
-                                await queue.put(chunk)
-
-                        # 発話データの送信が完了したことをplaybackタスクに伝える
-                        await queue.put(None)
-                        # playbackタスクが全ての音声データを再生し終えるのを待つ
-                        await playback_done_event.wait()
-
-                        # 発話終了をUIに通知
-                        self.is_speaking = False
-                        self.notify_ui("speaking_finished")
-                        
-                        # AI応答完了後に質問カウントを更新（Botクラスで実装される場合）
-                        if hasattr(self, 'increment_question_count'):
-                            self.increment_question_count()
-                            print(f"[DEBUG] Question count incremented to: {getattr(self, 'current_question_count', 'unknown')}")
-
-                # ループを抜けた後、クリーンアップ
-                await queue.put(None)
-                await playback_task
+            turn_profile = self.profiler.begin_turn()
+            if turn_profile is None:
+                await self._turn(session, queue, playback_done_event)
+                continue
+
+            # プロファイル対象のターン：ループのスレッド（送信・受信、ツール、再生）を "loop" として計測
+            completed = False
+            try:
+                with turn_profile.profile("loop"):
+                    await self._turn(session, queue, playback_done_event, turn_profile)
+                completed = True
+            finally:
+                self.profiler.end_turn(turn_profile, self.turn, completed)
+
+    async def _turn(self, session, queue, playback_done_event, turn_profile=None):
+        """1ターン分の 録音 → 送信・受信 → 再生"""
+        playback_done_event.clear()
+        logger.debug("🟢 Chat audio client running.")
+
+        retried = self._retry is not None
+        if retried:
+            # The previous session missed a deadline on this recording: send it again
+            pcm_bytes, self._retry = self._retry, None
+            self._continuing = False
+        else:
+            pcm_bytes = await self._capture(turn_profile)
+        if pcm_bytes is None:
+            return
+
+        response_started = False
+        # Cover the wait for the first response byte with a local clip
+        crossfader = None
+        clip = self.clips.pick(self.turn)
+        clip_task = None
+        if clip is not None:
+            crossfader = ClipCrossfader(clip, self.output_sample_rate)
+            clip_task = asyncio.create_task(self._play_clip(crossfader, queue))
+        try:
+            async for chunk in self.process_user_input(pcm_bytes, session):
+                if not response_started:
+                    # 最初のレスポンスチャンクを受け取ったら発話開始
+                    if clip_task is not None:
+                        clip_task.cancel()
+                    self._set_state(ClientState.SPEAKING)
+                    response_started = True
+                if crossfader is not None and crossfader.started:
+                    chunk = crossfader.mix(chunk)
+                await queue.put(chunk)
+                self.response_pipeline.push(self._response_frame.set(np.frombuffer(chunk, dtype=np.int16)))
+        except TurnDeadlineExceeded as e:
+            self._on_deadline_exceeded(e, pcm_bytes, retried, response_started)
+            raise
+        finally:
+            if clip_task is not None:
+                clip_task.cancel()
+        if self.archive is not None:
+            self.archive.end_turn(self.turn)
+
+        # 発話データの送信が完了したことをplaybackタスクに伝える
+        await queue.put(None)
+        # playbackタスクが全ての音声データを再生し終えるのを待つ
+        await playback_done_event.wait()
+
+        # 発話終了をUIに通知
+        self._set_state(ClientState.IDLE)
+
+        # AI応答完了後に質問カウントを更新（Botクラスで実装される場合）
+        if hasattr(self, 'increment_question_count'):
+            self.increment_question_count()
+            logger.debug("Question count incremented to: %s", getattr(self, "current_question_count", "unknown"))
+
+    def _on_deadline_exceeded(self, error, pcm_bytes, retried, response_started):
+        """Count the miss and decide whether the next session retries the turn"""
+        watchdog = get_watchdog()
+        watchdog.count(f"deadline.{error.stage}")
+        # Either way the conversation continues on a new connection
+        self._continuing = True
+        self._resume = self._resumption_handle
+        if retried or response_started:
+            # Already retried, or the visitor has heard (part of) the answer: give up on this turn
+            watchdog.count("turn.failed")
+            logger.error("❌ Turn %d: %s; asking the visitor again on a new session", self.turn, error)
+            return
+        watchdog.count("turn.retried")
+        logger.warning("⚠️ Turn %d: %s; retrying on a new session", self.turn, error)
+        self._retry = pcm_bytes
+
+    async def _play_clip(self, crossfader, queue):
+        """After clip_threshold seconds without a response, feed the clip to playback in real time"""
+        await asyncio.sleep(self.clip_threshold)
+        logger.info("🎵 Playing a local clip while waiting for the response")
+        self._set_state(ClientState.SPEAKING)
+        # Stay only slightly ahead of playback so the live stream can take over with a short crossfade
+        interval = crossfader.chunk / self.output_sample_rate
+        await queue.put(crossfader.next_chunk())
+        while not crossfader.finished:
+            await queue.put(crossfader.next_chunk())
+            await asyncio.sleep(interval)
+
+    def _on_admission_wait(self, position, seconds):
+        """Publish the queue position and expected wait while waiting for a session slot"""
+        self.expected_wait = seconds
+        logger.info("⏳ Waiting for a session slot (position %d, ~%ds)", position + 1, seconds)
+        if not self._set_state(ClientState.QUEUED):
+            # Same state, new wait time: let the UI refresh anyway
+            self.notify_ui("state_changed", ClientState.QUEUED)
+
+    @contextlib.asynccontextmanager
+    async def _admission_slot(self):
+        """Hold a slot from the admission coordinator for the session (yields a rate-limit reporter)"""
+        if self.admission is None:
+            yield None
+            return
+        try:
+            async with self.admission.slot(self._on_admission_wait) as report_throttled:
+                self.expected_wait = None
+                self._set_state(ClientState.IDLE, expected=(ClientState.QUEUED,))
+                yield report_throttled
+        finally:
+            self.expected_wait = None
+
+    async def _run_session(self, delay=0.0):
+        """1回分のセッション。録音・受信と再生は同じ TaskGroup で動き、キャンセルでまとめて終了する
+
+        A turn that misses a deadline continues on a new connection within the same admission slot,
+        so the visitor isn't queued behind the other booths in the middle of the conversation.
+        """
+        if delay:
+            # Back off after a failed session (cancellable by reset() / stop() like the session itself)
+            await asyncio.sleep(delay)
+
+        async with self._admission_slot() as report_throttled:
+            while True:
+                queue = asyncio.Queue()
+                playback_done_event = asyncio.Event()
+                config = self.config
+                if self._resume is not None:
+                    # Continue the conversation the stuck turn belonged to
+                    logger.info("Resuming the conversation on a new connection...")
+                    config = {**config, "session_resumption": {"handle": self._resume}}
+                elif self._continuing:
+                    # No resumption handle arrived before the miss: same visitor, turn and archive session,
+                    # but the model starts without the earlier turns
+                    logger.warning(
+                        "⚠️ Turn %d continues on a new connection without the conversation context (no resumption handle)",
+                        self.turn,
+                    )
+                else:
+                    self.turn = 0
+                    if self.archive is not None:
+                        self.archive.new_session()
+                self._resumption_handle = None
+
+                try:
+                    async with self.client.aio.live.connect(model=self.model, config=config) as session:
+                        # Connected: a failed reconnect before this point keeps the conversation for the next try
+                        # (a turn still to be retried keeps it until _turn sends it)
+                        self._continuing = self._retry is not None
+                        self._resume = None
+                        async with asyncio.TaskGroup() as tg:
+                            tg.create_task(self._playback(queue, playback_done_event))
+                            tg.create_task(self._converse(session, queue, playback_done_event))
+                except Exception as e:
+                    if _any_error(e, lambda error: isinstance(error, TurnDeadlineExceeded)):
+                        # Handled in _turn: retry the turn, or wait for the visitor again, on a new connection
+                        if self._retry is None:
+                            self._set_state(ClientState.IDLE)
+                        continue
+                    if report_throttled is not None and _any_error(e, _is_rate_limit):
+                        await report_throttled()
+                    raise
+                return
+
+    async def _lag_sentinel(self):
+        """Measure how late the event loop wakes this task up (blocking calls on the loop show up here)"""
+        loop = asyncio.get_running_loop()
+        watchdog = get_watchdog()
+        interval = watchdog.watch("asyncio")
+        try:
+            while True:
+                expected = loop.time() + interval
+                await asyncio.sleep(interval)
+                interval = watchdog.beat("asyncio", max(0.0, loop.time() - expected) * 1000)
+        finally:
+            watchdog.unwatch("asyncio")
 
+    async def _loop(self):
+        self._event_loop = asyncio.get_running_loop()
+        sentinel = asyncio.create_task(self._lag_sentinel())
+        control = asyncio.create_task(self.profiler.serve(self.control_socket)) if self.control_socket else None
+
+        # --- メインループ：リセットされるたびに新しいセッションを開始 ---
+        delay = 0.0
+        while not self._stopping:
+            logger.info("Connecting to the Live API...")
+            if not self._continuing:
+                # A new visitor (a conversation continued after a failed reconnect keeps its state)
+                self._reset_states()
+            self._session_task = asyncio.create_task(self._run_session(delay))
+            started = time.monotonic()
+            try:
+                await self._session_task
+                delay = 0.0
+            except asyncio.CancelledError:
+                # reset() / stop() によるキャンセル
+                logger.debug("Session cancelled.")
+                self._retry = self._resume = None
+                self._continuing = False
+                delay = 0.0
+            except Exception as e:
+                # 接続失敗・レート制限など：スレッドを落とさず、間隔を空けて再接続
+                if time.monotonic() - started - delay >= HEALTHY_SESSION_SECONDS:
+                    delay = 0.0
+                delay = min(MAX_SESSION_RETRY_DELAY, delay * 2 if delay else SESSION_RETRY_DELAY)
+                logger.error("❌ Session failed (%s: %s); reconnecting in %.0fs", type(e).__name__, e, delay)
+
+        sentinel.cancel()
+        if control is not None:
+            control.cancel()
+        self._reset_states()
 
     def loop(self):
-        asyncio.run(self._loop())
+        self._build_pipelines()
+        try:
+            asyncio.run(self._loop())
+        finally:
+            if self.audio_process is not None:
+                self.audio_process.close()
+                self.audio_process = None
+            if self.archive is not None:
+                # Write out what is still queued and finalize the FLAC files of the last session
+                self.archive.close()
 
     def run(self):
-        thread = threading.Thread(target=self.loop, daemon=True)
-        thread.start()
+        self._resolve_device_rates()
+        if self.use_audio_process and self.audio_process is None:
+            from utils.audioprocess import AudioProcess
+
+            self.audio_process = AudioProcess(self.input_device_rate, self.output_device_rate, self._output_blocksize())
+            logger.info("🎧 Audio I/O running in process %d", self.audio_process.process.pid)
+        self._thread = threading.Thread(target=self.loop, daemon=True)
+        self._thread.start()
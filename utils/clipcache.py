@@ -0,0 +1,143 @@
+"""
+Pre-rendered audio clips played locally while the Live response is on its way.
+greeting.flac plays on the first turn of a session and filler_*.flac on the later ones. Clips can be cut from the archive:
+
+    python -m utils.clipcache add greeting tmp/archive/<session>/turn_001_assistant.flac --end 2.5
+"""
+
+import logging
+import os
+import random
+import sys
+
+import numpy as np
+
+from utils.resampler import PolyphaseResampler
+
+logger = logging.getLogger(__name__)
+
+GREETING = "greeting"
+FILLER_PREFIX = "filler"
+CLIP_EXTENSIONS = (".flac", ".wav")
+
+
+class AudioClipCache:
+    """In-memory int16 clips keyed by file name (without extension)"""
+
+    def __init__(self, clip_dir, rate=24000):
+        self.clip_dir = clip_dir
+        self.rate = rate
+        self.clips = {}
+        if clip_dir and os.path.isdir(clip_dir):
+            self._load()
+
+    def _load(self):
+        import soundfile as sf
+
+        for filename in sorted(os.listdir(self.clip_dir)):
+            name, ext = os.path.splitext(filename)
+            if ext.lower() not in CLIP_EXTENSIONS:
+                continue
+            data, rate = sf.read(os.path.join(self.clip_dir, filename), dtype="int16", always_2d=True)
+            samples = data[:, 0]
+            if rate != self.rate:
+                resampler = PolyphaseResampler(rate, self.rate)
+                samples = np.concatenate((resampler.process(samples), resampler.flush()))
+            self.clips[name] = samples
+        if self.clips:
+            logger.info("🎵 Loaded %d audio clips from %s", len(self.clips), self.clip_dir)
+
+    def get(self, name):
+        return self.clips.get(name)
+
+    def fillers(self):
+        return [name for name in self.clips if name.startswith(FILLER_PREFIX)]
+
+    def pick(self, turn):
+        """Clip for the turn: the greeting on the first turn, otherwise a random filler (None if there is none)"""
+        if turn == 1 and GREETING in self.clips:
+            return self.clips[GREETING]
+        fillers = self.fillers()
+        if not fillers:
+            return None
+        return self.clips[random.choice(fillers)]
+
+
+class ClipCrossfader:
+    """Plays a clip in paced chunks and crossfades it into the live stream once that starts"""
+
+    def __init__(self, clip, rate, chunk_seconds=0.05, fade_seconds=0.15):
+        self.clip = clip
+        self.position = 0
+        self.chunk = int(rate * chunk_seconds)
+        self.fade = int(rate * fade_seconds)
+        self._fade_done = 0  # samples of the live stream already faded in
+
+    @property
+    def started(self):
+        """Whether any of the clip has been played (a response before the threshold plays without it)"""
+        return self.position > 0
+
+    @property
+    def finished(self):
+        return self.position >= len(self.clip)
+
+    def next_chunk(self):
+        """Next chunk of the clip before the live stream starts (int16 PCM bytes)"""
+        data = self.clip[self.position : self.position + self.chunk]
+        self.position += len(data)
+        return data.tobytes()
+
+    def mix(self, live_bytes):
+        """Mix the start of the live stream with the fading tail of the clip (only once the clip has started)"""
+        if not self.started or self.finished or self._fade_done >= self.fade:
+            return live_bytes
+        live = np.frombuffer(live_bytes, dtype=np.int16).astype(np.float32)
+        n = min(len(live), self.fade - self._fade_done, len(self.clip) - self.position)
+        ramp = (self._fade_done + np.arange(n, dtype=np.float32)) / self.fade
+        tail = self.clip[self.position : self.position + n].astype(np.float32)
+        live[:n] = live[:n] * ramp + tail * (1 - ramp)
+        self.position += n
+        self._fade_done += n
+        return np.clip(live, -32768, 32767).astype(np.int16).tobytes()
+
+
+def add_clip(clip_dir, name, source, start=0.0, end=None):
+    """Cut [start, end) seconds out of an archived file and save it as <clip_dir>/<name>.flac"""
+    import soundfile as sf
+
+    data, rate = sf.read(source, dtype="int16", always_2d=True)
+    first = int(start * rate)
+    last = len(data) if end is None else int(end * rate)
+    os.makedirs(clip_dir, exist_ok=True)
+    path = os.path.join(clip_dir, f"{name}.flac")
+    sf.write(path, data[first:last, 0], rate, format="FLAC", subtype="PCM_16")
+    return path, (last - first) / rate
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the greeting/filler audio clips")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--clip-dir", default=os.path.join(root, "app", "data", "clips"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="cut a clip out of an archived file")
+    add.add_argument("name", help=f"'{GREETING}' or '{FILLER_PREFIX}_<something>'")
+    add.add_argument("source")
+    add.add_argument("--start", type=float, default=0.0)
+    add.add_argument("--end", type=float, default=None)
+    commands.add_parser("list", help="list the clips")
+    args = parser.parse_args(argv)
+
+    if args.command == "add":
+        path, seconds = add_clip(args.clip_dir, args.name, args.source, args.start, args.end)
+        print(f"💾 Saved {path} ({seconds:.2f}s)")
+    else:
+        cache = AudioClipCache(args.clip_dir)
+        for name, samples in cache.clips.items():
+            print(f"{name:<24}{len(samples) / cache.rate:>6.2f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
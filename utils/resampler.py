@@ -0,0 +1,164 @@
+"""
+Streaming polyphase resampler in NumPy.
+Converts between the devices' native rates and the 16/24 kHz of the Live API, keeping the filter state between chunks.
+Run `python -m utils.resampler` to print the throughput of common conversions.
+"""
+
+import math
+import time
+
+import numpy as np
+
+# Filter design
+TAPS_PER_PHASE = 32  # taps of each polyphase branch (longer = sharper cutoff, slower)
+KAISER_BETA = 8.6  # about 80 dB stopband attenuation
+ROLLOFF = 0.92  # cutoff as a fraction of the lower Nyquist frequency
+MAX_BLOCK = 4096  # input samples filtered at once; longer inputs are split (bounds the scratch buffers)
+# Up to this many polyphase branches, each branch is filtered on a strided view of the input (no copies);
+# above it (e.g. 44.1 kHz <-> 16/24 kHz), the windows are gathered at once, which is faster but allocates
+MAX_STRIDED_PHASES = 8
+
+
+def design_filter(up, down, taps_per_phase=TAPS_PER_PHASE, beta=KAISER_BETA, rolloff=ROLLOFF):
+    """Kaiser-windowed sinc low-pass for resampling by up/down, split into polyphase branches
+
+    Returns an array of shape (up, taps_per_phase). Row p holds the taps used for output samples
+    that fall on phase p of the upsampled grid, reversed so they can be applied to an input window directly.
+    """
+    num_taps = up * taps_per_phase
+    cutoff = rolloff / max(up, down)  # normalised to the Nyquist frequency of the upsampled signal
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    taps = cutoff * np.sinc(cutoff * n) * np.kaiser(num_taps, beta)
+    taps *= up / taps.sum()  # unity gain after zero-stuffing by `up`
+    # taps[p + k * up] multiplies x[i - k]; reverse k so a window x[i - K + 1 : i + 1] lines up
+    return taps.reshape(taps_per_phase, up).T[:, ::-1].astype(np.float32).copy()
+
+
+class PolyphaseResampler:
+    """Converts a mono stream from in_rate to out_rate, one chunk at a time"""
+
+    def __init__(self, in_rate, out_rate, taps_per_phase=TAPS_PER_PHASE, max_block=MAX_BLOCK):
+        g = math.gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = self.out_rate // g
+        self.down = self.in_rate // g
+        self.passthrough = self.up == self.down
+        self.filters = design_filter(self.up, self.down, taps_per_phase)
+        self.num_taps = taps_per_phase
+        self.max_block = max_block
+
+        # Scratch buffers, allocated once and reused for every chunk
+        max_count = -(-max_block * self.up // self.down) + 1
+        self._extended = np.zeros(self.num_taps - 1 + max_block, dtype=np.float32)  # history + chunk
+        self._history = np.zeros(self.num_taps - 1, dtype=np.float32)
+        self._y = np.empty(max_count, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """Forget the previous chunks (start of a new stream)"""
+        self._history[:] = 0
+        self._next_time = 0  # time of the next output sample, in upsampled units from the chunk start
+
+    def output_length(self, input_length):
+        """Number of samples process() returns for the next input_length samples"""
+        span = input_length * self.up - self._next_time
+        return max(0, -(-span // self.down))
+
+    def process(self, samples):
+        """Resample the next chunk; int16 in gives int16 out, float in gives float32 out"""
+        samples = np.asarray(samples).reshape(-1)
+        if self.passthrough:
+            return samples.copy()
+        out = np.empty(self.output_length(len(samples)), dtype=np.int16 if samples.dtype == np.int16 else np.float32)
+        self.process_into(samples, out)
+        return out
+
+    def process_into(self, samples, out):
+        """Resample the next chunk into out (at least output_length() long) and return the number of samples written
+
+        The samples are filtered in preallocated scratch buffers, so a caller that reuses out processes a stream
+        without allocating (up to MAX_STRIDED_PHASES branches, which covers 48 kHz devices). out may be int16 or float32.
+        """
+        if self.passthrough:
+            np.copyto(out[: len(samples)], samples, casting="unsafe")
+            return len(samples)
+        written = 0
+        for start in range(0, len(samples), self.max_block):
+            written += self._process_block(samples[start : start + self.max_block], out[written:])
+        return written
+
+    def _process_block(self, x, out):
+        n = len(x)
+        history = self.num_taps - 1
+        extended = self._extended[: history + n]
+        extended[:history] = self._history
+        if x.dtype == np.int16:
+            np.multiply(x, np.float32(1 / 32768), out=extended[history:])
+        else:
+            np.copyto(extended[history:], x, casting="same_kind")
+
+        count = self.output_length(n)
+        y = self._y[:count]
+        if count:
+            # window for output n is extended[index[n] : index[n] + K] (the history shifts indices by K - 1)
+            windows = np.lib.stride_tricks.sliding_window_view(extended, self.num_taps)
+            if self.up <= MAX_STRIDED_PHASES:
+                # Outputs r, r + up, r + 2up, ... share a phase and their windows are `down` apart
+                for r in range(min(self.up, count)):
+                    index, phase = divmod(self._next_time + r * self.down, self.up)
+                    rows = len(range(r, count, self.up))
+                    np.matmul(windows[index :: self.down][:rows], self.filters[phase], out=y[r :: self.up])
+            else:
+                times = self._next_time + np.arange(count, dtype=np.int64) * self.down
+                index, phase = np.divmod(times, self.up)
+                np.einsum("nk,nk->n", windows[index], self.filters[phase], out=y)
+            self._next_time += (count - 1) * self.down + self.down - n * self.up
+        else:
+            self._next_time -= n * self.up
+        self._history[:] = extended[n:]
+
+        if out.dtype == np.int16:
+            y *= 32768
+            np.rint(y, out=y)
+            np.clip(y, -32768, 32767, out=y)
+        out[:count] = y
+        return count
+
+    def flush(self, dtype=np.int16):
+        """Push the samples still inside the filter out (end of an utterance) and reset"""
+        if self.passthrough:
+            return np.zeros(0, dtype=dtype)
+        tail = self.process(np.zeros(self.num_taps // 2, dtype=dtype))
+        self.reset()
+        return tail
+
+    def process_bytes(self, data):
+        """Resample int16 PCM bytes"""
+        if self.passthrough:
+            return bytes(data)
+        return self.process(np.frombuffer(data, dtype=np.int16)).tobytes()
+
+
+def benchmark(in_rate, out_rate, seconds=10.0, chunk=1024):
+    """Throughput in input samples per second when fed in chunks like a live stream"""
+    resampler = PolyphaseResampler(in_rate, out_rate)
+    rng = np.random.default_rng(0)
+    signal = (rng.standard_normal(int(in_rate * seconds)) * 3000).astype(np.int16)
+
+    start = time.perf_counter()
+    for offset in range(0, len(signal), chunk):
+        resampler.process(signal[offset : offset + chunk])
+    elapsed = time.perf_counter() - start
+    return len(signal) / elapsed
+
+
+def main():
+    print(f"{'conversion':<20}{'samples/s':>14}{'x realtime':>12}")
+    for in_rate, out_rate in [(48000, 16000), (44100, 16000), (24000, 48000), (24000, 44100), (16000, 16000)]:
+        throughput = benchmark(in_rate, out_rate)
+        print(f"{f'{in_rate} -> {out_rate}':<20}{throughput:>14,.0f}{throughput / in_rate:>11.0f}x")
+
+
+if __name__ == "__main__":
+    main()
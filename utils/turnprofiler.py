@@ -0,0 +1,222 @@
+"""
+On-demand CPU and memory profiling of the next N conversation turns on a running booth.
+Arm it with PROFILE_TURNS=N at startup or at runtime with `python -m utils.turnprofiler profile N`.
+"""
+
+import asyncio
+import contextlib
+import cProfile
+import io
+import logging
+import os
+import pstats
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUT_DIR = os.path.join("tmp", "profiles")
+DEFAULT_SOCKET = os.path.join("tmp", "profiler.sock")
+TRACEMALLOC_FRAMES = 10  # frames kept per allocation (more frames cost more memory while armed)
+TOP_FUNCTIONS = 30  # functions listed in the summary
+TOP_ALLOCATIONS = 25  # allocation diffs listed in the summary
+
+
+def _filtered(snapshot):
+    # Leave out the profiling machinery itself (and linecache, filled when tracebacks are formatted)
+    return snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, pstats.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "*/linecache.py"),
+        )
+    )
+
+
+class TurnProfile:
+    """Profilers and snapshots of one turn"""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.started_at = time.perf_counter()
+        self.profiles = {}  # stage -> cProfile.Profile
+        self.snapshot = tracemalloc.take_snapshot()
+
+    @contextlib.contextmanager
+    def profile(self, stage):
+        """Profile the calling thread for the duration of the block (one stage per thread)"""
+        profile = self.profiles.setdefault(stage, cProfile.Profile())
+        profile.enable()
+        try:
+            yield profile
+        finally:
+            profile.disable()
+
+
+class TurnProfiler:
+    """Profiles the next N turns when armed (from any thread)"""
+
+    def __init__(self, out_dir=DEFAULT_OUT_DIR):
+        self.out_dir = out_dir
+        self.remaining = 0  # turns still to be profiled
+        self.written = 0  # turns written since the last arm()
+        self._baseline = None  # snapshot at the start of the first profiled turn
+        self._lock = threading.Lock()
+
+    @property
+    def armed(self):
+        return self.remaining > 0
+
+    def arm(self, turns):
+        """Profile the next `turns` turns (0 disarms)"""
+        with self._lock:
+            self.remaining = max(0, int(turns))
+            self.written = 0
+        if self.remaining:
+            logger.info("🔬 Profiling the next %d turns into %s", self.remaining, self.out_dir)
+        return self.remaining
+
+    def begin_turn(self):
+        """Start profiling a turn if armed; returns a TurnProfile or None"""
+        with self._lock:
+            if self.remaining <= 0:
+                return None
+            self.remaining -= 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._baseline = None
+        turn = TurnProfile(self)
+        if self._baseline is None:
+            self._baseline = turn.snapshot
+        return turn
+
+    def end_turn(self, turn, number, completed=True):
+        """Write the files of a finished turn on a background thread"""
+        end_snapshot = tracemalloc.take_snapshot()
+        elapsed = time.perf_counter() - turn.started_at
+        last = not self.armed
+        if last:
+            tracemalloc.stop()
+        threading.Thread(
+            target=self._write,
+            args=(turn, number, completed, elapsed, end_snapshot, self._baseline),
+            name="turn-profiler",
+            daemon=True,
+        ).start()
+        if last:
+            self._baseline = None
+
+    def _write(self, turn, number, completed, elapsed, end_snapshot, baseline):
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            prefix = os.path.join(self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-turn{number:03d}")
+            summary = io.StringIO()
+            summary.write(f"turn {number}: {elapsed * 1000:.0f} ms{'' if completed else ' (cancelled)'}\n")
+
+            for stage, profile in turn.profiles.items():
+                profile.dump_stats(f"{prefix}-{stage}.prof")
+                summary.write(f"\n=== {stage}: top {TOP_FUNCTIONS} by cumulative time ===\n")
+                stats = pstats.Stats(profile, stream=summary)
+                stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+
+            for title, start in (("this turn", turn.snapshot), ("first profiled turn", baseline)):
+                if start is None:
+                    continue
+                summary.write(f"\n=== allocations since {title}: top {TOP_ALLOCATIONS} ===\n")
+                for stat in _filtered(end_snapshot).compare_to(_filtered(start), "lineno")[:TOP_ALLOCATIONS]:
+                    summary.write(f"{stat}\n")
+
+            with open(f"{prefix}-summary.txt", "w", encoding="utf-8") as f:
+                f.write(summary.getvalue())
+            self.written += 1
+            logger.info("🔬 Turn %d profile written to %s-*", number, prefix)
+        except Exception as e:
+            logger.warning("⚠️ Failed to write the turn profile: %s", e)
+
+    # --- control socket ---
+
+    def handle_command(self, line):
+        """Run one control command and return the reply"""
+        words = line.split()
+        if not words:
+            return "empty command"
+        command = words[0]
+        if command == "profile":
+            turns = int(words[1]) if len(words) > 1 else 1
+            return f"profiling the next {self.arm(turns)} turns into {self.out_dir}"
+        if command == "stop":
+            self.arm(0)
+            return "stopped"
+        if command == "status":
+            return f"remaining {self.remaining} turns, written {self.written}, tracing {tracemalloc.is_tracing()}"
+        return f"unknown command: {command}"
+
+    async def serve(self, path=DEFAULT_SOCKET):
+        """Accept control commands on a Unix socket until cancelled"""
+        if not hasattr(socket, "AF_UNIX"):
+            logger.info("Profiler control socket is not supported on this platform")
+            return
+
+        async def handle(reader, writer):
+            try:
+                line = (await reader.readline()).decode("utf-8", "replace")
+                try:
+                    reply = self.handle_command(line)
+                except ValueError as e:
+                    reply = f"bad command: {e}"
+                writer.write((reply + "\n").encode("utf-8"))
+                await writer.drain()
+            finally:
+                writer.close()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)  # left over from a previous run
+        try:
+            server = await asyncio.start_unix_server(handle, path)
+        except OSError as e:
+            logger.warning("⚠️ Profiler control socket %s unavailable: %s", path, e)
+            return
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+
+
+def send_command(command, path=DEFAULT_SOCKET, timeout=5.0):
+    """Send a control command to a running client and return its reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall((command + "\n").encode("utf-8"))
+        return sock.makefile(encoding="utf-8").read().strip()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Control the turn profiler of a running client")
+    parser.add_argument("command", choices=("profile", "stop", "status"))
+    parser.add_argument("turns", nargs="?", type=int, default=1, help="turns to profile (profile only)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    args = parser.parse_args(argv)
+
+    command = f"profile {args.turns}" if args.command == "profile" else args.command
+    try:
+        print(send_command(command, args.socket))
+    except OSError as e:
+        print(f"❌ Could not reach {args.socket}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
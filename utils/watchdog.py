@@ -0,0 +1,175 @@
+"""
+Stall watchdog for the asyncio loop and the Qt main thread.
+A monitor thread logs the stack of a thread whose beat() is overdue, while it is still blocked,
+and keeps lag and duration histograms for the diagnostics overlay.
+"""
+
+import bisect
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+STALL_THRESHOLD_MS = float(os.getenv("STALL_THRESHOLD_MS", "200"))  # beats later than this are stalls
+# Probes beat slowly while nothing is wrong, and at the fast rate while the overlay is shown or a stall is suspected
+IDLE_PROBE_INTERVAL = 0.25  # seconds between beats of a watched thread
+FAST_PROBE_INTERVAL = 0.05
+FAST_POLL_INTERVAL = 0.02  # seconds between checks of the monitor thread at the fast rate (idle: threshold / 2)
+SUSPECT_LAG_MS = STALL_THRESHOLD_MS / 4  # a beat this late switches to the fast rate
+SUSPECT_HOLD_SECONDS = 10.0  # how long the fast rate is kept after the last suspicious beat or stall
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500)  # upper bounds of the buckets (last bucket is open)
+RECENT_SAMPLES = 512  # samples kept for percentiles
+
+
+class LatencyHistogram:
+    """Bucketed counts plus a window of recent samples (written from one thread, read from any)"""
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS_MS, window=RECENT_SAMPLES):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.recent = collections.deque(maxlen=window)
+        self.max = 0.0
+
+    def record(self, ms):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.recent.append(ms)
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p):
+        samples = sorted(self.recent)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.recent.clear()
+        self.max = 0.0
+
+
+class _Watch:
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.last_beat = time.perf_counter()
+        self.interval = interval  # seconds until the next beat is due
+        self.reported = False
+        self.stalls = 0
+
+
+class StallWatchdog:
+    """Monitors heartbeats of named threads and logs the stack of any thread that stops beating"""
+
+    def __init__(self, threshold_ms=STALL_THRESHOLD_MS):
+        self.threshold = threshold_ms / 1000
+        self.histograms = {}
+        self.counters = collections.Counter()  # counts of notable events (e.g. missed deadlines)
+        self.detailed = False  # sample at the fast rate (set while the diagnostics overlay is shown)
+        self._fast_until = 0.0  # perf_counter time until which a suspected stall keeps the fast rate
+        self._watches = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="watchdog", daemon=True)
+        self._thread.start()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def count(self, name, n=1):
+        """Count an event; the counts are shown in the diagnostics overlay"""
+        with self._lock:
+            self.counters[name] += n
+
+    def counts(self):
+        """Snapshot of the event counters (safe to call from any thread)"""
+        with self._lock:
+            return dict(self.counters)
+
+    @property
+    def fast(self):
+        return self.detailed or time.perf_counter() < self._fast_until
+
+    @property
+    def probe_interval(self):
+        """Seconds a probe should wait before its next beat"""
+        return FAST_PROBE_INTERVAL if self.fast else IDLE_PROBE_INTERVAL
+
+    def suspect(self):
+        """Sample at the fast rate for a while"""
+        self._fast_until = time.perf_counter() + SUSPECT_HOLD_SECONDS
+
+    def watch(self, name, thread_id=None):
+        """Start expecting beats for name from the given thread (default: the calling thread)
+
+        Returns the seconds until the first beat is due.
+        """
+        interval = self.probe_interval
+        with self._lock:
+            self._watches[name] = _Watch(thread_id or threading.get_ident(), interval)
+        self.histogram(name)
+        return interval
+
+    def unwatch(self, name):
+        with self._lock:
+            self._watches.pop(name, None)
+
+    def stalls(self, name):
+        watch = self._watches.get(name)
+        return watch.stalls if watch else 0
+
+    def beat(self, name, lag_ms=None):
+        """Heartbeat from the watched thread; lag_ms is how late the beat was
+
+        Returns the seconds until the next beat is due (the probe waits this long).
+        """
+        if lag_ms is not None and lag_ms >= SUSPECT_LAG_MS:
+            self.suspect()
+        interval = self.probe_interval
+        watch = self._watches.get(name)
+        if watch is None:
+            return interval
+        watch.last_beat = time.perf_counter()
+        watch.interval = interval
+        if lag_ms is not None:
+            self.histogram(name).record(lag_ms)
+        if watch.reported:
+            watch.reported = False
+            logger.warning("✅ %s recovered (beat %.0fms late)", name, lag_ms or 0)
+        return interval
+
+    def _run(self):
+        while True:
+            time.sleep(FAST_POLL_INTERVAL if self.fast else self.threshold / 2)
+            now = time.perf_counter()
+            with self._lock:
+                watches = list(self._watches.items())
+            for name, watch in watches:
+                overdue = now - watch.last_beat - watch.interval
+                if watch.reported or overdue < self.threshold:
+                    continue
+                watch.reported = True
+                self.suspect()
+                watch.stalls += 1
+                frame = sys._current_frames().get(watch.thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else "  <thread not found>\n"
+                logger.warning("⚠️ %s stalled for %.0fms; blocked at:\n%s", name, overdue * 1000, stack)
+
+
+_watchdog = None
+_watchdog_lock = threading.Lock()
+
+
+def get_watchdog():
+    """Process-wide watchdog (started on first use)"""
+    global _watchdog
+    with _watchdog_lock:
+        if _watchdog is None:
+            _watchdog = StallWatchdog()
+        return _watchdog